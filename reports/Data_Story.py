@@ -25,6 +25,7 @@
 # In[34]:
 
 
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -47,14 +48,9 @@ from pandas.plotting import register_matplotlib_converters
 register_matplotlib_converters()
 warnings.filterwarnings("ignore")
 
-file = '../data/manipulated_data/rainfalldata.csv'
-rd = pd.read_csv(file)
-file2 = '../data/manipulated_data/ncrainfalldata.csv'
-ncrd = pd.read_csv(file2)
-rd.Date = pd.to_datetime(rd.Date)
-rd = rd.set_index('Date')
-ncrd.Date = pd.to_datetime(ncrd.Date)
-ncrd = ncrd.set_index('Date')
+sys.path.append('../src')
+from rainfallcache import load_rainfall
+rd, ncrd = load_rainfall('../data/manipulated_data')     # binary cache when available, csv otherwise
 
 
 # ### Viewing the datasets.
@@ -384,6 +380,10 @@ def hyperparameter_find(training_data, comb, testing_data):
 
 # this cell takes a very long time to run as there are 625 different possiblities. DO NOT UN-Comment and run all
 # hyperparameter_find(training, config, validation)
+# the same search runs on all CPU cores, resumes after an interrupt & writes hyperparameter_combinations.csv with:
+#   python ../src/hypersearch.py --location 'RALEIGH, NC' --train-end 376 --validation-end 424
+# (add --halving to drop the clearly worse orders after a few validation months instead of evaluating all 48,
+# its leaderboard is written to hyperparameter_combinations_halving.csv)
 
 
 # The best hyperparameters for this data set were: p=4, d=0, q=3, P=3, D=0, Q=4, m=12
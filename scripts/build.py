@@ -17,6 +17,9 @@ import glob
 import re
 import platform
 import subprocess
+import io
+import json
+import tokenize
 
 
 def eprint(*args, **kwargs):
@@ -58,11 +61,13 @@ def check_prereqs():
 	prereqs = []
 	if os_version == 'Windows':
 		prereqs = [
-			{ 'test' : ["powershell.exe", "Get-Command jupyter 2>&1 | out-null"], 'isshell':False, 'onerror': "jupyter is not installed but is required." }
+			{ 'test' : ["powershell.exe", "Get-Command jupyter 2>&1 | out-null"], 'isshell':False, 'optional':'jupyter',
+			  'onerror': "jupyter is not installed, notebooks are converted by this script instead." }
 		]
 	elif os_version == 'Linux' or os_version == 'Darwin':
 		prereqs = [
-			{ 'test' : ["command", "-v", "jupyter"], 'isshell':True, 'onerror': "jupyter is not installed but is required." }
+			{ 'test' : ["command", "-v", "jupyter"], 'isshell':True, 'optional':'jupyter',
+			  'onerror': "jupyter is not installed, notebooks are converted by this script instead." }
 		]
 	else:
 		eprint("Platform ({}) not supported".format(os_version))
@@ -72,6 +77,10 @@ def check_prereqs():
 		try:
 			subprocess.check_call(prereq['test'], shell=prereq['isshell'])
 		except subprocess.CalledProcessError:
+			if 'optional' in prereq:
+				MISSING_OPTIONAL.add(prereq['optional'])
+				eprint("NOTICE: {}".format(prereq['onerror']))
+				continue
 			missing_prereqs += 1
 			eprint("MISSING PREREQ: {}".format(prereq['onerror']))
 		else:
@@ -131,6 +140,91 @@ def hit_error(error_str=""):
 	eprint(error_str)
 
 
+LINE_MAGIC = re.compile(r"^(\s*)(%|!)(\S*)[ \t]*(.*?)\s*$")
+
+
+def notebook_to_script(notebook, pyfile):
+	''' Converts a notebook to a python script like `jupyter nbconvert --to script` (used when jupyter
+		is not installed): code cells in order, markdown cells as comments & IPython magics, indented 
+		ones included, as get_ipython() calls.
+		args: notebook = .ipynb filename
+			  pyfile = destination .py filename
+	'''
+	with open(notebook, 'r') as f:
+		cells = json.loads(f.read())['cells']
+	script = ['#!/usr/bin/env python\n', '# coding: utf-8\n']
+	for cell in cells:
+		source = ''.join(cell['source'])
+		if cell['cell_type'] == 'markdown':
+			script.append('\n' + ''.join('# '+line if line.strip() else '#\n' for line in source.splitlines(True)) + '\n')
+			continue
+		elif cell['cell_type'] != 'code':
+			continue
+		script.append('\n# In[{0}]:\n\n\n'.format(cell.get('execution_count') or ' '))
+		if source.startswith('%%'):
+			first, _, body = source.partition('\n')
+			name, _, args = first[2:].partition(' ')
+			script.append("get_ipython().run_cell_magic({0!r}, {1!r}, {2!r})\n".format(name, args.strip(), body))
+		else:
+			in_string = False
+			for line in source.splitlines():
+				match = LINE_MAGIC.match(line)
+				if match is not None and not in_string:
+					indent, kind, name, args = match.groups()
+					if kind == '%':
+						line = "{0}get_ipython().run_line_magic({1!r}, {2!r})".format(indent, name, args)
+					else:
+						line = "{0}get_ipython().system({1!r})".format(indent, (name+' '+args).strip())
+				elif (line.count("'''") + line.count('"""')) % 2 == 1:		# multi-line string opened or closed
+					in_string = not in_string
+				script.append(line+'\n')
+		script.append('\n\n')
+	with open(pyfile, 'w') as f:
+		f.write(''.join(script))
+
+
+def _string_lines(source):
+	''' returns: set of the line numbers continuing a multi-line string (or f-string) of source '''
+	lines = set()
+	fstring_start = getattr(tokenize, 'FSTRING_START', None)		# python >= 3.12 tokenizes f-strings in parts
+	fstring_end = getattr(tokenize, 'FSTRING_END', None)
+	starts = []
+	for token in tokenize.generate_tokens(io.StringIO(source).readline):
+		if token.type == tokenize.STRING and token.start[0] != token.end[0]:
+			lines.update(range(token.start[0]+1, token.end[0]+1))
+		elif token.type == fstring_start:
+			starts.append(token.start[0])
+		elif token.type == fstring_end:
+			start = starts.pop()
+			lines.update(range(start+1, token.end[0]+1))
+	return(lines)
+
+
+def guard_main(filename):
+	''' Moves the top-level code of a converted notebook under `if __name__ == "__main__":` so the
+		stage module is imported without side effects (main.py runs it as __main__ with runpy).
+		Lines continuing a multi-line string are left as they are, indenting them would change the string.
+		The stage's functions are defined in __main__: its process pools rely on the fork start method
+		(main.py selects it).
+	'''
+	with open(filename, 'r') as f:
+		source = f.read()
+	in_string = _string_lines(source)
+
+	lines = source.splitlines(True)
+	header = 0
+	while header < len(lines) and lines[header].startswith('#'):		# shebang & encoding lines
+		header += 1
+	guarded = lines[:header] + ['\n', 'if __name__ == "__main__":\n', '    pass\n']
+	for lineno, line in enumerate(lines[header:], start=header+1):
+		if lineno in in_string or line.strip() == '':
+			guarded.append(line)
+		else:
+			guarded.append('    '+line)
+	with open(filename, 'w') as f:
+		f.write(''.join(guarded))
+
+
 def __build():
 	print("building...")
 
@@ -138,6 +232,22 @@ def __build():
 	notebooks = glob.glob(os.path.join(DIRNAME,'src','*.ipynb'))
 	
 	for notebook in notebooks:
+		ext_regex = re.compile(r"(.*).ipynb$")
+		pyfile = ext_regex.sub( "\\1.py", os.path.basename(notebook) )
+
+		if 'jupyter' in MISSING_OPTIONAL:
+			try:
+				notebook_to_script(notebook, os.path.join(DIRNAME,BUILD_DIR,pyfile))
+				guard_main(os.path.join(DIRNAME,BUILD_DIR,pyfile))
+			except KeyboardInterrupt as usr_canx:
+				raise(usr_canx)
+			except Exception as err:
+				eprint(err)
+				hit_error("ERROR: conversion of {} failed.".format(os.path.basename(notebook)))
+			else:
+				if VERBOSE == True:
+					print("BUILD: added {}".format(os.path.join(os.path.basename(DIRNAME),BUILD_DIR,pyfile)))
+			continue
 
 		# jupyter nbconvert --to script [YOUR_NOTEBOOK].ipynb
 		# jupyter nbconvert $loglevel --to script "$filename"
@@ -184,13 +294,12 @@ def __build():
 			exit(2)
 
 		else:
-			ext_regex = re.compile(r"(.*).ipynb$")
-			pyfile = ext_regex.sub( "\\1.py", os.path.basename(notebook) )
 			try:
 				shutil.move(
 					os.path.join(DIRNAME,'src',pyfile),
 					os.path.join(DIRNAME,BUILD_DIR,pyfile)
 				)
+				guard_main(os.path.join(DIRNAME,BUILD_DIR,pyfile))
 			except KeyboardInterrupt as usr_canx:
 				raise(usr_canx)
 			except Exception as err:
@@ -273,6 +382,7 @@ if __name__ == "__main__":
 	VERBOSE = False
 	MODE_QUIET = False
 	error_count = 0		# prevent evironment pollution
+	MISSING_OPTIONAL = set()
 	os_version = platform.system()
 
 	# ------------------------------
@@ -0,0 +1,179 @@
+#!/usr/bin/python
+
+import os
+import json
+import numpy as np
+import pandas as pd
+
+SEASONS = ['DJF', 'MAM', 'JJA', 'SON']
+ENSEMBLE_MONTHLY = 'ensemble_monthly.npy'     # float32 (stations x quantiles x months)
+ENSEMBLE_SEASONAL = 'ensemble_seasonal.npy'   # float32 (stations x quantiles x seasons), cumulative seasonal rainfall
+ENSEMBLE_META = 'ensemble.json'               # stations, quantiles, months & seasons of the arrays
+
+
+def simulate_paths(results, months, repetitions, exog_forecast=None, skip=0, random_state=None):
+    ''' Simulates future paths of a fitted state space model (e.g. SARIMAX), every path at once:
+        the state recursion advances a (states x repetitions) matrix one month at a time, starting
+        from a draw of the state predicted after the last observation.
+        args: results = fitted statsmodels MLEResults
+              months = number of months simulated after skip
+              repetitions = number of paths
+              exog_forecast = (skip+months x exog) array of the future exog values, None without exog
+                              (exog values are taken as known, their uncertainty is not simulated)
+              skip = months simulated between the end of the data and the first kept month
+              random_state = numpy RandomState or seed
+        returns: (repetitions x months) numpy array
+    '''
+    rs = random_state if isinstance(random_state, np.random.RandomState) else np.random.RandomState(random_state)
+    fr = results.filter_results
+    design, transition, selection = fr.design[..., -1], fr.transition[..., -1], fr.selection[..., -1]
+    state_intercept, obs_cov, state_cov = fr.state_intercept[:, -1:], fr.obs_cov[..., -1], fr.state_cov[..., -1]
+    steps = skip + months
+
+    if getattr(results.model, 'k_exog', 0) > 0:
+        if exog_forecast is None:
+            raise ValueError("Model has exogenous variables, exog_forecast is required")
+        k_trend = getattr(results.model, 'k_trend', 0)
+        beta = np.asarray(results.params)[k_trend:k_trend+results.model.k_exog]
+        obs_intercept = np.asarray(exog_forecast, dtype=float).reshape(steps, -1) @ beta.reshape(-1, 1)
+    else:
+        obs_intercept = np.full((steps, 1), fr.obs_intercept[0, -1])
+
+    state = fr.predicted_state[:, -1:] + _cov_root(fr.predicted_state_cov[..., -1]) @ rs.standard_normal((fr.k_states, repetitions))
+    state_shock = selection @ _cov_root(state_cov)
+    obs_shock = _cov_root(obs_cov)
+    measurement_error = np.any(obs_shock != 0)
+
+    paths = np.empty((repetitions, months))
+    for t in range(steps):
+        y = design @ state + obs_intercept[t]
+        if measurement_error:
+            y += obs_shock @ rs.standard_normal((obs_shock.shape[1], repetitions))
+        if t >= skip:
+            paths[:, t-skip] = y[0]
+        state = transition @ state + state_intercept + state_shock @ rs.standard_normal((state_shock.shape[1], repetitions))
+    return(paths)
+
+
+def _cov_root(cov):
+    ''' returns: matrix root L of a covariance matrix (L @ L.T = cov), tolerating semidefinite matrices '''
+    values, vectors = np.linalg.eigh((cov + cov.T) / 2)
+    return(vectors * np.sqrt(np.clip(values, 0, None)))
+
+
+def season_matrix(dates):
+    ''' Indicator matrix summing monthly values into meteorological seasons (DJF counted in the
+        year of its January), only seasons with all 3 months inside dates are kept
+        args: dates = DatetimeIndex of consecutive months
+        returns: ((months x seasons) float array, list of season labels e.g. 'JJA 2019')
+    '''
+    dates = pd.DatetimeIndex(dates)
+    years = dates.year.values + (dates.month.values == 12)
+    seasons = (dates.month.values % 12) // 3
+    keys = years*len(SEASONS) + seasons
+    unique, counts = np.unique(keys, return_counts=True)
+    unique = unique[counts == 3]
+    matrix = (keys[:, None] == unique[None, :]).astype(float)
+    return(matrix, [ "{0} {1}".format(SEASONS[key % len(SEASONS)], key // len(SEASONS)) for key in unique ])
+
+
+def path_quantiles(paths, quantiles, seasons):
+    ''' Quantiles of the simulated monthly rainfall & of the cumulative rainfall of every season
+        args: paths = (repetitions x months) array from simulate_paths()
+              quantiles = sequence of quantiles (0-1)
+              seasons = (months x seasons) matrix from season_matrix()
+        returns: ((quantiles x months), (quantiles x seasons)) float32 arrays
+    '''
+    q = 100 * np.asarray(quantiles, dtype=float)
+    monthly = np.percentile(paths, q, axis=0)
+    seasonal = np.percentile(paths @ seasons, q, axis=0)
+    return(monthly.astype(np.float32), seasonal.astype(np.float32))
+
+
+class QuantileWriter:
+    ''' Streams the quantiles of every station's ensemble to memory-mapped .npy files as they
+        arrive, so only the stations written since the last flush are held in memory.  Files are
+        written under temporary names and moved into place on close().
+    '''
+
+    def __init__(self, dirname, stations, quantiles, months, seasons, flush_every=8):
+        ''' args: dirname = destination directory
+                  stations = station names, in file order
+                  quantiles = sequence of quantiles (0-1)
+                  months = DatetimeIndex of the forecast months
+                  seasons = season labels from season_matrix()
+                  flush_every = number of stations written between flushes to disk
+        '''
+        self.dirname = dirname
+        self.stations = list(stations)
+        self.positions = { station: i for i, station in enumerate(self.stations) }
+        self.quantiles = [ float(q) for q in quantiles ]
+        self.months = pd.DatetimeIndex(months)
+        self.seasons = list(seasons)
+        self.flush_every = flush_every
+        self.written = np.zeros(len(self.stations), dtype=bool)
+        self._pending = 0
+        self._tmp = { name: "{0}.{1}.tmp.npy".format(os.path.join(dirname, name), os.getpid())
+                      for name in (ENSEMBLE_MONTHLY, ENSEMBLE_SEASONAL) }
+        self.monthly = self._open(ENSEMBLE_MONTHLY, len(self.months))
+        self.seasonal = self._open(ENSEMBLE_SEASONAL, len(self.seasons))
+
+
+    def _open(self, name, width):
+        array = np.lib.format.open_memmap(self._tmp[name], mode='w+', dtype=np.float32,
+                                          shape=(len(self.stations), len(self.quantiles), width))
+        array[:] = np.nan
+        return(array)
+
+
+    def write(self, station, monthly, seasonal):
+        ''' args: station = station name
+                  monthly, seasonal = arrays returned by path_quantiles()
+        '''
+        i = self.positions[station]
+        self.monthly[i] = monthly
+        self.seasonal[i] = seasonal
+        self.written[i] = True
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+
+    def flush(self):
+        self.monthly.flush()
+        self.seasonal.flush()
+        self._pending = 0
+
+
+    def close(self):
+        ''' Flushes the arrays & moves them into place with their metadata (stations never written stay NaN) '''
+        self.flush()
+        del self.monthly, self.seasonal
+        meta = {
+            'stations': self.stations,
+            'written': self.written.tolist(),
+            'quantiles': self.quantiles,
+            'months': [ date.strftime('%Y-%m-%d') for date in self.months ],
+            'seasons': self.seasons
+        }
+        meta_filename = os.path.join(self.dirname, ENSEMBLE_META)
+        tmp_meta = "{0}.{1}.tmp".format(meta_filename, os.getpid())
+        with open(tmp_meta, 'w') as f:
+            f.write(json.dumps(meta, indent=1)+'\n')
+        for name, tmp_filename in self._tmp.items():
+            os.replace(tmp_filename, os.path.join(self.dirname, name))
+        os.replace(tmp_meta, meta_filename)
+
+
+def read_station_quantiles(dirname, station):
+    ''' Reads one station's ensemble quantiles written by QuantileWriter (memory-mapped, the other
+        stations are not read)
+        returns: (monthly, seasonal) DataFrames, indexed by month / season with a column per quantile
+    '''
+    with open(os.path.join(dirname, ENSEMBLE_META), 'r') as f:
+        meta = json.loads(f.read())
+    i = meta['stations'].index(station)
+    monthly = np.load(os.path.join(dirname, ENSEMBLE_MONTHLY), mmap_mode='r')[i]
+    seasonal = np.load(os.path.join(dirname, ENSEMBLE_SEASONAL), mmap_mode='r')[i]
+    return(pd.DataFrame(np.array(monthly.T), index=pd.DatetimeIndex(pd.to_datetime(meta['months'])), columns=meta['quantiles']),
+           pd.DataFrame(np.array(seasonal.T), index=meta['seasons'], columns=meta['quantiles']))
@@ -0,0 +1,102 @@
+#!/usr/bin/python
+
+import hashlib
+import inspect
+import numpy as np
+import pandas as pd
+
+# keyword of DataFrame.to_csv's line terminator (renamed in pandas 1.5)
+_LINETERMINATOR = 'lineterminator' if 'lineterminator' in inspect.signature(pd.DataFrame.to_csv).parameters else 'line_terminator'
+
+
+def _update_array(hash_obj, arr):
+    ''' feeds dtype, shape and the raw buffer of a numpy array into hash_obj (no copy when contiguous) '''
+    arr = np.ascontiguousarray(arr)
+    if arr.dtype == object:
+        hash_obj.update(bytes(repr(arr.tolist()), 'utf-8'))
+        return
+    hash_obj.update(bytes("{0}{1}".format(arr.dtype.str, arr.shape), 'utf-8'))
+    hash_obj.update(memoryview(arr).cast('B'))
+
+
+def _update_index(hash_obj, index):
+    if isinstance(index, pd.DatetimeIndex):
+        hash_obj.update(b'DatetimeIndex')
+        _update_array(hash_obj, index.asi8)             # int64 view of the timestamps
+    else:
+        hash_obj.update(bytes(type(index).__name__, 'utf-8'))
+        _update_array(hash_obj, np.asarray(index))
+
+
+def column_fingerprint(series):
+    ''' Content hash of one location's data: name, index and raw values buffer
+        args: series = pandas Series
+        returns: STRING sha1 hex digest
+    '''
+    hash_obj = hashlib.sha1()
+    hash_obj.update(bytes(repr(series.name), 'utf-8'))
+    _update_index(hash_obj, series.index)
+    _update_array(hash_obj, series.values)
+    return(hash_obj.hexdigest())
+
+
+def index_fingerprint(index):
+    ''' Content hash of an index (e.g. the months of the rainfall data)
+        returns: STRING sha1 hex digest
+    '''
+    hash_obj = hashlib.sha1()
+    _update_index(hash_obj, index)
+    return(hash_obj.hexdigest())
+
+
+def combine(fingerprints):
+    ''' Order-sensitive hash of several column fingerprints
+        returns: STRING sha1 hex digest
+    '''
+    return(hashlib.sha1( bytes('|'.join(fingerprints), 'utf-8') ).hexdigest())
+
+
+def legacy_sha1(data):
+    ''' Hash used before content fingerprints (sha1 of the csv text), for migrating stored results.
+        The csv is written as pandas 0.25 wrote it: Series without a header row, DataFrames with
+        the index name & column names, '%Y-%m-%d' dates, shortest repr floats, empty NaN & '\\n' lines.
+        The values must be parsed the way they were then (see read_legacy_csv()).
+    '''
+    options = { 'date_format': '%Y-%m-%d', 'float_format': None, 'na_rep': '', _LINETERMINATOR: '\n' }
+    csv = data.to_csv(header=False, **options) if isinstance(data, pd.Series) else data.to_csv(header=True, index=True, **options)
+    return(hashlib.sha1( bytes(csv, 'utf-8') ).hexdigest())
+
+
+def read_legacy_csv(filename):
+    ''' Reads a rainfall csv (e.g. rainfalldata.csv) as pandas < 1.3 parsed it, for legacy_sha1().
+        Its default float parser was not round-trip exact: the legacy hashes of values with many 
+        digits (filled months) are only reproduced from values parsed by the same parser.
+        returns: DataFrame indexed by date
+    '''
+    try:
+        data = pd.read_csv(filename, float_precision='legacy')
+    except ValueError:                                      # pandas < 1.3, the legacy parser is the default
+        data = pd.read_csv(filename)
+    data.Date = pd.to_datetime(data.Date)
+    return(data.set_index('Date'))
+
+
+class Fingerprinter:
+    ''' Memoized per-column fingerprints of a rainfall DataFrame.  Each column is hashed at most
+        once; combinations of exogenous locations are built from the column hashes.
+        The DataFrame is expected to stay unchanged for the life of the object.
+    '''
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._memo = {}
+
+    def column(self, name):
+        ''' returns: STRING fingerprint of the frame's column `name` '''
+        if name not in self._memo:
+            self._memo[name] = column_fingerprint(self.frame[name])
+        return(self._memo[name])
+
+    def combination(self, names):
+        ''' returns: STRING fingerprint of the frame's columns `names` (in order) '''
+        return(combine([ self.column(name) for name in names ]))
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+
+import os
+import numpy as np
+import pandas as pd
+
+FORECAST_FILE = 'predictions.npz'
+FILE_VERSION = 1
+BOUNDS = ('', 'lower ', 'upper ')          # column name prefixes of the forecast, lower & upper bound
+
+
+def write_forecasts(filename, forecasts):
+    ''' Writes forecasts as a compressed columnar file: one float32 (3 x months) array per station
+        (forecast, lower & upper bound) plus the station index & the months, so a station's series
+        is read without reading the others (see read_station())
+        args: filename = destination .npz file
+              forecasts = DataFrame in the predictions.csv layout (index = months, columns = every
+                          station's name, 'lower name' & 'upper name')
+        returns: list of the stations written
+    '''
+    columns = list(forecasts.columns)
+    if len(columns) % len(BOUNDS) != 0:
+        raise ValueError("Forecast columns must be (station, lower station, upper station) triples. Provided {0} columns".format(len(columns)))
+    stations = columns[::len(BOUNDS)]
+    arrays = {}
+    for i, station in enumerate(stations):
+        names = [ prefix+station for prefix in BOUNDS ]
+        if columns[i*len(BOUNDS):(i+1)*len(BOUNDS)] != names:
+            raise ValueError("Forecast columns of {0} must be {1}".format(station, names))
+        arrays['s{0}'.format(i)] = np.ascontiguousarray(forecasts[names].values.T, dtype=np.float32)
+
+    tmp_filename = "{0}.{1}.tmp.npz".format(filename, os.getpid())
+    np.savez_compressed(tmp_filename, version=FILE_VERSION, stations=np.array(stations, dtype=str),
+                        months=pd.DatetimeIndex(forecasts.index).values.astype('datetime64[D]'), **arrays)
+    os.replace(tmp_filename, filename)                     # readers never see a partial file
+    return(stations)
+
+
+def forecast_stations(filename):
+    ''' returns: list of the stations of a forecast file '''
+    with np.load(filename, allow_pickle=False) as stored:
+        return(list(_positions(stored)))
+
+
+def read_station(filename, station):
+    ''' Reads one station's series from a file written by write_forecasts()
+        args: filename = forecast .npz file
+              station = station name
+        returns: DataFrame indexed by month with the station's forecast, lower & upper bound columns
+    '''
+    with np.load(filename, allow_pickle=False) as stored:
+        values = stored['s{0}'.format(_positions(stored)[station])]
+        months = pd.DatetimeIndex(stored['months'])
+    return(pd.DataFrame(values.T, index=months, columns=[ prefix+station for prefix in BOUNDS ]))
+
+
+def read_forecasts(filename, stations=None):
+    ''' Reads a file written by write_forecasts() back into the predictions.csv layout
+        args: filename = forecast .npz file
+              stations = optional list of the stations to read [Default = every station]
+        returns: DataFrame indexed by month with every station's forecast, lower & upper bound columns
+    '''
+    with np.load(filename, allow_pickle=False) as stored:
+        positions = _positions(stored)
+        stations = list(positions) if stations is None else list(stations)
+        values = [ stored['s{0}'.format(positions[station])] for station in stations ]
+        months = pd.DatetimeIndex(stored['months'])
+    values = np.vstack(values).T if len(values) > 0 else np.empty((len(months), 0), dtype=np.float32)
+    return(pd.DataFrame(values, index=months, columns=[ prefix+station for station in stations for prefix in BOUNDS ]))
+
+
+def _positions(stored):
+    ''' returns: dictionary of station name -> number of its array, in file order '''
+    if int(stored['version']) != FILE_VERSION:
+        raise ValueError("Unsupported forecast file version {0}".format(int(stored['version'])))
+    return({ str(station): i for i, station in enumerate(stored['stations']) })
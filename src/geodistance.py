@@ -0,0 +1,136 @@
+#!/usr/bin/python
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371
+
+
+def coordinates(lldf):
+    ''' Extracts float latitude & longitude arrays from the latitude, longitude dataframe
+        args: lldf = DataFrame indexed by location name, first column holding [lat, long] pairs
+                     (strings or numbers), as built from latlong.csv
+        returns: (latitudes, longitudes) numpy arrays in degrees
+    '''
+    pairs = np.array([ [float(lat), float(lon)] for lat, lon in (value[:2] for value in lldf.iloc[:, 0]) ])
+    pairs = pairs.reshape(-1, 2)
+    return(pairs[:, 0], pairs[:, 1])
+
+
+def haversine_matrix(lat1, lon1, lat2=None, lon2=None, chunk_size=1024):
+    ''' Great-circle distances between every pair of points of two sets, computed with numpy
+        broadcasting one block of chunk_size rows at a time (bounded temporary memory for
+        thousands of stations)
+        args: lat1, lon1 = degrees of the row points
+              lat2, lon2 = degrees of the column points [Default = row points]
+              chunk_size = number of row points per block
+        returns: (len(lat1) x len(lat2)) numpy array of distances in kilometers
+    '''
+    lat1 = np.radians(np.asarray(lat1, dtype=float))
+    lon1 = np.radians(np.asarray(lon1, dtype=float))
+    if lat2 is None:
+        lat2, lon2 = lat1, lon1
+    else:
+        lat2 = np.radians(np.asarray(lat2, dtype=float))
+        lon2 = np.radians(np.asarray(lon2, dtype=float))
+    cos_lat2 = np.cos(lat2)
+
+    distances = np.empty((lat1.shape[0], lat2.shape[0]))
+    for start in range(0, lat1.shape[0], chunk_size):
+        rows = slice(start, start + chunk_size)
+        dlat = lat2[np.newaxis, :] - lat1[rows, np.newaxis]
+        dlon = lon2[np.newaxis, :] - lon1[rows, np.newaxis]
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat1[rows, np.newaxis]) * cos_lat2[np.newaxis, :] * np.sin(dlon / 2) ** 2
+        distances[rows] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+    return(distances)
+
+
+def distance_frame(lldf, chunk_size=1024):
+    ''' Distance between all locations (the distances.csv layout)
+        args: lldf = latitude, longitude dataframe, see coordinates()
+              chunk_size = see haversine_matrix()
+        returns: square DataFrame of kilometers, index & columns = location names
+    '''
+    lat, lon = coordinates(lldf)
+    return(pd.DataFrame(haversine_matrix(lat, lon, chunk_size=chunk_size), index=lldf.index, columns=lldf.index))
+
+
+class SpatialIndex:
+    ''' Ball tree of the locations on the sphere, answering "which locations are within r km"
+        and "which k locations are closest" without building a full distance matrix.  The tree
+        narrows the candidates, distances are then checked with haversine_matrix() so results
+        agree with thresholding the distance_frame() matrix.  Results are returned in the order
+        of the locations in lldf.
+    '''
+
+    def __init__(self, lldf, leaf_size=40):
+        ''' args: lldf = latitude, longitude dataframe, see coordinates()
+                  leaf_size = ball tree leaf size
+        '''
+        self.names = list(lldf.index)
+        self.lat, self.lon = coordinates(lldf)
+        self._positions = { name: i for i, name in enumerate(self.names) }
+        self._tree = BallTree(np.radians(np.column_stack([self.lat, self.lon])), leaf_size=leaf_size, metric='haversine')
+
+
+    def __len__(self):
+        return(len(self.names))
+
+
+    def __contains__(self, name):
+        return(name in self._positions)
+
+
+    def within(self, name, radius_km, candidates=None):
+        ''' Locations within radius_km of a location (itself included)
+            args: name = location name
+                  radius_km = search radius in kilometers, inclusive
+                  candidates = optional collection of location names the result is limited to
+            returns: list of location names
+        '''
+        return([ n for n, _ in self.within_distances(name, radius_km, candidates) ])
+
+
+    def within_distances(self, name, radius_km, candidates=None):
+        ''' within() with the distances
+            returns: list of (location name, kilometers) tuples
+        '''
+        positions, distances = self._radius_query(self._positions[name], radius_km)
+        found = [ (self.names[i], float(d)) for i, d in zip(positions, distances) ]
+        if candidates is not None:
+            candidates = set(candidates)
+            found = [ (n, d) for n, d in found if n in candidates ]
+        return(found)
+
+
+    def nearest(self, name, k, include_self=False):
+        ''' k closest locations to a location
+            args: name = location name
+                  k = number of locations to return
+                  include_self = whether the location itself counts as one of the k
+            returns: list of (location name, kilometers) tuples, closest first
+        '''
+        i = self._positions[name]
+        k = min(k + (0 if include_self else 1), len(self.names))
+        _, positions = self._tree.query(np.radians([[self.lat[i], self.lon[i]]]), k=k)
+        positions = [ j for j in positions[0] if include_self or j != i ]
+        distances = haversine_matrix(self.lat[[i]], self.lon[[i]], self.lat[positions], self.lon[positions])[0]
+        order = np.argsort(distances, kind='mergesort')
+        return([ (self.names[positions[j]], float(distances[j])) for j in order ][:k - (0 if include_self else 1)])
+
+
+    def neighbors(self, names, radius_km, candidates=None):
+        ''' within() for several locations
+            returns: dictionary of location name -> list of location names
+        '''
+        return({ name: self.within(name, radius_km, candidates) for name in names })
+
+
+    def _radius_query(self, i, radius_km):
+        point = np.radians([[self.lat[i], self.lon[i]]])
+        margin = 1e-9 * radius_km + 1e-9             # tree distances may differ in the last bits
+        positions = np.sort(self._tree.query_radius(point, r=(radius_km + margin) / EARTH_RADIUS_KM)[0])
+        distances = haversine_matrix(self.lat[[i]], self.lon[[i]], self.lat[positions], self.lon[positions])[0]
+        keep = distances <= radius_km
+        return(positions[keep], distances[keep])
@@ -0,0 +1,338 @@
+#!/usr/bin/python
+
+import os
+import sys
+import math
+import time
+import signal
+import warnings
+import getpass
+import argparse
+import numpy as np
+import pandas as pd
+from walkforward import WalkForward, walk_forward, resume_walk_forward, order_key, parse_order_key, DEFAULT_ORDER, DEFAULT_SEASONAL_ORDER
+from resultstore import open_store
+from scheduler import TaskScheduler
+from fingerprint import column_fingerprint
+from rainfallcache import load_rainfall
+
+LEADERBOARD_FILE = 'hyperparameter_combinations.csv'                    # exhaustive search, every order
+HALVING_LEADERBOARD_FILE = 'hyperparameter_combinations_halving.csv'    # successive halving, the last rung's orders
+LEADERBOARD_COLUMNS = ['p (AR)', 'q (MA)', 'P (AR -Seasonal)', 'Q (MA -seasonal)', 'Mean Absolute Error']
+
+
+def order_grid(it=5, d=0, D=0, m=12):
+    ''' Every combination of p, q, P & Q from 0 to it-1, in the order of Data_Story's iteration_hyper()
+        args: it = number of values of each order
+              d, D, m = fixed trend difference, seasonal difference & season length
+        returns: list of ((p,d,q), (P,D,Q,m)) tuples
+    '''
+    return([ ((p, d, q), (P, D, Q, m)) for p in range(it) for q in range(it) for P in range(it) for Q in range(it) ])
+
+
+def order_size(order, seasonal_order):
+    ''' returns: INT number of AR & MA coefficients of an order (p+q+P+Q), a measure of its fitting cost '''
+    return(order[0] + order[2] + seasonal_order[0] + seasonal_order[2])
+
+
+def evaluate_order(endog, split, order, seasonal_order, refit_every=1, resume=None):
+    ''' One-step-ahead walk-forward of a SARIMA order over endog[split:], the evaluation of
+        hyperparameter_find(): every forecast month is appended to the history and the model is
+        fit again every refit_every months (warm-started from the previous fit)
+        args: endog = 1-D array of the location's rainfall, training & validation months
+              split = number of training months
+              order = (p,d,q)
+              seasonal_order = (P,D,Q,m)
+              refit_every = see WalkForward, None = fit once then only filter the new months
+              resume = earlier result of this function over fewer validation months, the walk-forward
+                       is continued from it (same forecasts as walking over every month at once)
+        returns: dictionary { 'mae', 'params', 'predictions', 'seconds' }
+    '''
+    started = time.time()
+    endog = np.asarray(endog, dtype=float).reshape(-1)
+    engine = WalkForward(order=order, seasonal_order=seasonal_order, refit_every=refit_every)
+    if resume is None:
+        previous, seconds = np.empty(0), 0.0
+        walk = walk_forward(endog, split, engine=engine)
+    else:
+        previous, seconds = np.asarray(resume['predictions'], dtype=float), resume['seconds'] or 0.0
+        # months appended since the last fit of the earlier walk, including the last forecast month
+        since_fit = 0 if refit_every is None else (len(previous)-1) % refit_every + 1
+        walk = resume_walk_forward(endog, split+len(previous), resume['params'], engine=engine, since_fit=since_fit)
+    predictions = np.concatenate([previous, [ prediction for date, prediction in walk ]])
+    return({
+        'mae': float(np.mean(np.abs(endog[split:] - predictions))),
+        'params': np.asarray(engine.params),
+        'predictions': predictions,
+        'seconds': seconds + time.time() - started
+    })
+
+
+def _evaluate_task(store_filename, target, search, data_hash, endog, split, order, seasonal_order, refit_every, resume=None):
+    ''' worker task: evaluates an order and checkpoints it to the results store '''
+    result = evaluate_order(endog, split, order, seasonal_order, refit_every, resume)
+    store = open_store(store_filename)
+    store.put_order_result(target, search, order_key(order, seasonal_order), data_hash, result['mae'],
+                           result['params'], result['predictions'], result['seconds'])
+    store.close()
+    return((target, order_key(order, seasonal_order), result['mae']))
+
+
+def _init_worker():
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Turn off interrupt signal to child process
+    warnings.filterwarnings("ignore")             # convergence warnings of the larger orders
+
+
+def search_name(split, end, refit_every):
+    ''' returns: STRING name of a search in the results store (evaluation window & refit cadence) '''
+    return("months {0}-{1}, refit every {2}".format(split, end, refit_every))
+
+
+def evaluate_orders(series, split, months, orders, store, end=None, refit_every=1, processes=None):
+    ''' Evaluates SARIMA orders over the first `months` validation months on a process pool.  Each
+        result is checkpointed to the results store as soon as it is found; orders already evaluated
+        on the same data are read from the store, orders evaluated over fewer months are continued
+        from where they stopped.  An interrupted evaluation resumes where it stopped.
+        args: series = rainfall Series of the location (name = location name)
+              split = number of training months
+              months = number of validation months to evaluate
+              orders = list of (order, seasonal_order) tuples
+              store = ResultStore to checkpoint to
+              end = end (exclusive) of the search's validation months, names the search in the store
+                    [Default = split+months]
+              refit_every = see evaluate_order()
+              processes = number of worker processes [Default = # of CPU cores minus 1]
+        returns: dictionary of order_key() -> mae over the first `months` validation months
+                 (orders that failed to evaluate are left out)
+    '''
+    return(_evaluate_locations([(series, orders)], split, months, store, end, refit_every, processes)[series.name])
+
+
+def _evaluate_locations(jobs, split, months, store, end, refit_every, processes):
+    ''' evaluate_orders() of several locations on a single process pool
+        args: jobs = list of (series, orders) tuples
+        returns: dictionary of location name -> evaluate_orders() result
+    '''
+    end = split + months if end is None else end
+    search = search_name(split, end, refit_every)
+    maes, todo = {}, []
+    for series, orders in jobs:
+        target = series.name
+        endog = np.asarray(series.values[:split+months], dtype=float)
+        data_hash = column_fingerprint(series.iloc[:end])
+        stored = store.order_results(target, search, data_hash)
+        maes[target] = {}
+        for order, seasonal_order in orders:
+            key = order_key(order, seasonal_order)
+            result = stored.get(key)
+            if result is not None and result['months'] >= months:      # running mae of the first months
+                maes[target][key] = float(np.mean(np.abs(endog[split:] - result['predictions'][:months])))
+            else:
+                todo.append((target, endog, data_hash, order, seasonal_order, result))
+    total = sum(len(orders) for series, orders in jobs)
+    print("[HYPERSEARCH] {0}: {1} of {2} orders to evaluate over {3} months ({4} read from the results store)".format(
+          jobs[0][0].name if len(jobs) == 1 else "{0} locations".format(len(jobs)), len(todo), total, months, total-len(todo)), flush=True)
+
+    def on_result(result):
+        target, key, mae = result
+        print("[HYPERSEARCH] {0} {1} {2}".format(target, key, mae), flush=True)
+        maes[target][key] = mae
+
+    def on_error(err):
+        print("[HYPERSEARCH] ERROR: {0}".format(err), flush=True)
+
+    if len(todo) > 0:
+        scheduler = TaskScheduler(processes=processes, initializer=_init_worker)
+        for target, endog, data_hash, order, seasonal_order, resume in todo:
+            walked = 0 if resume is None else resume['months']
+            scheduler.add((target, order_key(order, seasonal_order)), _evaluate_task,
+                          args=(store.filename, target, search, data_hash, endog, split, order, seasonal_order, refit_every, resume),
+                          cost=(months-walked)*(1+sum(order)+sum(seasonal_order[:3])),     # more parameters, longer fits
+                          callback=on_result, error_callback=on_error)
+        scheduler.run()
+    return(maes)
+
+
+def search_orders(series, split, end=None, grid=None, store=None, refit_every=1, processes=None):
+    ''' Parallel, resumable SARIMA order grid search of one location: every order is evaluated over
+        every validation month (see evaluate_orders())
+        args: series = rainfall Series of the location (name = location name)
+              split = number of training months
+              end = end (exclusive) of the validation months [Default = len(series)]
+              grid = list of (order, seasonal_order) tuples [Default = order_grid(5)]
+              store = ResultStore to checkpoint to
+              refit_every, processes = see evaluate_orders()
+        returns: DataFrame of the grid (p, d, q, P, D, Q, m, months, mae), in grid order
+    '''
+    end = len(series) if end is None else end
+    grid = order_grid(5) if grid is None else grid
+    maes = evaluate_orders(series, split, end-split, grid, store, end, refit_every, processes)
+    return(_results_frame(grid, { key: (end-split, mae) for key, mae in maes.items() }))
+
+
+def halving_search(series, split, end=None, grid=None, store=None, refit_every=1, processes=None, min_months=6, eta=3):
+    ''' Successive halving version of search_orders(): every order is evaluated over the first
+        min_months validation months, then only the best 1/eta of the orders (by mae so far) are
+        evaluated over eta times more months, and so on until the survivors are evaluated over every
+        validation month.  Survivors continue their walk-forward instead of starting over.
+        args: series, split, end, grid, store, refit_every, processes = see search_orders()
+              min_months = validation months of the first rung
+              eta = factor of the months of a rung over the previous one, 1/eta of the orders survive each rung
+        returns: DataFrame of the grid (p, d, q, P, D, Q, m, months, mae), in grid order.  months is the
+                 number of validation months an order was evaluated over before it was dropped, mae is
+                 its mae over those months
+    '''
+    end = len(series) if end is None else end
+    grid = order_grid(5) if grid is None else grid
+    evaluated = _halving([series], split, end, grid, store, refit_every, processes, min_months, eta)
+    return(_results_frame(grid, evaluated[series.name]))
+
+
+def _halving(locations, split, end, grid, store, refit_every, processes, min_months, eta, keep=()):
+    ''' halving_search() of several locations, each rung of every location on a single process pool
+        args: locations = list of rainfall Series
+              keep = orders never dropped (e.g. a baseline every other order is compared to)
+        returns: dictionary of location name -> { order_key: (months, mae) }
+    '''
+    if eta < 2 or min_months < 1:
+        raise ValueError("eta must be at least 2 & min_months at least 1. Provided eta={0}, min_months={1}".format(eta, min_months))
+    rungs = [min_months]
+    while rungs[-1]*eta < end-split:
+        rungs.append(rungs[-1]*eta)
+    rungs = [ months for months in rungs if months < end-split ] + [end-split]
+    keep = [ order_key(order, seasonal_order) for order, seasonal_order in keep ]
+
+    evaluated = { series.name: {} for series in locations }     # location -> order_key -> (months, mae)
+    candidates = { series.name: list(grid) for series in locations }
+    for rung, months in enumerate(rungs):
+        maes = _evaluate_locations([ (series, candidates[series.name]) for series in locations ],
+                                   split, months, store, end, refit_every, processes)
+        for series in locations:
+            found = maes[series.name]
+            evaluated[series.name].update({ key: (months, mae) for key, mae in found.items() })
+            remaining = [ c for c in candidates[series.name] if order_key(*c) in found ]
+            if months < end-split:
+                survivors = max(1, math.ceil(len(remaining)/eta))
+                ranked = sorted(remaining, key=lambda c: found[order_key(*c)])        # stable: grid order on ties
+                remaining = [ c for c in ranked if c in ranked[:survivors] or order_key(*c) in keep ]
+            candidates[series.name] = remaining
+        if months < end-split:
+            print("[HYPERSEARCH] rung {0} ({1} months): {2} orders kept".format(
+                  rung+1, months, sum(len(c) for c in candidates.values())), flush=True)
+    return(evaluated)
+
+
+def select_orders(data, locations, split, end=None, grid=None, store=None, baseline=(DEFAULT_ORDER, DEFAULT_SEASONAL_ORDER),
+                  refit_every=1, processes=None, min_months=6, eta=3):
+    ''' Per-location SARIMA order selection: halving_search() of every location at once (one process
+        pool for all of them), with the baseline order evaluated over every validation month of every
+        location.  The order chosen for a location is the one with the fewest parameters among the
+        orders matching or beating the baseline's mae (lowest mae on ties), so the cheapest adequate
+        model is used.  Chosen orders are saved to the results store when given (see ResultStore.orders()).
+        args: data = rainfall DataFrame
+              locations = column names of the locations to select an order for
+              split, end, grid, store, refit_every, processes, min_months, eta = see halving_search()
+              baseline = (order, seasonal_order) the locations are currently modeled with
+        returns: DataFrame indexed by location of the chosen order ('p,d,q,P,D,Q,m'), its mae & the baseline's mae
+    '''
+    end = data.shape[0] if end is None else end
+    grid = order_grid(5) if grid is None else list(grid)
+    baseline = (tuple(baseline[0]), tuple(baseline[1]))
+    if baseline not in grid:
+        grid.append(baseline)
+    baseline_key = order_key(*baseline)
+    evaluated = _halving([ data[loc] for loc in locations ], split, end, grid, store, refit_every, processes,
+                         min_months, eta, keep=[baseline])
+
+    search = search_name(split, end, refit_every)
+    rows = []
+    for loc in locations:
+        full = { key: mae for key, (months, mae) in evaluated[loc].items() if months == end-split and not np.isnan(mae) }
+        if baseline_key not in full:
+            print("[HYPERSEARCH] {0}: baseline order could not be evaluated, no order selected".format(loc), flush=True)
+            continue
+        adequate = [ key for key, mae in full.items() if mae <= full[baseline_key] ]
+        chosen = min(adequate, key=lambda key: (order_size(*parse_order_key(key)), full[key]))
+        if store is not None:
+            store.put_order(loc, chosen, full[chosen], full[baseline_key], search, column_fingerprint(data[loc].iloc[:end]))
+        rows.append((loc, chosen, full[chosen], full[baseline_key]))
+    return(pd.DataFrame(rows, columns=['location', 'order', 'mae', 'baseline_mae']).set_index('location'))
+
+
+def _results_frame(grid, evaluated):
+    rows = []
+    for order, seasonal_order in grid:
+        months, mae = evaluated.get(order_key(order, seasonal_order), (0, np.nan))
+        rows.append(tuple(order) + tuple(seasonal_order) + (months, mae))
+    return(pd.DataFrame(rows, columns=['p', 'd', 'q', 'P', 'D', 'Q', 'm', 'months', 'mae']))
+
+
+def write_leaderboard(results, filename):
+    ''' Writes the orders evaluated over every validation month in the hyperparameter_combinations.csv
+        layout (utf-8 with BOM)
+        args: results = DataFrame returned by search_orders() or halving_search()
+              filename = destination csv file
+    '''
+    leaderboard = results[results.months == results.months.max()][['p', 'q', 'P', 'Q', 'mae']].dropna()
+    leaderboard.columns = LEADERBOARD_COLUMNS
+    leaderboard = leaderboard.round({ LEADERBOARD_COLUMNS[-1]: 9 })
+    tmp_filename = "{0}.{1}.tmp".format(filename, os.getpid())
+    leaderboard.to_csv(tmp_filename, index=False, encoding='utf-8-sig')
+    os.replace(tmp_filename, filename)                     # readers never see a partial file
+
+
+def default_destdir():
+    ''' returns: STRING data directory, same choice as the notebooks (service daemon: home directory) '''
+    if getpass.getuser() == "rainfalld":                # service daemon
+        return(os.path.expanduser("~"))
+    app_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return(os.path.join(app_root, 'data', 'manipulated_data'))
+
+
+def main(argv=None):
+    ''' hyperparameter search command, replaces Data_Story's hyperparameter_find() '''
+    parser = argparse.ArgumentParser(description="Parallel, resumable SARIMA order grid search of a location's rainfall")
+    parser.add_argument('--location', default='RALEIGH, NC', help="rainfall data column [Default: %(default)s]")
+    parser.add_argument('--train-end', type=int, default=376, help="number of training months [Default: %(default)s]")
+    parser.add_argument('--validation-end', type=int, default=424, help="end of the validation months [Default: %(default)s]")
+    parser.add_argument('--max-order', type=int, default=5, help="p, q, P & Q are searched from 0 to max-order-1 [Default: %(default)s]")
+    parser.add_argument('--refit-every', type=int, default=1, help="months between refits of the walk-forward [Default: %(default)s]")
+    parser.add_argument('--halving', action='store_true', help="successive halving: drop the worst orders early instead of evaluating every order over every month")
+    parser.add_argument('--min-months', type=int, default=6, help="validation months of the first halving rung [Default: %(default)s]")
+    parser.add_argument('--eta', type=int, default=3, help="1/eta of the orders survive each halving rung [Default: %(default)s]")
+    parser.add_argument('--select-orders', action='store_true', help="select an order for every NC location (successive halving against the global order), saved to the results store")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes [Default: # of CPU cores minus 1]")
+    parser.add_argument('--destdir', default=None, help="directory of the rainfall data & results [Default: data/manipulated_data]")
+    args = parser.parse_args(argv)
+
+    destdir = args.destdir if args.destdir is not None else default_destdir()
+    rd, ncrd = load_rainfall(destdir)
+    store = open_store(os.path.join(destdir, "allMAE.sqlite3"), legacy_json=os.path.join(destdir, "allMAE.json"))
+
+    try:
+        if args.select_orders:
+            selected = select_orders(rd, list(ncrd.columns), args.train_end, args.validation_end, grid=order_grid(args.max_order),
+                                     store=store, refit_every=args.refit_every, processes=args.processes,
+                                     min_months=args.min_months, eta=args.eta)
+            print("[HYPERSEARCH] Selected orders:\n{0}".format(selected.to_string()), flush=True)
+            return(0)
+        elif args.halving:
+            results = halving_search(rd[args.location], args.train_end, args.validation_end, grid=order_grid(args.max_order),
+                                     store=store, refit_every=args.refit_every, processes=args.processes,
+                                     min_months=args.min_months, eta=args.eta)
+        else:
+            results = search_orders(rd[args.location], args.train_end, args.validation_end, grid=order_grid(args.max_order),
+                                    store=store, refit_every=args.refit_every, processes=args.processes)
+    except KeyboardInterrupt:
+        print("MANUAL EXIT: search interrupted, evaluated orders are kept in the results store.", flush=True)
+        return(2)
+
+    # halving leaves most orders unevaluated over every month, the exhaustive leaderboard is kept
+    write_leaderboard(results, os.path.join(destdir, HALVING_LEADERBOARD_FILE if args.halving else LEADERBOARD_FILE))
+    best = results[results.months == results.months.max()].sort_values('mae', kind='mergesort').head(5)
+    print("[HYPERSEARCH] Best orders:\n{0}".format(best.to_string(index=False)), flush=True)
+    return(0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/python
+
+import warnings
+import numpy as np
+from scipy import sparse
+
+
+def fill_missing_months(values, fill_from=12, fill_to=None, two_year_from=24):
+    ''' Fills missing monthly rainfall from the same location's own history: the average of the
+        previous year's, the previous month's and the next month's totals.  When one of them is
+        missing, the value two years before, two months before or two months after is used
+        instead; the remaining NaNs are ignored by the average (a month stays NaN when none are
+        available).
+
+        Every location (column) is filled at once.  Months are processed in order so an earlier
+        filled month is used by the months after it, exactly as filling one month at a time.
+        args: values = 2-D array-like (months x locations), rows must be consecutive months
+              fill_from = first row that may be filled (needs 12 months of history)
+              fill_to = last row that may be filled (needs 2 months after it) [Default = last row - 2]
+              two_year_from = first row allowed to fall back to two years before
+        returns: filled copy of values as a float numpy array
+    '''
+    filled = np.array(values, dtype=float)
+    nrows = filled.shape[0]
+    fill_to = nrows-3 if fill_to is None else fill_to
+    if fill_from < 12 or fill_to > nrows-3 or two_year_from < 24:
+        raise ValueError("Fill window [{0}, {1}] (two years from {2}) needs 12 months before and 2 months after "
+                         "every filled row of {3} rows".format(fill_from, fill_to, two_year_from, nrows))
+
+    missing = np.isnan(filled)
+    rows = np.flatnonzero(missing[fill_from:fill_to+1].any(axis=1)) + fill_from
+    for row in rows:
+        cols = np.flatnonzero(missing[row])
+
+        prev_year = filled[row-12, cols]
+        if row >= two_year_from:
+            prev_year = np.where(np.isnan(prev_year), filled[row-24, cols], prev_year)
+        prev_month = filled[row-1, cols]
+        prev_month = np.where(np.isnan(prev_month), filled[row-2, cols], prev_month)
+        next_month = filled[row+1, cols]
+        next_month = np.where(np.isnan(next_month), filled[row+2, cols], next_month)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)          # all NaN: month stays NaN
+            filled[row, cols] = np.nanmean(np.vstack([prev_year, prev_month, next_month]), axis=0)
+    return(filled)
+
+
+def neighbor_weights(sindex, names, radius_km, power=None, min_km=1.0):
+    ''' Sparse (locations x locations) neighborhood matrix: row i holds the weights of the locations
+        within radius_km of names[i] (itself included), column j is names[j].  Within a row the
+        neighbors are stored in the spatial index's location order.
+        args: sindex = geodistance.SpatialIndex of the locations
+              names = location names, in the column order of the rainfall matrix
+              radius_km = neighborhood radius in kilometers, inclusive
+              power = None for equal weights, otherwise inverse distance weights 1/distance**power
+              min_km = distance floor of inverse distance weights (co-located stations)
+        returns: scipy.sparse.csr_matrix
+    '''
+    names = list(names)
+    positions = { name: j for j, name in enumerate(names) }
+    indptr, indices, data = [0], [], []
+    for name in names:
+        for neighbor, km in sindex.within_distances(name, radius_km, candidates=positions):
+            indices.append(positions[neighbor])
+            if power is None:
+                data.append(1.0)
+            else:
+                data.append(0.0 if neighbor == name else 1.0 / max(km, min_km)**power)
+        indptr.append(len(indices))
+    return(sparse.csr_matrix((np.array(data, dtype=float), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+                             shape=(len(names), len(names))))
+
+
+def fill_from_neighbors(values, weights, method='nanmean'):
+    ''' Fills missing monthly rainfall from the surrounding locations
+        args: values = 2-D array-like (months x locations)
+              weights = neighborhood matrix from neighbor_weights()
+              method = 'nanmean': plain average of the available neighbors, locations filled one after
+                                  the other in column order so earlier fills are averaged into later
+                                  ones (same result as filling cell by cell with np.nanmean)
+                       'weighted': weighted average of the observed neighbors (weights' values), all
+                                   cells at once with one masked sparse product
+        returns: filled copy of values as a float numpy array, months without any available
+                 neighbor stay NaN
+    '''
+    filled = np.array(values, dtype=float)
+    missing = np.isnan(filled)
+
+    if method == 'weighted':
+        observed = np.where(missing, 0.0, filled)
+        totals = (weights @ observed.T).T                               # sum of weight * value
+        weight_sums = (weights @ (~missing).T.astype(float)).T          # sum of weights of observed values
+        fillable = missing & (weight_sums > 0)
+        filled[fillable] = totals[fillable] / weight_sums[fillable]
+
+    elif method == 'nanmean':
+        for loc in np.flatnonzero(missing.any(axis=0)):
+            filled[:, loc] = fill_location(filled, missing[:, loc], weights, loc)
+
+    else:
+        raise ValueError("method must be 'nanmean' or 'weighted'. Provided {0}".format(method))
+    return(filled)
+
+
+def fill_location(filled, missing, weights, loc):
+    ''' One location's step of the 'nanmean' method of fill_from_neighbors()
+        args: filled = 2-D array (months x locations), current state of the fill
+              missing = boolean array of the location's originally missing months
+              weights = neighborhood matrix from neighbor_weights()
+              loc = column number of the location
+        returns: the location's filled column (new array)
+    '''
+    column = filled[:, loc].copy()
+    neighbors = weights.indices[weights.indptr[loc]:weights.indptr[loc+1]]
+    rows = np.flatnonzero(missing)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)      # no neighbor data: stays NaN
+        column[rows] = np.nanmean(filled[np.ix_(rows, neighbors)], axis=1)
+    return(column)
@@ -0,0 +1,205 @@
+#!/usr/bin/python
+
+import os
+import hashlib
+import zipfile
+import multiprocessing
+from xml.etree import ElementTree
+import numpy as np
+import pandas as pd
+from shasum import shasum
+
+MONTHS = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
+CACHE_VERSION = 3               # 3: sheet fingerprints hash the shared strings each sheet references
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+
+def parse_sheet(workbook, sheet):
+    ''' Reads one location's sheet of the precipitation workbook (a row per year, a column per month)
+        args: workbook = pandas ExcelFile
+              sheet = sheet number
+        returns: (years, months, values) numpy arrays, months are numbers 0-11 (Jan-Dec)
+    '''
+    to_merge = workbook.parse(sheet, skiprows=[0,1], usecols=[0,1,2,3,4,5,6,7,8,9,10,11,12]) #first two rows in the data were titles
+    to_merge = to_merge.dropna() #removes two rows from the data that were labeled as NaN and not needed
+    to_merge = to_merge.set_index('Year') #set the index to year to remove the following 3 rows
+    to_merge = to_merge.drop(['Mean','Max', 'Min'])
+    years = np.array([ int(year) for year in to_merge.index ], dtype=np.int64)
+    values = np.column_stack([ pd.to_numeric(to_merge[month], errors='coerce').values.astype(float) for month in MONTHS ])
+    return(np.repeat(years, len(MONTHS)), np.tile(np.arange(len(MONTHS), dtype=np.int8), len(years)), values.reshape(-1))
+
+
+def _parse_sheets(filename, sheets):
+    ''' worker task: parses a range of sheets, returns a list of (sheet, years, months, values) '''
+    workbook = pd.ExcelFile(filename)
+    return([ (sheet,) + parse_sheet(workbook, sheet) for sheet in sheets ])
+
+
+def _shared_strings(archive):
+    ''' returns: list of the workbook's shared strings (rich text runs joined) '''
+    try:
+        root = ElementTree.fromstring(archive.read('xl/sharedStrings.xml'))
+    except KeyError:
+        return([])
+    return([ ''.join(t.text or '' for t in si.iter(MAIN_NS+'t')) for si in root.iter(MAIN_NS+'si') ])
+
+
+def _referenced_strings(archive, target, strings):
+    ''' returns: STRING sha1 of the shared strings a sheet's cells reference (index & text) '''
+    referenced = set()
+    with archive.open(target) as sheet_xml:
+        for _, cell in ElementTree.iterparse(sheet_xml):
+            if cell.tag == MAIN_NS+'c':
+                value = cell.find(MAIN_NS+'v')
+                if cell.get('t') == 's' and value is not None:
+                    referenced.add(int(value.text))
+                cell.clear()
+    hash_obj = hashlib.sha1()
+    for index in sorted(referenced):
+        hash_obj.update("{0}={1}\x00".format(index, strings[index] if index < len(strings) else '').encode('utf-8'))
+    return(hash_obj.hexdigest())
+
+
+def sheet_fingerprints(filename):
+    ''' Fingerprint of every sheet of an xlsx workbook without parsing it with pandas: the CRC & size
+        of the sheet's xml in the zip archive, the shared strings the sheet references (an edit of
+        another sheet's text leaves it unchanged), and the CRC & size of the styles shared by all sheets
+        args: filename = xlsx workbook
+        returns: list of STRING fingerprints in sheet order
+    '''
+    rel_ns = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+    with zipfile.ZipFile(filename) as archive:
+        def member(name):
+            try:
+                info = archive.getinfo(name)
+            except KeyError:
+                return('-')
+            return("{0:08x}:{1}".format(info.CRC, info.file_size))
+
+        rels = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+        targets = { rel.get('Id'): rel.get('Target').lstrip('/') for rel in rels }
+        workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+        strings = _shared_strings(archive)
+        styles = member('xl/styles.xml')
+        fingerprints = []
+        for sheet in workbook.find(MAIN_NS+'sheets'):
+            target = targets[sheet.get(rel_ns+'id')]
+            target = target if target.startswith('xl/') else 'xl/'+target
+            fingerprints.append("{0}|{1}|{2}|{3}".format(sheet.get('name'), member(target),
+                                                         _referenced_strings(archive, target, strings), styles))
+    return(fingerprints)
+
+
+def _pivot(years, months, values, stations, nsheets):
+    ''' single pivot of the long arrays: one row per (year, month) found in any sheet '''
+    keys, rows = np.unique(years*len(MONTHS) + months, return_inverse=True)
+    matrix = np.full((len(keys), nsheets), np.nan)
+    matrix[rows, stations] = values
+    return(keys // len(MONTHS), (keys % len(MONTHS)).astype(np.int8), matrix)
+
+
+def read_sheets(filename, sheets, processes=None):
+    ''' Parses sheets of the workbook in worker processes, each sheet as compact (year, month, value) arrays
+        args: filename = xlsx workbook, one sheet per location
+              sheets = list of sheet numbers to parse
+              processes = number of worker processes [Default = # of CPU cores minus 1]
+        returns: dictionary of sheet number -> (years, months, values)
+    '''
+    if processes is None:
+        processes = max(multiprocessing.cpu_count()-1, 1)      # 1 cpu is needed for basic OS functions
+    chunks = [ chunk.tolist() for chunk in np.array_split(np.asarray(sheets, dtype=int), processes) if len(chunk) > 0 ]
+
+    if len(chunks) == 0:
+        return({})
+    if len(chunks) == 1:
+        parsed = [ _parse_sheets(filename, chunks[0]) ]
+    else:
+        pool = multiprocessing.Pool(processes=len(chunks))
+        try:
+            parsed = pool.starmap(_parse_sheets, [ (filename, chunk) for chunk in chunks ])
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    return({ record[0]: record[1:] for chunk in parsed for record in chunk })
+
+
+def _concat_sheets(sheets):
+    order = sorted(sheets)
+    stations = np.concatenate([ np.full(len(sheets[s][2]), s, dtype=np.int32) for s in order ])
+    years, months, values = ( np.concatenate([ sheets[s][k] for s in order ]) for k in range(3) )
+    return(years, months, values, stations)
+
+
+def read_workbook(filename, cache_filename=None, processes=None):
+    ''' Parses every sheet of the workbook (see read_sheets()), then pivots them once into a
+        year/month x sheet matrix.  The parsed sheets are cached: an unchanged workbook (same sha256)
+        is not opened at all, otherwise only the sheets whose fingerprint changed (see
+        sheet_fingerprints()) are parsed again.
+        args: filename = xlsx workbook
+              cache_filename = .npz file holding the parsed sheets, None = no caching
+              processes = see read_sheets()
+        returns: (years, months, values, sheet_names) - values is (year/month rows x sheets),
+                 rows sorted by year then month
+    '''
+    file_sha = shasum().file_sha(filename)
+    cached = _read_cache(cache_filename)
+
+    if cached is not None and cached['sha256'] == file_sha:
+        sheet_names, parsed = cached['sheet_names'], cached['sheets']
+    else:
+        sheet_names = pd.ExcelFile(filename).sheet_names
+        fingerprints = sheet_fingerprints(filename)
+        known = {} if cached is None else dict(zip(cached['fingerprints'], (cached['sheets'][s] for s in range(len(cached['fingerprints'])))))
+        parsed = { s: known[fp] for s, fp in enumerate(fingerprints) if fp in known }
+        changed = [ s for s in range(len(sheet_names)) if s not in parsed ]
+        if len(changed) > 0:
+            print("[INGEST] Parsing {0} of {1} sheets".format(len(changed), len(sheet_names)), flush=True)
+        parsed.update(read_sheets(filename, changed, processes=processes))
+        if cache_filename is not None:
+            _write_cache(cache_filename, file_sha, sheet_names, fingerprints, parsed)
+
+    years, months, values, stations = _concat_sheets(parsed)
+    return(_pivot(years, months, values, stations, len(sheet_names)) + (list(sheet_names),))
+
+
+def load_workbook(filename, cache_filename=None, processes=None):
+    ''' read_workbook() as a DataFrame
+        args: see read_workbook()
+        returns: (DataFrame with Year, Month ('Jan'-'Dec') & a column per sheet number, sheet names)
+    '''
+    years, months, values, sheet_names = read_workbook(filename, cache_filename=cache_filename, processes=processes)
+    df = pd.DataFrame(values, columns=range(values.shape[1]))
+    df.insert(0, 'Month', [ MONTHS[m] for m in months ])
+    df.insert(0, 'Year', years.astype(object))
+    return(df, sheet_names)
+
+
+def _read_cache(cache_filename):
+    if cache_filename is None or not os.path.isfile(cache_filename):
+        return(None)
+    try:
+        with np.load(cache_filename, allow_pickle=False) as cached:
+            if int(cached['version']) != CACHE_VERSION:
+                return(None)
+            years, months, values, stations = cached['years'], cached['months'], cached['values'], cached['stations']
+            bounds = np.searchsorted(stations, np.arange(len(cached['fingerprints'])+1))
+            return({
+                'sha256': str(cached['sha256']),
+                'sheet_names': [ str(n) for n in cached['sheet_names'] ],
+                'fingerprints': [ str(fp) for fp in cached['fingerprints'] ],
+                'sheets': { s: (years[bounds[s]:bounds[s+1]], months[bounds[s]:bounds[s+1]], values[bounds[s]:bounds[s+1]])
+                            for s in range(len(bounds)-1) }
+            })
+    except (OSError, ValueError, KeyError):
+        return(None)
+
+
+def _write_cache(cache_filename, file_sha, sheet_names, fingerprints, parsed):
+    years, months, values, stations = _concat_sheets(parsed)           # sorted by sheet number
+    tmp_filename = "{0}.{1}.tmp.npz".format(cache_filename, os.getpid())
+    np.savez(tmp_filename, version=CACHE_VERSION, sha256=file_sha, sheet_names=np.array(sheet_names),
+             fingerprints=np.array(fingerprints), years=years, months=months, values=values, stations=stations)
+    os.replace(tmp_filename, cache_filename)
@@ -1,36 +1,141 @@
 #!/usr/bin/python
 
+import os
+import sys
 import getpass
-from os import path
+import argparse
 import shutil
 
-# Main program
-def main():
-	print("[MAIN] Calling Data_Wrangling_CAP1...")
-	try:
-		import Data_Wrangling_CAP1
+# heavy dependencies (pandas, statsmodels, ...) are imported by the commands that need them,
+# importing this module has no side effects
+APP_DIR = os.path.dirname(os.path.realpath(__file__))
+APP_ROOT = APP_DIR if os.path.basename(APP_DIR) != "src" else os.path.dirname(APP_DIR)
+
+WRANGLING_STAGE = 'Data_Wrangling_CAP1'
+EVALUATION_STAGE = 'Exogenous_Variables'        # evaluation & forecast stages (RUN_STAGES selects them)
+STATUS_FILES = ['rainfalldata.csv', 'ncrainfalldata.csv', 'exogen.json', 'allMAE.json', 'allBetterMAE.json',
+				'predictions.csv', 'predictions.npz', 'ensemble.json']
+
 
+def destdir():
+	''' returns: STRING data directory, same choice as the notebooks (service daemon: home directory) '''
+	if getpass.getuser() == "rainfalld":  # service daemon
+		return(os.path.expanduser("~"))   # /var/cache/rainfall-predictor
+	return(os.path.join(APP_ROOT,'data','manipulated_data'))
+
+
+def run_stage(module_name, stages=None):
+	''' Runs a converted notebook as a script, a SystemExit with code 0 is a normal end of the stage
+		args: module_name = name of the notebook's module (see scripts/build.py)
+			  stages = tuple of the notebook stages to run (RUN_STAGES), None = all of them
+	'''
+	import runpy
+	import multiprocessing
+	if 'fork' in multiprocessing.get_all_start_methods():
+		# the stage's process pools run functions defined in its __main__ module & rely on globals
+		# set by the stage, workers must be forked (not spawned, nor forkserver: python >= 3.14 default)
+		multiprocessing.set_start_method('fork', force=True)
+	init_globals = {} if stages is None else { 'RUN_STAGES': tuple(stages) }
+	try:
+		runpy.run_module(module_name, init_globals=init_globals, run_name='__main__', alter_sys=True)
 	except SystemExit as event_exit:
-		if event_exit.code != 0:
+		if event_exit.code not in (0, None):
 			raise event_exit
 		else:
 			pass  # Ignore and continue (accelerated processing due to existing files)
 
-	# Load any previous results if they exist
+
+def seed_results():
+	''' Load any previous results if they exist '''
 	try:
-		prevResults = path.join(path.dirname(path.realpath(__file__)),'data','manipulated_data','allMAE.json')
+		prevResults = os.path.join(APP_ROOT,'data','manipulated_data','allMAE.json')
 		shutil.copyfile(
 			prevResults,
-			path.join(path.expanduser("~"), 'allMAE.json')
+			os.path.join(os.path.expanduser("~"), 'allMAE.json')
 		)
 		print("[MAIN] loading previously solved results from {}".format(prevResults))
 	except:
 		pass  # Ignore and continue since Exogenous Vars will create the file as default instead of modifying previous results
 
+
+def cmd_wrangle(args):
+	print("[MAIN] Calling Data_Wrangling_CAP1...")
+	run_stage(WRANGLING_STAGE)
+
+
+def cmd_evaluate(args):
+	seed_results()
+	print("[MAIN] Calling Exogenous_Variables (evaluate)...")
+	run_stage(EVALUATION_STAGE, stages=('evaluate',))
+
+
+def cmd_forecast(args):
+	print("[MAIN] Calling Exogenous_Variables (forecast)...")
+	run_stage(EVALUATION_STAGE, stages=('forecast',))
+
+
+def cmd_run(args):
+	''' Full pipeline: wrangling, evaluation & forecasts (service default) '''
+	cmd_wrangle(args)
+	seed_results()
 	print("[MAIN] Calling Exogenous_Variables...")
-	import Exogenous_Variables
+	run_stage(EVALUATION_STAGE)
+
+
+def cmd_export(args):
+	''' Writes allMAE.json & allBetterMAE.json from the results store '''
+	from resultstore import ResultStore
+	dirname = destdir()
+	filename = os.path.join(dirname, "allMAE.sqlite3")
+	if not os.path.isfile(filename):
+		print("[MAIN] No results store found ({0})".format(filename))
+		return(1)
+	store = ResultStore(filename, readonly=True)           # the store is only read, the pipeline may be writing it
+	store.export(os.path.join(dirname, "allMAE.json"), os.path.join(dirname, "allBetterMAE.json"))
+	print("[MAIN] Exported {0} results to {1}".format(len(store), dirname))
+	return(0)
+
+
+def cmd_status(args):
+	''' Prints the stored results & the age of the data files '''
+	import time
+	dirname = destdir()
+	print("[MAIN] Data directory: {0}".format(dirname))
+	for name in STATUS_FILES:
+		filename = os.path.join(dirname, name)
+		if os.path.isfile(filename):
+			print("  {0:<20} {1:>12,} bytes  {2}".format(name, os.path.getsize(filename),
+				time.strftime('%Y-%m-%d %H:%M', time.localtime(os.path.getmtime(filename)))))
+		else:
+			print("  {0:<20} missing".format(name))
+
+	filename = os.path.join(dirname, "allMAE.sqlite3")
+	if not os.path.isfile(filename):
+		print("[MAIN] No results store found ({0})".format(filename))
+		return(0)
+	from resultstore import ResultStore
+	for item, count in ResultStore(filename, readonly=True).summary().items():
+		print("  {0:<20} {1:>12,}".format(item, count))
+	return(0)
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(prog='rainfall-predictor', description="Rainfall Predictor pipeline. Without a command every stage runs (wrangle, evaluate & forecast).")
+	commands = parser.add_subparsers(dest='command', metavar='command')
+	commands.add_parser('wrangle', help="parse the precipitation workbook into rainfalldata.csv & exogen.json").set_defaults(fn=cmd_wrangle)
+	commands.add_parser('evaluate', help="evaluate keymaes & exmaes of every location (results store)").set_defaults(fn=cmd_evaluate)
+	commands.add_parser('forecast', help="forecast every location (predictions.csv, predictions.npz & optional ensembles)").set_defaults(fn=cmd_forecast)
+	commands.add_parser('export', help="write allMAE.json & allBetterMAE.json from the results store").set_defaults(fn=cmd_export)
+	commands.add_parser('status', help="show the data files & the contents of the results store").set_defaults(fn=cmd_status)
+	args = parser.parse_args(argv)
+
+	if args.command not in ('export', 'status'):
+		print("[MAIN] Running Rainfall Predictor as "+getpass.getuser()+" ...")
+		print("[MAIN] HOME (~)="+os.path.expanduser("~"))
+		print("[MAIN] ")
+	sys.path.insert(0, APP_DIR)                  # stage modules live next to this script
+	return(getattr(args, 'fn', cmd_run)(args) or 0)
+
 
-print("[MAIN] Running Rainfall Predictor as "+getpass.getuser()+" ...")
-print("[MAIN] HOME (~)="+path.expanduser("~"))
-print("[MAIN] ")
-main()
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/python
+
+import warnings
+import numpy as np
+import pandas as pd
+from fingerprint import Fingerprinter
+from walkforward import model_signature, parse_order_key, DEFAULT_ORDER, DEFAULT_SEASONAL_ORDER
+
+MONTHS = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
+
+
+def forecast_matrix(store, data, window, targets=None, refit_every=1):
+    ''' Stacks the one-step forecasts of the latest `window` months of every walk-forward stored in
+        the results store that was computed from the current data (same signature, covering every
+        month of data), so metrics are computed for all models at once.
+        args: store = resultstore.ResultStore
+              data = rainfall DataFrame the walk-forwards were evaluated on (index = dates)
+              window = number of latest months evaluated
+              targets = optional collection of target location names the result is limited to
+              refit_every = refit cadence of the current walk-forwards, with the location's order
+                            (ResultStore.orders()) part of their signature (see walkforward.model_signature)
+        returns: (keys, predictions, actuals, dates) - keys = list of (target, exog combo name or None),
+                 predictions & actuals = (models x window) numpy arrays, dates = DatetimeIndex of the window
+    '''
+    walks = _current_walks(store, data, window, targets, refit_every)
+    return(_stack(walks, data, window))
+
+
+def _current_walks(store, data, window, targets, refit_every):
+    fingerprints = Fingerprinter(data)
+    orders = store.orders()
+    walks = []
+    for walk in store.walkforwards(targets):
+        columns = [walk['target']] + ([] if walk['exog'] is None else walk['exog'].split('|'))
+        if walk['nobs'] != data.shape[0] or len(walk['predictions']) < window or any(c not in data for c in columns):
+            continue
+        order = parse_order_key(orders[walk['target']]) if walk['target'] in orders else (DEFAULT_ORDER, DEFAULT_SEASONAL_ORDER)
+        signature = model_signature(fingerprints.combination(columns), *order, refit_every=refit_every)
+        if walk['data_sha1'] == signature:          # otherwise evaluated on other data, order or refit cadence
+            walks.append(walk)
+    return(walks)
+
+
+def _stack(walks, data, window):
+    keys = [ (walk['target'], walk['exog']) for walk in walks ]
+    predictions = np.array([ walk['predictions'][-window:] for walk in walks ], dtype=float).reshape(len(walks), window)
+    actuals = np.asarray(data[[ walk['target'] for walk in walks ]].values[-window:], dtype=float).T.reshape(len(walks), window)
+    return(keys, predictions, actuals, pd.DatetimeIndex(data.index[-window:]))
+
+
+def mae(predictions, actuals):
+    ''' returns: numpy array of the mean absolute error of every row (model) '''
+    return(np.mean(np.abs(actuals - predictions), axis=-1))
+
+
+def rmse(predictions, actuals):
+    ''' returns: numpy array of the root mean squared error of every row (model) '''
+    return(np.sqrt(np.mean((actuals - predictions)**2, axis=-1)))
+
+
+def mape(predictions, actuals):
+    ''' Mean absolute percentage error of every row (model).  Months without rainfall are left out
+        since their percentage error is undefined.
+        returns: numpy array of percentages, NaN when a row has no month with rainfall
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(actuals != 0, np.abs((actuals - predictions) / actuals), np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)         # all months dry: NaN
+        return(100 * np.nanmean(ratio, axis=-1))
+
+
+def seasonal_mae(predictions, actuals, dates):
+    ''' Mean absolute error of every row (model) per calendar month
+        args: predictions, actuals = (models x months) arrays
+              dates = dates of the columns
+        returns: (models x 12) numpy array, column 0 = January, NaN for months outside of the window
+    '''
+    months = pd.DatetimeIndex(dates).month.values - 1
+    errors = np.abs(actuals - predictions)
+    counts = np.bincount(months, minlength=12)
+    totals = np.zeros((errors.shape[0], 12))
+    np.add.at(totals.T, months, errors.T)                  # sum of the errors of each calendar month
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return(np.where(counts > 0, totals / counts, np.nan))
+
+
+def walkforward_metrics(store, data, window, targets=None, refit_every=1):
+    ''' Metrics of every stored walk-forward of the current data, read from the stored forecasts
+        instead of walking the models forward again
+        args: store, data, window, targets, refit_every = see forecast_matrix()
+        returns: DataFrame indexed by (target, exog) ('' for the keymae) with the mae, rmse, mape,
+                 the mae of every calendar month and the seconds spent walking forward
+    '''
+    walks = _current_walks(store, data, window, targets, refit_every)
+    keys, predictions, actuals, dates = _stack(walks, data, window)
+    frame = pd.DataFrame({
+        'mae': mae(predictions, actuals),
+        'rmse': rmse(predictions, actuals),
+        'mape': mape(predictions, actuals),
+    }, index=pd.MultiIndex.from_tuples([ (t, '' if e is None else e) for t, e in keys ], names=['target', 'exog']))
+    seasonal = seasonal_mae(predictions, actuals, dates)
+    for m, month in enumerate(MONTHS):
+        frame['mae_'+month] = seasonal[:, m]
+    frame['seconds'] = [ walk['seconds'] for walk in walks ]
+    return(frame)
@@ -0,0 +1,215 @@
+#!/usr/bin/python
+
+import os
+import json
+from contextlib import contextmanager
+from collections import OrderedDict, defaultdict
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+    import msvcrt
+
+
+class ParamCache:
+    ''' LRU cache of fitted SARIMAX parameter vectors used as start_params of later fits.
+
+        Entries are keyed by (location, exog combo, order, seasonal_order, data length).  A lookup
+        with a data length that has not been fit yet falls back to the closest length fit for the
+        same location/exog/order, since a series one month longer converges from nearly the same
+        parameters.  The cache persists to a JSON file; save() merges with whatever other
+        processes have written so far, holding an exclusive lock on filename.lock so concurrent
+        savers do not lose each other's entries & counters.
+    '''
+
+    def __init__(self, filename=None, maxsize=4096):
+        ''' args: filename = json file to persist the cache to, None = memory only
+                  maxsize = maximum number of parameter vectors kept (least recently used evicted)
+        '''
+        if maxsize < 1:
+            raise ValueError("maxsize must be a positive integer. Provided {0}".format(maxsize))
+        self.filename = filename
+        self.maxsize = maxsize
+        self._entries = OrderedDict()               # (group, nobs) -> list of params
+        self._lengths = defaultdict(set)            # group -> set of cached nobs (never empty)
+        self._counters = self._new_counters()       # totals, including what was loaded from file
+        self._unsaved = self._new_counters()        # changes since last save()
+
+
+    @staticmethod
+    def group(location, exog, order, seasonal_order):
+        ''' returns: STRING key shared by every data length of a location/exog/order model '''
+        exog = '' if exog is None else exog
+        return("{0}#{1}#{2}#{3}".format(
+            location, exog,
+            ','.join(str(int(o)) for o in order),
+            ','.join(str(int(o)) for o in seasonal_order)
+        ))
+
+
+    def get(self, location, exog, order, seasonal_order, nobs):
+        ''' Find start parameters for a fit
+            args: location = target location name
+                  exog = exogenous combo name ('|' joined), or None
+                  order = (p,d,q)
+                  seasonal_order = (P,D,Q,m)
+                  nobs = length of the series about to be fit
+            returns: list of parameters, or None when nothing is cached for the model
+        '''
+        group = self.group(location, exog, order, seasonal_order)
+        key = (group, nobs)
+        if key in self._entries:
+            self._count('hits')
+        elif group in self._lengths:
+            key = (group, min(self._lengths[group], key=lambda n: (abs(n - nobs), -n)))
+            self._count('near_hits')
+        else:
+            self._count('misses')
+            return(None)
+
+        self._entries.move_to_end(key)
+        return(list(self._entries[key]))
+
+
+    def put(self, location, exog, order, seasonal_order, nobs, params, iterations=None, warm=False):
+        ''' Store fitted parameters
+            args: location, exog, order, seasonal_order, nobs = see get()
+                  params = fitted parameter vector
+                  iterations = number of optimizer iterations the fit took, for reporting
+                  warm = whether the fit was started from cached parameters
+        '''
+        key = (self.group(location, exog, order, seasonal_order), nobs)
+        self._entries[key] = [float(x) for x in params]
+        self._entries.move_to_end(key)
+        self._lengths[key[0]].add(nobs)
+        self._evict()
+
+        if iterations is not None:
+            prefix = 'warm' if warm else 'cold'
+            self._count(prefix+'_fits')
+            self._count(prefix+'_iterations', iterations)
+
+
+    def fit(self, model, location, exog=None, **fit_kwargs):
+        ''' Fits a statsmodels state space model warm-started from the cache and stores the result
+            args: model = unfitted SARIMAX model
+                  location = target location name
+                  exog = exogenous combo name, or None
+                  fit_kwargs = passed on to model.fit()
+            returns: fitted results object
+        '''
+        order = model.order
+        seasonal_order = model.seasonal_order
+        start_params = self.get(location, exog, order, seasonal_order, model.nobs)
+        if start_params is not None and len(start_params) != len(model.start_params):
+            start_params = None                     # parameter layout changed, cannot reuse
+        results = model.fit(start_params=start_params, **fit_kwargs)
+        self.put(location, exog, order, seasonal_order, model.nobs, results.params,
+                 iterations=results.mle_retvals.get('iterations') if isinstance(results.mle_retvals, dict) else None,
+                 warm=start_params is not None)
+        return(results)
+
+
+    def stats(self):
+        ''' returns: dictionary of lookup hit rates and mean optimizer iterations of cold vs warm fits '''
+        c = self._counters
+        lookups = c['hits'] + c['near_hits'] + c['misses']
+        return({
+            'entries': len(self._entries),
+            'lookups': lookups,
+            'hit_rate': 0.0 if lookups == 0 else (c['hits'] + c['near_hits']) / lookups,
+            'exact_hit_rate': 0.0 if lookups == 0 else c['hits'] / lookups,
+            'mean_iterations_cold': None if c['cold_fits'] == 0 else c['cold_iterations'] / c['cold_fits'],
+            'mean_iterations_warm': None if c['warm_fits'] == 0 else c['warm_iterations'] / c['warm_fits']
+        })
+
+
+    def load(self):
+        ''' Reads the persisted cache, entries already in memory take precedence
+            returns: self
+        '''
+        stored = self._read()
+        if stored is None:
+            return(self)
+
+        current = self._entries
+        self._entries = OrderedDict()
+        self._lengths = defaultdict(set)
+        for group, nobs, params in stored['entries']:
+            self._insert((group, nobs), params)
+        for key, params in current.items():
+            self._insert(key, params)
+        self._evict()
+
+        self._counters = self._new_counters()
+        for name, value in stored.get('counters', {}).items():
+            self._counters[name] = value + self._unsaved.get(name, 0)
+        return(self)
+
+
+    def save(self):
+        ''' Merges this cache into the persisted file (atomic replace) '''
+        if self.filename is None:
+            return
+        with self._locked():
+            self.load()           # pick up entries & counters written by other processes
+            data = {
+                'maxsize': self.maxsize,
+                'counters': self._counters,
+                'entries': [ [group, nobs, params] for (group, nobs), params in self._entries.items() ]
+            }
+            tmp_filename = "{0}.{1}.tmp".format(self.filename, os.getpid())
+            with open(tmp_filename, 'w') as f:
+                f.write(json.dumps(data)+'\n')
+            os.replace(tmp_filename, self.filename)
+            self._unsaved = self._new_counters()
+
+
+    @contextmanager
+    def _locked(self):
+        ''' Exclusive lock of the persisted file between processes, held for a load/merge/write '''
+        with open(self.filename+'.lock', 'a+') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock.seek(0)
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+    def _read(self):
+        if self.filename is None:
+            return(None)
+        try:
+            with open(self.filename, 'r') as f:
+                return(json.loads(f.read()))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return(None)
+
+    def _insert(self, key, params):
+        self._entries[key] = params
+        self._entries.move_to_end(key)
+        self._lengths[key[0]].add(key[1])
+
+    def _evict(self):
+        while len(self._entries) > self.maxsize:
+            (group, nobs), _ = self._entries.popitem(last=False)
+            self._lengths[group].discard(nobs)
+            if len(self._lengths[group]) == 0:
+                del self._lengths[group]
+
+    def _count(self, name, value=1):
+        self._counters[name] += value
+        self._unsaved[name] += value
+
+    @staticmethod
+    def _new_counters():
+        return(dict.fromkeys(['hits', 'near_hits', 'misses', 'cold_fits', 'cold_iterations',
+                              'warm_fits', 'warm_iterations'], 0))
@@ -0,0 +1,149 @@
+#!/usr/bin/python
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+from fingerprint import column_fingerprint, index_fingerprint
+from imputation import fill_missing_months, neighbor_weights, fill_from_neighbors, fill_location
+
+
+def stage_key(stage, *parts):
+    ''' returns: STRING sha1 of a stage name & the fingerprints/parameters its output depends on '''
+    return(hashlib.sha1( bytes('|'.join([stage] + [ str(p) for p in parts ]), 'utf-8') ).hexdigest())
+
+
+class ColumnCache:
+    ''' Per-location cache of one wrangling stage's output columns.  Each column is stored with
+        the key (stage_key()) of the inputs it was computed from; a location is recomputed only
+        when its key changes.  Entries not used during a run are dropped on save().
+    '''
+
+    def __init__(self, filename=None):
+        ''' args: filename = .npz file to persist the cache to, None = memory only '''
+        self.filename = filename
+        self._entries = {}                  # location -> (key, values)
+        self._used = set()
+        self.hits = 0
+        self.misses = 0
+        self._read()
+
+
+    def get(self, name, key):
+        ''' returns: cached column of location name computed from key, or None '''
+        entry = self._entries.get(name)
+        if entry is None or entry[0] != key:
+            self.misses += 1
+            return(None)
+        self.hits += 1
+        self._used.add(name)
+        return(entry[1].copy())
+
+
+    def put(self, name, key, values):
+        self._entries[name] = (key, np.array(values, dtype=float))
+        self._used.add(name)
+
+
+    def save(self):
+        ''' Writes the entries used during this run (atomic replace) '''
+        if self.filename is None:
+            return
+        names = sorted(self._used)
+        lengths = np.array([ len(self._entries[n][1]) for n in names ], dtype=np.int64)
+        values = np.concatenate([ self._entries[n][1] for n in names ]) if len(names) > 0 else np.empty(0)
+        tmp_filename = "{0}.{1}.tmp.npz".format(self.filename, os.getpid())
+        np.savez(tmp_filename, names=np.array(names, dtype=str), keys=np.array([ self._entries[n][0] for n in names ], dtype=str),
+                 lengths=lengths, values=values)
+        os.replace(tmp_filename, self.filename)
+
+
+    def _read(self):
+        if self.filename is None or not os.path.isfile(self.filename):
+            return
+        try:
+            with np.load(self.filename, allow_pickle=False) as cached:
+                bounds = np.concatenate([[0], np.cumsum(cached['lengths'])])
+                values = cached['values']
+                for i, (name, key) in enumerate(zip(cached['names'], cached['keys'])):
+                    self._entries[str(name)] = (str(key), values[bounds[i]:bounds[i+1]])
+        except (OSError, ValueError, KeyError):
+            self._entries = {}
+
+
+def temporal_fill_stage(df, cache, **fill_kwargs):
+    ''' imputation.fill_missing_months() recomputing only the locations whose column changed
+        args: df = rainfall DataFrame (months x locations)
+              cache = ColumnCache of this stage
+              fill_kwargs = passed on to fill_missing_months()
+        returns: filled DataFrame
+    '''
+    params = sorted(fill_kwargs.items())
+    keys = [ stage_key('temporal', column_fingerprint(df[col]), params) for col in df.columns ]
+    filled = np.array(df.values, dtype=float)
+    stale = []
+    for i, (col, key) in enumerate(zip(df.columns, keys)):
+        cached = cache.get(col, key)
+        if cached is None or len(cached) != filled.shape[0]:
+            stale.append(i)
+        else:
+            filled[:, i] = cached
+
+    if len(stale) > 0:                  # locations are filled independently of each other
+        filled[:, stale] = fill_missing_months(filled[:, stale], **fill_kwargs)
+        for i in stale:
+            cache.put(df.columns[i], keys[i], filled[:, i])
+    return(pd.DataFrame(filled, index=df.index, columns=df.columns))
+
+
+def spatial_fill_stage(df, sindex, radius_km, cache, power=None):
+    ''' imputation.fill_from_neighbors() recomputing only the locations whose own column or any
+        neighbor's column changed
+        args: df = rainfall DataFrame (months x locations)
+              sindex = geodistance.SpatialIndex of the locations
+              radius_km = neighborhood radius in kilometers
+              cache = ColumnCache of this stage
+              power = None for the plain mean, otherwise the inverse distance weighting exponent
+        returns: filled DataFrame
+    '''
+    names = list(df.columns)
+    weights = neighbor_weights(sindex, names, radius_km, power=power)
+    values = np.array(df.values, dtype=float)
+    missing = np.isnan(values)
+    filled = values.copy()
+    index_fp = index_fingerprint(df.index)
+
+    def neighborhood_key(loc, columns):
+        neighbors = weights.indices[weights.indptr[loc]:weights.indptr[loc+1]]
+        data = weights.data[weights.indptr[loc]:weights.indptr[loc+1]]
+        return(stage_key('spatial', radius_km, power, index_fp, names[loc],
+                         *( "{0}:{1!r}:{2}".format(names[j], w, _array_sha1(columns[:, j])) for j, w in zip(neighbors, data) )))
+
+    if power is None:       # locations are filled in column order, earlier fills feed later ones
+        for loc in np.flatnonzero(missing.any(axis=0)):
+            key = neighborhood_key(loc, filled)
+            cached = cache.get(names[loc], key)
+            if cached is None or len(cached) != filled.shape[0]:
+                cached = fill_location(filled, missing[:, loc], weights, loc)
+                cache.put(names[loc], key, cached)
+            filled[:, loc] = cached
+    else:                   # weighted fills only read observed values
+        locs = np.flatnonzero(missing.any(axis=0))
+        keys = { loc: neighborhood_key(loc, values) for loc in locs }
+        stale = []
+        for loc in locs:
+            cached = cache.get(names[loc], keys[loc])
+            if cached is None or len(cached) != filled.shape[0]:
+                stale.append(loc)
+            else:
+                filled[:, loc] = cached
+        if len(stale) > 0:
+            weighted = fill_from_neighbors(values, weights, method='weighted')
+            for loc in stale:
+                filled[:, loc] = weighted[:, loc]
+                cache.put(names[loc], keys[loc], weighted[:, loc])
+    return(pd.DataFrame(filled, index=df.index, columns=df.columns))
+
+
+def _array_sha1(values):
+    return(hashlib.sha1(np.ascontiguousarray(values, dtype=float).tobytes()).hexdigest())
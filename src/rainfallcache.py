@@ -0,0 +1,148 @@
+#!/usr/bin/python
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from shasum import shasum
+
+RAINFALL_CSV = 'rainfalldata.csv'
+NC_RAINFALL_CSV = 'ncrainfalldata.csv'
+CACHE_MATRIX = 'rainfalldata.npy'           # float64 (months x locations) matrix, column-major
+CACHE_META = 'rainfalldata.json'            # dates, location names, checksum of the matrix & state of the csv
+CACHE_VERSION = 1
+
+
+def write_rainfall_cache(rainfall, nc_columns, destdir):
+    ''' Writes the binary columnar cache of the rainfall data next to its csv files.  The NC
+        locations are stored first so the NC subset is one contiguous block of the matrix.
+        args: rainfall = DataFrame of monthly rainfall (index = dates, columns = locations)
+              nc_columns = list of the NC location names (the ncrainfalldata.csv columns)
+              destdir = directory of rainfalldata.csv
+        returns: STRING filename of the matrix
+    '''
+    nc_columns = list(nc_columns)
+    nc_set = set(nc_columns)
+    storage_order = nc_columns + [ col for col in rainfall.columns if col not in nc_set ]
+
+    matrix_filename = os.path.join(destdir, CACHE_MATRIX)
+    tmp_matrix = "{0}.{1}.tmp.npy".format(matrix_filename, os.getpid())
+    np.save(tmp_matrix, np.asfortranarray(rainfall[storage_order].values, dtype=np.float64))
+
+    csv_filename = os.path.join(destdir, RAINFALL_CSV)
+    meta = {
+        'version': CACHE_VERSION,
+        'columns': storage_order,                                           # matrix column order
+        'rainfall_columns': list(rainfall.columns),                         # rainfalldata.csv column order
+        'nc_count': len(nc_columns),
+        'index_name': rainfall.index.name,
+        'index': [ date.strftime('%Y-%m-%d') for date in pd.to_datetime(rainfall.index) ],
+        'sha256': shasum().file_sha(tmp_matrix),
+        'source_sha256': None
+    }
+    if os.path.isfile(csv_filename):
+        meta.update(_source_state(csv_filename), source_sha256=shasum().file_sha(csv_filename))
+    meta_filename = os.path.join(destdir, CACHE_META)
+    tmp_meta = "{0}.{1}.tmp".format(meta_filename, os.getpid())
+    with open(tmp_meta, 'w') as f:
+        f.write(json.dumps(meta, indent=1)+'\n')
+
+    os.replace(tmp_matrix, matrix_filename)
+    os.replace(tmp_meta, meta_filename)
+    return(matrix_filename)
+
+
+def _source_state(csv_filename):
+    ''' returns: dictionary of the size & modification time of the csv the cache was written from '''
+    stat = os.stat(csv_filename)
+    return({ 'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns })
+
+
+def _source_unchanged(csv_filename, meta, meta_filename):
+    ''' The csv is only hashed when its size or modification time changed since the cache was
+        written; when the content is the same (e.g. copied or touched) its new state is recorded.
+        returns: True when the csv still holds the data the cache was written from
+    '''
+    state = _source_state(csv_filename)
+    if all(meta.get(key) == value for key, value in state.items()):
+        return(True)
+    if shasum().file_sha(csv_filename) != meta['source_sha256']:
+        return(False)                   # csv was rewritten without the cache
+    meta.update(state)
+    tmp_meta = "{0}.{1}.tmp".format(meta_filename, os.getpid())
+    try:
+        with open(tmp_meta, 'w') as f:
+            f.write(json.dumps(meta, indent=1)+'\n')
+        os.replace(tmp_meta, meta_filename)
+    except OSError:
+        pass                            # read-only directory, the csv is hashed again next time
+    return(True)
+
+
+def read_rainfall_cache(destdir, mmap_mode='c', verify=False):
+    ''' Loads the binary cache written by write_rainfall_cache().  The matrix is memory-mapped, 
+        only the pages used are read: its checksum is only verified on request.
+        args: destdir = directory of the cache files
+              mmap_mode = numpy memory map mode, 'c' = copy-on-write (file is never modified)
+              verify = verify the checksum of the matrix (reads the whole file)
+        returns: (rainfall, ncrainfall) DataFrames, or None when the cache is missing, corrupt or
+                 older than rainfalldata.csv
+    '''
+    matrix_filename = os.path.join(destdir, CACHE_MATRIX)
+    meta_filename = os.path.join(destdir, CACHE_META)
+    try:
+        with open(meta_filename, 'r') as f:
+            meta = json.loads(f.read())
+        if meta.get('version') != CACHE_VERSION:
+            return(None)
+        if verify and shasum().file_sha(matrix_filename) != meta['sha256']:
+            return(None)
+        csv_filename = os.path.join(destdir, RAINFALL_CSV)
+        if os.path.isfile(csv_filename) and not _source_unchanged(csv_filename, meta, meta_filename):
+            return(None)
+        matrix = np.load(matrix_filename, mmap_mode=mmap_mode)      # a truncated file fails to map
+    except (OSError, ValueError, KeyError):
+        return(None)
+
+    index = pd.DatetimeIndex(pd.to_datetime(meta['index']), name=meta['index_name'])
+    columns = meta['columns']
+    nc_count = meta['nc_count']
+    if matrix.shape != (len(index), len(columns)):
+        return(None)
+
+    # NC locations are the leading block of the matrix: a view, no copy
+    ncrainfall = pd.DataFrame(matrix[:, :nc_count], index=index, columns=columns[:nc_count], copy=False)
+    if columns == meta['rainfall_columns']:
+        rainfall = pd.DataFrame(matrix, index=index, columns=columns, copy=False)
+    else:       # one in-memory reorder back to the csv's column order, no parsing
+        positions = { col: i for i, col in enumerate(columns) }
+        rainfall = pd.DataFrame(matrix[:, [ positions[col] for col in meta['rainfall_columns'] ]],
+                                index=index, columns=meta['rainfall_columns'])
+    return(rainfall, ncrainfall)
+
+
+def read_rainfall_csv(destdir):
+    ''' returns: (rainfall, ncrainfall) DataFrames parsed from rainfalldata.csv & ncrainfalldata.csv '''
+    rd = pd.read_csv(os.path.join(destdir, RAINFALL_CSV))
+    rd.Date = pd.to_datetime(rd.Date)
+    rd = rd.set_index('Date')
+    nc_filename = os.path.join(destdir, NC_RAINFALL_CSV)
+    if os.path.isfile(nc_filename):
+        ncrd = pd.read_csv(nc_filename)
+        ncrd.Date = pd.to_datetime(ncrd.Date)
+        ncrd = ncrd.set_index('Date')
+    else:
+        ncrd = rd[[ col for col in rd.columns if col.endswith('NC') ]]
+    return(rd, ncrd)
+
+
+def load_rainfall(destdir, verify=False):
+    ''' Loads the rainfall data, preferring the binary cache over parsing the csv files
+        args: destdir = directory of rainfalldata.csv & ncrainfalldata.csv (and their cache)
+              verify = see read_rainfall_cache()
+        returns: (rainfall, ncrainfall) DataFrames indexed by date
+    '''
+    cached = read_rainfall_cache(destdir, verify=verify)
+    if cached is not None:
+        return(cached)
+    return(read_rainfall_csv(destdir))
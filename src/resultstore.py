@@ -0,0 +1,518 @@
+#!/usr/bin/python
+
+import os
+import json
+import sqlite3
+import numpy as np
+from urllib.parse import quote
+
+KEYMAE = ''         # exog value of a target location's own model (no exogenous locations)
+
+
+class ResultStore:
+    ''' Embedded results store for keymae/exmae evaluations (SQLite in WAL mode).
+
+        One row per (target location, exogenous combo); the data hash the MAE was computed from is
+        stored with it, so a lookup only hits when the data is unchanged.  An exmae also keeps the
+        data hash of the keymae it was computed against and is only compared with that keymae.  Every
+        process opens its own connection, concurrent upserts are serialized by SQLite instead of a
+        global lock and a lookup is a single primary key read.  export() writes the allMAE.json & allBetterMAE.json
+        layouts expected by downstream consumers.
+
+        The state of each model's latest walk-forward (fitted parameters & one-step forecasts) is
+        kept as well, so the walk-forward can be extended when new months are observed.  SARIMA
+        order searches checkpoint each evaluated order in the same database, along with the order
+        selected for each location and the fitted parameters of the forecast models, as well as the
+        exogenous locations' projections the exogenous forecast models are given as future exog.
+    '''
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS results (
+            target     TEXT NOT NULL,
+            exog       TEXT NOT NULL,
+            mae        REAL NOT NULL,
+            data_sha1  TEXT,
+            keymae_sha1  TEXT,
+            PRIMARY KEY (target, exog)
+        ) WITHOUT ROWID
+    """
+
+    WALKFORWARD_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS walkforwards (
+            target       TEXT NOT NULL,
+            exog         TEXT NOT NULL,
+            split        INTEGER NOT NULL,
+            nobs         INTEGER NOT NULL,
+            data_sha1    TEXT,
+            params       BLOB NOT NULL,
+            predictions  BLOB NOT NULL,
+            seconds      REAL,
+            PRIMARY KEY (target, exog)
+        ) WITHOUT ROWID
+    """
+
+    ORDER_SEARCH_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS order_search (
+            target       TEXT NOT NULL,
+            search       TEXT NOT NULL,
+            order_key    TEXT NOT NULL,
+            data_sha1    TEXT,
+            months       INTEGER NOT NULL,
+            mae          REAL NOT NULL,
+            params       BLOB NOT NULL,
+            predictions  BLOB NOT NULL,
+            seconds      REAL,
+            PRIMARY KEY (target, search, order_key)
+        ) WITHOUT ROWID
+    """
+
+    ORDERS_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS orders (
+            target        TEXT NOT NULL PRIMARY KEY,
+            order_key     TEXT NOT NULL,
+            mae           REAL NOT NULL,
+            baseline_mae  REAL,
+            search        TEXT,
+            data_sha1     TEXT
+        ) WITHOUT ROWID
+    """
+
+    MODELS_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS models (
+            target     TEXT NOT NULL,
+            exog       TEXT NOT NULL,
+            order_key  TEXT NOT NULL,
+            data_sha1  TEXT NOT NULL,
+            nobs       INTEGER NOT NULL,
+            params     BLOB NOT NULL,
+            PRIMARY KEY (target, exog, order_key)
+        ) WITHOUT ROWID
+    """
+
+    PROJECTIONS_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS projections (
+            station    TEXT NOT NULL,
+            order_key  TEXT NOT NULL,
+            data_sha1  TEXT NOT NULL,
+            begin      TEXT NOT NULL,
+            months     INTEGER NOT NULL,
+            projected  BLOB NOT NULL,
+            PRIMARY KEY (station, order_key)
+        ) WITHOUT ROWID
+    """
+
+    def __init__(self, filename, timeout=60, readonly=False):
+        ''' args: filename = sqlite database file, created when missing
+                  timeout = seconds to wait on a locked database before failing
+                  readonly = open an existing database for reading only: its schema is left as it is & no
+                             -wal or -shm file is created next to it
+        '''
+        self.filename = filename
+        self.timeout = timeout
+        self.readonly = readonly
+        self._conn = None
+        self._pid = None
+
+
+    @property
+    def conn(self):
+        ''' sqlite connection of the current process (connections are not shared across fork) '''
+        if self._conn is None or self._pid != os.getpid():
+            if self.readonly:
+                # without a write-ahead log (no writer since the last checkpoint) the file is opened immutable, 
+                # mode=ro alone would create the -wal & -shm files; otherwise they exist already
+                uri = 'file:{0}?mode=ro'.format(quote(os.path.abspath(self.filename)))
+                if not os.path.exists(self.filename+'-wal'):
+                    uri += '&immutable=1'
+                self._conn = sqlite3.connect(uri, uri=True, timeout=self.timeout, isolation_level=None)
+                self._pid = os.getpid()
+                return(self._conn)
+            self._conn = sqlite3.connect(self.filename, timeout=self.timeout, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(self.SCHEMA)
+            if 'keymae_sha1' not in self._columns('results'):
+                # table created before exmaes kept their keymae's hash, they were compared with the stored keymae
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.execute("ALTER TABLE results ADD COLUMN keymae_sha1 TEXT")
+                self._conn.execute("UPDATE results SET keymae_sha1 = (SELECT k.data_sha1 FROM results AS k "
+                                   "WHERE k.target = results.target AND k.exog = ?) WHERE exog != ?", (KEYMAE, KEYMAE))
+                self._conn.execute("COMMIT")
+            self._conn.execute(self.WALKFORWARD_SCHEMA)
+            if 'seconds' not in self._columns('walkforwards'):        # table created before timings were stored
+                self._conn.execute("ALTER TABLE walkforwards ADD COLUMN seconds REAL")
+            self._conn.execute(self.ORDER_SEARCH_SCHEMA)
+            self._conn.execute(self.ORDERS_SCHEMA)
+            self._conn.execute(self.MODELS_SCHEMA)
+            self._conn.execute(self.PROJECTIONS_SCHEMA)
+            self._pid = os.getpid()
+        return(self._conn)
+
+
+    def _columns(self, table):
+        return([ row[1] for row in self._conn.execute("PRAGMA table_info({0})".format(table)) ])
+
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+
+    def __len__(self):
+        return(self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0])
+
+
+    def get(self, target, exog=None, data_hash=None, keymae_hash=None):
+        ''' Lookup a solved mae
+            args: target = target location name
+                  exog = exogenous combo name ('|' joined), None for the keymae
+                  data_hash = hash of the data the mae must have been computed from, None = any
+                  keymae_hash = hash of the keymae an exmae must have been computed against, None = any
+            returns: FLOAT mae, or None when not solved for this data
+        '''
+        row = self.conn.execute(
+            "SELECT mae, data_sha1, keymae_sha1 FROM results WHERE target = ? AND exog = ?",
+            (target, KEYMAE if exog is None else exog)
+        ).fetchone()
+        if row is None or (data_hash is not None and row[1] != data_hash) or (keymae_hash is not None and row[2] != keymae_hash):
+            return(None)
+        return(row[0])
+
+
+    def migrate_hash(self, target, exog, data_hash, legacy_hash):
+        ''' Re-keys a stored result computed under a previous hashing scheme, so it is not recomputed.
+            The exmaes computed against a re-keyed keymae are re-keyed with it.
+            args: target = target location name
+                  exog = exogenous combo name ('|' joined), None for the keymae
+                  data_hash = hash of the data under the current scheme
+                  legacy_hash = hash under the previous scheme, or a function returning it (only
+                                called when a stored result does not match data_hash)
+            returns: True if the stored result was re-keyed
+        '''
+        exog = KEYMAE if exog is None else exog
+        row = self.conn.execute("SELECT data_sha1 FROM results WHERE target = ? AND exog = ?", (target, exog)).fetchone()
+        if row is None or row[0] == data_hash:
+            return(False)
+        if callable(legacy_hash):
+            legacy_hash = legacy_hash()
+        if row[0] != legacy_hash:
+            return(False)           # data changed since the result was stored
+        with self._transaction() as conn:
+            conn.execute("UPDATE results SET data_sha1 = ? WHERE target = ? AND exog = ? AND data_sha1 = ?",
+                         (data_hash, target, exog, legacy_hash))
+            if exog == KEYMAE:
+                conn.execute("UPDATE results SET keymae_sha1 = ? WHERE target = ? AND exog != ? AND keymae_sha1 = ?",
+                             (data_hash, target, KEYMAE, legacy_hash))
+        return(True)
+
+
+    def put(self, target, exog, mae, data_hash, keymae_hash=None):
+        ''' Insert or replace a solved mae
+            args: target = target location name
+                  exog = exogenous combo name ('|' joined), None for the keymae
+                  mae = mean absolute error
+                  data_hash = hash of the data the mae was computed from
+                  keymae_hash = hash of the keymae an exmae was computed against (its data_hash), an exmae
+                                stored without it is never listed as improving the keymae
+        '''
+        self.put_many([(target, exog, mae, data_hash, keymae_hash)])
+
+
+    def put_many(self, rows):
+        ''' Insert or replace (target, exog, mae, data_hash[, keymae_hash]) rows in a single transaction '''
+        rows = [ (row[0], KEYMAE if row[1] is None else row[1], row[2], row[3], row[4] if len(row) > 4 else None) for row in rows ]
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO results (target, exog, mae, data_sha1, keymae_sha1) VALUES (?,?,?,?,?)", rows)
+
+
+    def get_walkforward(self, target, exog=None):
+        ''' Lookup the state of the latest walk-forward evaluation of a model, used to extend the
+            walk-forward when new months are observed instead of evaluating it again
+            args: target = target location name
+                  exog = exogenous combo name ('|' joined), None for the keymae
+            returns: dictionary { 'split', 'nobs', 'data_sha1', 'params', 'predictions', 'seconds' } or None.
+                     The model was fit on the first `split` months, predictions (numpy array) are the
+                     one-step forecasts of months split to nobs-1, data_sha1 is the hash of those nobs months,
+                     seconds is the time spent walking forward (None when not recorded).
+        '''
+        row = self.conn.execute(
+            "SELECT split, nobs, data_sha1, params, predictions, seconds FROM walkforwards WHERE target = ? AND exog = ?",
+            (target, KEYMAE if exog is None else exog)
+        ).fetchone()
+        return(None if row is None else _walkforward_dict(row))
+
+
+    def walkforwards(self, targets=None):
+        ''' Every stored walk-forward, in a single read (see get_walkforward())
+            args: targets = optional collection of target location names the result is limited to
+            returns: list of dictionaries, get_walkforward() items plus 'target' & 'exog' (None for the keymae)
+        '''
+        targets = None if targets is None else set(targets)
+        rows = self.conn.execute("SELECT target, exog, split, nobs, data_sha1, params, predictions, seconds "
+                                 "FROM walkforwards ORDER BY target, exog")
+        found = []
+        for row in rows:
+            if targets is None or row[0] in targets:
+                found.append({ 'target': row[0], 'exog': None if row[1] == KEYMAE else row[1], **_walkforward_dict(row[2:]) })
+        return(found)
+
+
+    def put_walkforward(self, target, exog, split, data_hash, params, predictions, seconds=None):
+        ''' Insert or replace the state of a walk-forward evaluation (see get_walkforward())
+            args: target, exog = see get_walkforward()
+                  split = number of months the model was fit on
+                  data_hash = hash of the months walked (the first split+len(predictions) months)
+                  params = fitted parameter vector at the end of the walk
+                  predictions = one-step forecasts of the months after split
+                  seconds = time spent walking forward
+        '''
+        predictions = np.asarray(predictions, dtype='<f8').reshape(-1)
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO walkforwards (target, exog, split, nobs, data_sha1, params, predictions, seconds) "
+                         "VALUES (?,?,?,?,?,?,?,?)",
+                         (target, KEYMAE if exog is None else exog, int(split), int(split) + predictions.shape[0], data_hash,
+                          np.asarray(params, dtype='<f8').tobytes(), predictions.tobytes(),
+                          None if seconds is None else float(seconds)))
+
+
+    def put_order_result(self, target, search, order_key, data_hash, mae, params, predictions, seconds=None):
+        ''' Insert or replace the evaluation of one SARIMA order of a search (see hypersearch.py)
+            args: target = location name
+                  search = name of the search (evaluation window & settings)
+                  order_key = 'p,d,q,P,D,Q,m' STRING of the order
+                  data_hash = hash of the data the order was evaluated on
+                  mae = mean absolute error of the one-step forecasts
+                  params = fitted parameter vector at the end of the walk-forward
+                  predictions = one-step forecasts of the evaluated months
+                  seconds = time spent evaluating
+        '''
+        predictions = np.asarray(predictions, dtype='<f8').reshape(-1)
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO order_search (target, search, order_key, data_sha1, months, mae, params, predictions, seconds) "
+                         "VALUES (?,?,?,?,?,?,?,?,?)",
+                         (target, search, order_key, data_hash, predictions.shape[0], float(mae),
+                          np.asarray(params, dtype='<f8').tobytes(), predictions.tobytes(),
+                          None if seconds is None else float(seconds)))
+
+
+    def order_results(self, target, search, data_hash=None):
+        ''' Evaluated orders of a search
+            args: target, search = see put_order_result()
+                  data_hash = hash of the data the orders must have been evaluated on, None = any
+            returns: dictionary of order_key -> { 'mae', 'months', 'params', 'predictions', 'seconds', 'data_sha1' }
+        '''
+        rows = self.conn.execute("SELECT order_key, data_sha1, months, mae, params, predictions, seconds FROM order_search "
+                                 "WHERE target = ? AND search = ?", (target, search))
+        found = {}
+        for order_key, row_hash, months, mae, params, predictions, seconds in rows:
+            if data_hash is None or row_hash == data_hash:
+                found[order_key] = { 'mae': mae, 'months': months, 'params': np.frombuffer(params, dtype='<f8'),
+                                     'predictions': np.frombuffer(predictions, dtype='<f8'), 'seconds': seconds,
+                                     'data_sha1': row_hash }
+        return(found)
+
+
+    def put_order(self, target, order_key, mae, baseline_mae, search, data_hash):
+        ''' Insert or replace the SARIMA order selected for a location (see hypersearch.select_orders())
+            args: target = location name
+                  order_key = 'p,d,q,P,D,Q,m' STRING of the selected order
+                  mae = validation mae of the selected order
+                  baseline_mae = validation mae of the order used before the selection
+                  search = name of the search the order was selected by
+                  data_hash = hash of the data the order was selected on
+        '''
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO orders (target, order_key, mae, baseline_mae, search, data_sha1) VALUES (?,?,?,?,?,?)",
+                         (target, order_key, float(mae), None if baseline_mae is None else float(baseline_mae), search, data_hash))
+
+
+    def orders(self):
+        ''' returns: dictionary of location name -> selected 'p,d,q,P,D,Q,m' order STRING '''
+        return(dict(self.conn.execute("SELECT target, order_key FROM orders").fetchall()))
+
+
+    def get_model(self, target, exog, order_key, data_hash):
+        ''' Lookup the fitted parameters of a model fit on the full data
+            args: target = target location name
+                  exog = exogenous combo name ('|' joined), None for the keymae
+                  order_key = 'p,d,q,P,D,Q,m' STRING of the order
+                  data_hash = hash of the data the model must have been fit on
+            returns: numpy array of the parameters, or None when not fit on this data
+        '''
+        row = self.conn.execute("SELECT data_sha1, params FROM models WHERE target = ? AND exog = ? AND order_key = ?",
+                                (target, KEYMAE if exog is None else exog, order_key)).fetchone()
+        if row is None or row[0] != data_hash:
+            return(None)
+        return(np.frombuffer(row[1], dtype='<f8'))
+
+
+    def put_model(self, target, exog, order_key, data_hash, nobs, params):
+        ''' Insert or replace the fitted parameters of a model (see get_model()), a model of 
+            previous data is replaced
+            args: target, exog, order_key, data_hash = see get_model()
+                  nobs = number of months the model was fit on
+                  params = fitted parameter vector
+        '''
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO models (target, exog, order_key, data_sha1, nobs, params) VALUES (?,?,?,?,?,?)",
+                         (target, KEYMAE if exog is None else exog, order_key, data_hash, int(nobs),
+                          np.asarray(params, dtype='<f8').tobytes()))
+
+
+    def get_projection(self, station, order_key, data_hash, begin, months):
+        ''' Lookup a station's projection (point forecasts of its model fit on the full data)
+            args: station = location name
+                  order_key = 'p,d,q,P,D,Q,m' STRING of the order
+                  data_hash = fingerprint of the station's data the projection must have been made from
+                  begin = first projected month ('YYYY-MM-DD')
+                  months = number of projected months, a longer stored projection is cut to it
+            returns: numpy array of the projected rainfall, or None when not projected from this data
+        '''
+        row = self.conn.execute("SELECT data_sha1, begin, months, projected FROM projections WHERE station = ? AND order_key = ?",
+                                (station, order_key)).fetchone()
+        if row is None or row[0] != data_hash or row[1] != begin or row[2] < months:
+            return(None)
+        return(np.frombuffer(row[3], dtype='<f8')[:months])
+
+
+    def put_projection(self, station, order_key, data_hash, begin, projected):
+        ''' Insert or replace a station's projection (see get_projection()), a projection of previous
+            data is replaced
+            args: station, order_key, data_hash, begin = see get_projection()
+                  projected = projected rainfall, one value per month from begin
+        '''
+        projected = np.asarray(projected, dtype='<f8').reshape(-1)
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO projections (station, order_key, data_sha1, begin, months, projected) VALUES (?,?,?,?,?,?)",
+                         (station, order_key, data_hash, begin, len(projected), projected.tobytes()))
+
+
+    def summary(self):
+        ''' returns: dictionary of the number of stored keymaes, exmaes, walkforwards, evaluated orders
+                     (order_search), selected orders, fitted models & exogenous projections
+        '''
+        conn = self.conn
+        tables = { row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'") }
+        counts = { 'keymaes': conn.execute("SELECT COUNT(*) FROM results WHERE exog = ?", (KEYMAE,)).fetchone()[0],
+                   'exmaes': conn.execute("SELECT COUNT(*) FROM results WHERE exog != ?", (KEYMAE,)).fetchone()[0] }
+        for table in ('walkforwards', 'order_search', 'orders', 'models', 'projections'):
+            if table in tables:             # a read-only store of an older version may lack newer tables
+                counts[table] = conn.execute("SELECT COUNT(*) FROM {0}".format(table)).fetchone()[0]
+        return(counts)
+
+
+    def keymaes(self):
+        ''' returns: dictionary of target location -> keymae '''
+        return(dict(self.conn.execute("SELECT target, mae FROM results WHERE exog = ?", (KEYMAE,)).fetchall()))
+
+
+    def to_dict(self):
+        ''' returns: dictionary in the allMAE.json layout
+                     { target: { 'keymae', 'data_source_sha1', 'exogen': { combo: { 'exmae', 'data_source_sha1' } } } }
+        '''
+        all_results = {}
+        rows = self.conn.execute("SELECT target, exog, mae, data_sha1 FROM results ORDER BY target, exog")
+        for target, exog, mae, data_hash in rows:
+            loc_data = all_results.setdefault(target, {})
+            if exog == KEYMAE:
+                loc_data['keymae'] = mae
+                loc_data['data_source_sha1'] = data_hash
+            else:
+                loc_data.setdefault('exogen', {})[exog] = { 'exmae': mae, 'data_source_sha1': data_hash }
+        return(all_results)
+
+
+    def bettermae_dict(self):
+        ''' returns: dictionary in the allBetterMAE.json layout, target locations with at least one
+                     exogenous combo improving their keymae { target: { 'keymae', 'data_source_sha1', 'exogen': { combo: exmae } } }.
+                     Only the exmaes computed against the stored keymae (same keymae data hash) are compared
+                     with it, an exmae left from a keymae of previous data is not.
+        '''
+        conn = self.conn
+        same_keymae = "AND e.keymae_sha1 = k.data_sha1"
+        if self.readonly and 'keymae_sha1' not in self._columns('results'):
+            same_keymae = ""            # read-only store of an older version, its exmaes were compared with the stored keymae
+        rows = conn.execute("SELECT e.target, e.exog, e.mae, k.mae, k.data_sha1 FROM results AS e "
+                            "JOIN results AS k ON k.target = e.target AND k.exog = ? "
+                            "WHERE e.exog != ? AND e.mae < k.mae {0} ORDER BY e.target, e.exog".format(same_keymae), (KEYMAE, KEYMAE))
+        all_bettermae = {}
+        for target, exog, exmae, keymae, data_hash in rows:
+            loc_data = all_bettermae.setdefault(target, { 'keymae': keymae, 'data_source_sha1': data_hash, 'exogen': {} })
+            loc_data['exogen'][exog] = exmae
+        return(all_bettermae)
+
+
+    def import_json(self, filename):
+        ''' Loads an existing allMAE.json into the store (migration of previously solved results)
+            returns: number of rows imported
+        '''
+        with open(filename, 'r') as f:
+            all_results = json.loads(f.read())
+
+        rows = []
+        for target, loc_data in all_results.items():
+            if loc_data.get('keymae') is not None:
+                rows.append((target, None, loc_data['keymae'], loc_data.get('data_source_sha1')))
+            for exog, value in loc_data.get('exogen', {}).items():
+                if isinstance(value, dict) and value.get('exmae') is not None:
+                    # exmaes were only compared with the keymae stored next to them
+                    rows.append((target, exog, value['exmae'], value.get('data_source_sha1'), loc_data.get('data_source_sha1')))
+        self.put_many(rows)
+        return(len(rows))
+
+
+    def export(self, results_filename=None, bettermae_filename=None):
+        ''' Writes the store to the json files read by the prediction stage & other notebooks
+            args: results_filename = destination of allMAE.json layout, None = skip
+                  bettermae_filename = destination of allBetterMAE.json layout, None = skip
+        '''
+        if results_filename is not None:
+            _write_json(results_filename, self.to_dict())
+        if bettermae_filename is not None:
+            _write_json(bettermae_filename, self.bettermae_dict())
+
+
+    def _transaction(self):
+        return(_Transaction(self.conn))
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return(self.conn)
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        return(False)
+
+
+def _walkforward_dict(row):
+    split, nobs, data_hash, params, predictions, seconds = row
+    return({ 'split': split, 'nobs': nobs, 'data_sha1': data_hash, 'params': np.frombuffer(params, dtype='<f8'),
+             'predictions': np.frombuffer(predictions, dtype='<f8'), 'seconds': seconds })
+
+
+def _write_json(filename, data):
+    tmp_filename = "{0}.{1}.tmp".format(filename, os.getpid())
+    with open(tmp_filename, 'w') as f:
+        f.write( json.dumps(data, sort_keys=True, indent=4)+'\n' )
+    os.replace(tmp_filename, filename)                     # readers never see a partial file
+
+
+def open_store(filename, legacy_json=None):
+    ''' Opens the results store, migrating previously solved results from allMAE.json when the
+        store does not exist yet.
+        args: filename = sqlite database file
+              legacy_json = allMAE.json file to import on first use
+        returns: ResultStore
+    '''
+    is_new = not os.path.isfile(filename)
+    store = ResultStore(filename)
+    if is_new and legacy_json is not None and os.path.isfile(legacy_json):
+        count = store.import_json(legacy_json)
+        print("[ResultStore] imported {0} results from {1}".format(count, legacy_json), flush=True)
+    return(store)
@@ -0,0 +1,158 @@
+#!/usr/bin/python
+
+import heapq
+import queue
+import multiprocessing
+
+
+class DependencyError(Exception):
+    ''' Raised (passed to error callbacks) for tasks cancelled because a task they depend on failed '''
+    pass
+
+
+class _Task:
+    def __init__(self, name, fn, args, kwds, cost, depends_on, callback, error_callback):
+        self.name = name
+        self.fn = fn
+        self.args = tuple(args)
+        self.kwds = {} if kwds is None else kwds
+        self.cost = cost
+        self.depends_on = depends_on
+        self.callback = callback
+        self.error_callback = error_callback
+        self.dependents = []
+        self.rank = None
+
+
+class TaskScheduler:
+    ''' Runs a set of tasks, some depending on the result of another, on a single long-lived
+        process pool.  Ready tasks are dispatched longest-first by rank (the task's own cost plus
+        the cost of everything waiting on it) and only a few more tasks than processes are handed
+        to the pool at once, so work released later by a finished dependency still jumps ahead of
+        cheaper queued tasks.  Callbacks run in the calling process.
+    '''
+
+    def __init__(self, processes=None, initializer=None, initargs=(), prefetch=1):
+        ''' args: processes = size of the process pool [Default = # of CPU cores minus 1]
+                  initializer = function run at start of each worker process
+                  initargs = arguments passed to initializer
+                  prefetch = number of tasks queued in the pool beyond one per process
+        '''
+        if processes is None:
+            processes = max(multiprocessing.cpu_count()-1, 1)      # 1 cpu is needed for basic OS functions
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = initargs
+        self.prefetch = prefetch
+        self._tasks = {}
+        self._order = []
+
+
+    def __len__(self):
+        return(len(self._tasks))
+
+
+    def add(self, name, fn, args=(), kwds=None, cost=1.0, depends_on=None, callback=None, error_callback=None):
+        ''' Queue a task
+            args: name = unique hashable identifier of the task
+                  fn = picklable function executed in a worker process
+                  args = positional args of fn
+                  kwds = keyword args of fn
+                  cost = relative runtime estimate used to order tasks longest-first
+                  depends_on = name of a previously added task; its result is appended to args
+                  callback = function(result) run in this process when the task succeeds
+                  error_callback = function(exception) run in this process when the task fails
+        '''
+        if name in self._tasks:
+            raise ValueError("Task {0} already scheduled".format(name))
+        if depends_on is not None and depends_on not in self._tasks:
+            raise ValueError("Task {0} depends on unknown task {1}".format(name, depends_on))
+
+        task = _Task(name, fn, args, kwds, cost, depends_on, callback, error_callback)
+        self._tasks[name] = task
+        self._order.append(name)
+        if depends_on is not None:
+            self._tasks[depends_on].dependents.append(task)
+
+
+    def run(self):
+        ''' Executes every queued task, blocks until all have completed or failed
+            returns: dictionary of task name -> result for the successful tasks
+        '''
+        self._compute_ranks()
+        ready = []
+        for seq, name in enumerate(self._order):
+            task = self._tasks[name]
+            if task.depends_on is None:
+                heapq.heappush(ready, (-task.rank, seq, task))
+
+        results = {}
+        events = queue.Queue()
+        remaining = len(self._tasks)
+        in_flight = 0
+        seq = len(self._order)
+
+        pool = multiprocessing.Pool(processes=self.processes, initializer=self.initializer, initargs=self.initargs)
+        try:
+            while remaining > 0:
+                while len(ready) > 0 and in_flight < self.processes + self.prefetch:
+                    _, _, task = heapq.heappop(ready)
+                    pool.apply_async(
+                        task.fn, args=task.args, kwds=task.kwds,
+                        callback=lambda result, name=task.name: events.put((name, True, result)),
+                        error_callback=lambda err, name=task.name: events.put((name, False, err))
+                    )
+                    in_flight += 1
+
+                if in_flight == 0:
+                    break               # nothing running and nothing ready
+
+                name, succeeded, value = events.get()
+                in_flight -= 1
+                remaining -= 1
+                task = self._tasks[name]
+
+                if succeeded:
+                    results[name] = value
+                    if task.callback is not None:
+                        task.callback(value)
+                    for dependent in task.dependents:         # lazily release dependent tasks
+                        dependent.args = dependent.args + (value,)
+                        heapq.heappush(ready, (-dependent.rank, seq, dependent))
+                        seq += 1
+                else:
+                    if task.error_callback is not None:
+                        task.error_callback(value)
+                    remaining -= self._cancel_dependents(task)
+
+            pool.close()
+
+        except BaseException as err:
+            if isinstance(err, KeyboardInterrupt):
+                print("\nTaskScheduler: KeyboardInterrupt. Terminating workers...", flush=True)
+            pool.terminate()
+            raise
+
+        finally:
+            pool.join()
+
+        return(results)
+
+
+    def _cancel_dependents(self, task):
+        cancelled = 0
+        for dependent in task.dependents:
+            if dependent.error_callback is not None:
+                dependent.error_callback(DependencyError("{0} cancelled, {1} failed".format(dependent.name, task.name)))
+            cancelled += 1 + self._cancel_dependents(dependent)
+        return(cancelled)
+
+
+    def _compute_ranks(self):
+        def rank(task):
+            if task.rank is None:
+                task.rank = task.cost + sum(rank(dependent) for dependent in task.dependents)
+            return(task.rank)
+
+        for task in self._tasks.values():
+            rank(task)
@@ -0,0 +1,103 @@
+#!/usr/bin/python
+
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+class SharedFrame:
+    ''' Read-only float matrix of a DataFrame shared between processes through a memory-mapped
+        .npy file.  The matrix is written once in column-major order, so every column is a
+        contiguous block of the file and worker processes get zero-copy views of it instead of
+        receiving pickled Series/DataFrame slices with each task.
+
+        Pickling a SharedFrame only transfers the file name, column names & index; the mapping is
+        (re)opened lazily in the process that uses it.
+    '''
+
+    def __init__(self, filename, columns, index, owner=False):
+        ''' Use SharedFrame.create() to build one from a DataFrame
+            args: filename = .npy file holding the (rows x columns) matrix in fortran order
+                  columns = list of column names, in matrix order
+                  index = row labels (e.g. DatetimeIndex)
+                  owner = whether close() removes the file
+        '''
+        self.filename = filename
+        self.columns = list(columns)
+        self.index = index
+        self.owner = owner
+        self._positions = { name: i for i, name in enumerate(self.columns) }
+        self._values = None
+        self._pid = None
+
+
+    @classmethod
+    def create(cls, frame, filename=None, dirname=None):
+        ''' Writes frame's values to a memory-mappable file
+            args: frame = DataFrame of numeric columns
+                  filename = destination .npy file, None = new temporary file removed by close()
+                  dirname = directory of the temporary file [Default = system temp dir]
+            returns: SharedFrame
+        '''
+        owner = filename is None
+        if owner:
+            fd, filename = tempfile.mkstemp(prefix='sharedframe-', suffix='.npy', dir=dirname)
+            os.close(fd)
+        np.save(filename, np.asfortranarray(frame.values, dtype=float))
+        return(cls(filename, frame.columns, frame.index, owner=owner))
+
+
+    @property
+    def values(self):
+        ''' (rows x columns) read-only memory map of the matrix '''
+        if self._values is None or self._pid != os.getpid():
+            self._values = np.load(self.filename, mmap_mode='r')
+            self._pid = os.getpid()
+        return(self._values)
+
+
+    @property
+    def shape(self):
+        return((len(self.index), len(self.columns)))
+
+
+    def position(self, name):
+        ''' returns: INT column number of name in the matrix '''
+        return(self._positions[name])
+
+
+    def series(self, name, start=None, stop=None):
+        ''' returns: Series view of column name over rows [start:stop] (no copy) '''
+        rows = slice(start, stop)
+        return(pd.Series(self.values[rows, self.position(name)], index=self.index[rows], name=name, copy=False))
+
+
+    def frame(self, names, start=None, stop=None):
+        ''' returns: DataFrame of columns names over rows [start:stop] '''
+        rows = slice(start, stop)
+        positions = [ self.position(name) for name in names ]
+        return(pd.DataFrame(self.values[rows, positions], index=self.index[rows], columns=list(names)))
+
+
+    def close(self):
+        ''' Releases the mapping, the file is removed when it was created as a temporary file '''
+        self._values = None
+        if self.owner and self._pid in (None, os.getpid()) and os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return(False)
+
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_values'] = None             # workers map the file themselves
+        state['_pid'] = None
+        state['owner'] = False              # only the creating process removes the file
+        return(state)
@@ -0,0 +1,347 @@
+#!/usr/bin/python
+
+import math
+import numpy as np
+import statsmodels.api as sm
+from fingerprint import combine
+
+DEFAULT_ORDER = (4, 0, 3)
+DEFAULT_SEASONAL_ORDER = (3, 0, 4, 12)
+
+
+def order_key(order, seasonal_order):
+    ''' returns: 'p,d,q,P,D,Q,m' STRING identifying an order in the results store '''
+    return(','.join(str(int(o)) for o in tuple(order) + tuple(seasonal_order)))
+
+
+def parse_order_key(key):
+    ''' returns: ((p,d,q), (P,D,Q,m)) tuple of an order_key() '''
+    values = tuple(int(o) for o in key.split(','))
+    return(values[:3], values[3:])
+
+
+def model_signature(signature, order=DEFAULT_ORDER, seasonal_order=DEFAULT_SEASONAL_ORDER, refit_every=1):
+    ''' Signature of a walk-forward's results: the data signature extended with the model's order
+        when it is not the global order and with its refit cadence when it does not refit every month
+        (results of the global order refit every month, the legacy results, keep the data signature)
+        args: signature = fingerprint of the model's data (see fingerprint.py)
+              order, seasonal_order = SARIMA order of the model
+              refit_every = see WalkForward
+        returns: STRING signature
+    '''
+    parts = [signature]
+    if (tuple(order), tuple(seasonal_order)) != (DEFAULT_ORDER, DEFAULT_SEASONAL_ORDER):
+        parts.append(order_key(order, seasonal_order))
+    if refit_every != 1:
+        parts.append("refit={0}".format(refit_every))
+    return(signature if len(parts) == 1 else combine(parts))
+
+
+def sarima_model(endog, order=DEFAULT_ORDER, seasonal_order=DEFAULT_SEASONAL_ORDER, exog=None):
+    ''' Builds (does not fit) the SARIMAX model used throughout the project
+        args: endog = array-like of the target location's rainfall
+              order = (p,d,q) tuple
+              seasonal_order = (P,D,Q,m) tuple
+              exog = array-like of exogenous location(s) rainfall aligned with endog
+        returns: statsmodels SARIMAX model object
+    '''
+    return sm.tsa.statespace.SARIMAX(endog, exog, order=order, seasonal_order=seasonal_order,
+                                     enforce_stationarity=False, enforce_invertibility=False,
+                                     initialization='approximate_diffuse')
+
+
+class WalkForward:
+    ''' One-step-ahead walk-forward engine.  The model is fit by MLE once, then every newly
+        observed month is appended to the fitted results by running the Kalman filter over the
+        new observation only (results.extend), keeping the estimated parameters.  Optionally,
+        the parameters are re-estimated every `refit_every` appended months, warm-started from
+        the previous estimate.
+
+        Forecasts follow model_based_forecast(): the exogenous values of the latest observed
+        month are used as the exogenous input of the month being forecast.
+
+        History is kept in a preallocated buffer (grown by doubling when full) so appending a
+        month writes into the buffer instead of copying the series; refits use views of it.
+    '''
+
+    def __init__(self, order=DEFAULT_ORDER, seasonal_order=DEFAULT_SEASONAL_ORDER, refit_every=None,
+                 param_cache=None, cache_key=None):
+        ''' args: order = (p,d,q) tuple
+                  seasonal_order = (P,D,Q,m) tuple
+                  refit_every = number of appended months between MLE refits, None = never refit
+                  param_cache = ParamCache to warm-start the initial fit from and store fitted params in
+                  cache_key = (location, exog combo name) tuple identifying the model in param_cache
+        '''
+        if refit_every is not None and refit_every < 1:
+            raise ValueError("refit_every must be a positive integer or None. Provided {0}".format(refit_every))
+
+        self.order = tuple(order)
+        self.seasonal_order = tuple(seasonal_order)
+        self.refit_every = refit_every
+        self.param_cache = param_cache
+        self.cache_key = (None, None) if cache_key is None else tuple(cache_key)
+        self.results = None
+        self.n_fits = 0                 # number of full MLE fits performed
+        self._endog = None              # preallocated buffers, only [:_nobs] is valid history
+        self._exog = None
+        self._nobs = 0
+        self._since_fit = 0
+
+
+    @property
+    def params(self):
+        return(None if self.results is None else self.results.params)
+
+    @property
+    def nobs(self):
+        return(self._nobs)
+
+    @property
+    def endog(self):
+        return(None if self._endog is None else self._endog[:self._nobs])
+
+    @property
+    def exog(self):
+        return(None if self._exog is None else self._exog[:self._nobs])
+
+
+    def fit(self, endog, exog=None, start_params=None, capacity=None):
+        ''' Full MLE fit of the model on the provided history
+            args: endog = array-like of the target location's rainfall
+                  exog = array-like of exogenous location(s) rainfall, or None
+                  start_params = optional parameter vector to start the optimizer from, overrides param_cache
+                  capacity = total number of months expected (history + future appends) to preallocate
+            returns: self
+        '''
+        self._load(endog, exog, capacity)
+        self._fit(start_params)
+        return(self)
+
+
+    def resume(self, endog, params, exog=None, capacity=None, since_fit=0):
+        ''' Restores a walk-forward from previously fitted parameters without an MLE fit: the
+            Kalman filter is run over the provided history with the parameters held fixed, giving
+            the state fit() followed by append() of the same months would have reached.
+            args: endog = array-like of the target location's rainfall, the whole history walked so far
+                  params = parameter vector of the earlier fit (see params)
+                  exog, capacity = see fit()
+                  since_fit = number of the provided months appended after params were fit; when a
+                              refit is due (see refit_every) the model is fit again, warm-started
+                              from params, as append() would have done
+            returns: self
+        '''
+        self._load(endog, exog, capacity)
+        if self.refit_every is not None and since_fit >= self.refit_every:
+            self._fit(start_params=np.asarray(params, dtype=float))
+        else:
+            mod = sarima_model(self.endog, self.order, self.seasonal_order, exog=self.exog)
+            self.results = mod.filter(np.asarray(params, dtype=float))
+            self._since_fit = since_fit
+        return(self)
+
+
+    def append(self, endog, exog=None):
+        ''' Adds newly observed month(s) to the model.  Extends the current filter state unless a
+            refit is due according to the refit cadence.
+            args: endog = array-like of new rainfall observation(s)
+                  exog = array-like of the matching exogenous observation(s), required when fit with exog
+            returns: self
+        '''
+        if self.results is None:
+            raise RuntimeError("WalkForward.fit() must be called before append()")
+
+        new_endog = np.asarray(endog, dtype=float).reshape(-1)
+        new_exog = None
+        if self._exog is not None:
+            if exog is None:
+                raise ValueError("Model was fit with exogenous data, exog is required to append")
+            new_exog = np.asarray(exog, dtype=float).reshape(new_endog.shape[0], -1)
+
+        start, end = self._nobs, self._nobs + new_endog.shape[0]
+        if end > self._endog.shape[0]:
+            self._grow(end)
+        self._endog[start:end] = new_endog
+        if new_exog is not None:
+            self._exog[start:end] = new_exog
+        self._nobs = end
+        self._since_fit += new_endog.shape[0]
+
+        if self.refit_every is not None and self._since_fit >= self.refit_every:
+            self._fit(start_params=self.results.params)      # warm-start from previous estimate
+        elif hasattr(self.results, 'extend'):
+            self.results = self.results.extend(new_endog, exog=new_exog)
+        else:       # statsmodels < 0.11, filter entire history with the fixed parameters (no MLE)
+            mod = sarima_model(self.endog, self.order, self.seasonal_order, exog=self.exog)
+            self.results = mod.filter(self.results.params)
+        return(self)
+
+
+    def forecast(self):
+        ''' returns: FLOAT forecast of the month following the latest observation '''
+        if self.results is None:
+            raise RuntimeError("WalkForward.fit() must be called before forecast()")
+
+        if self._exog is None:
+            nextMonth = self.results.forecast()
+        else:
+            nextMonth = self.results.forecast(exog=self._exog[self._nobs-1:self._nobs])
+        return(float(np.asarray(nextMonth)[0]))
+
+
+    def _load(self, endog, exog, capacity):
+        endog = np.asarray(endog, dtype=float).reshape(-1)
+        nobs = endog.shape[0]
+        capacity = nobs if capacity is None else max(capacity, nobs)
+
+        self._endog = np.empty(capacity)
+        self._endog[:nobs] = endog
+        if exog is None:
+            self._exog = None
+        else:
+            exog = np.asarray(exog, dtype=float).reshape(nobs, -1)
+            self._exog = np.empty((capacity, exog.shape[1]))
+            self._exog[:nobs] = exog
+        self._nobs = nobs
+
+
+    def _fit(self, start_params=None):
+        mod = sarima_model(self.endog, self.order, self.seasonal_order, exog=self.exog)
+        if self.param_cache is None:
+            self.results = mod.fit(start_params=start_params, disp=0)
+        elif start_params is None:
+            self.results = self.param_cache.fit(mod, *self.cache_key, disp=0)
+        else:
+            self.results = mod.fit(start_params=start_params, disp=0)
+            self.param_cache.put(*self.cache_key, self.order, self.seasonal_order, self._nobs, self.results.params)
+        self.n_fits += 1
+        self._since_fit = 0
+
+
+    def _grow(self, min_capacity):
+        capacity = max(min_capacity, 2*self._endog.shape[0])
+        endog = np.empty(capacity)
+        endog[:self._nobs] = self._endog[:self._nobs]
+        self._endog = endog
+        if self._exog is not None:
+            exog = np.empty((capacity, self._exog.shape[1]))
+            exog[:self._nobs] = self._exog[:self._nobs]
+            self._exog = exog
+
+
+class MAEAccumulator:
+    ''' Running mean absolute error, updated one (actual, predicted) pair at a time '''
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+
+    def update(self, actual, predicted):
+        self.total += abs(float(actual) - float(predicted))
+        self.count += 1
+        return(self)
+
+    @property
+    def value(self):
+        return(math.nan if self.count == 0 else self.total / self.count)
+
+
+def walk_forward(endog, split, exog=None, index=None, order=DEFAULT_ORDER,
+                 seasonal_order=DEFAULT_SEASONAL_ORDER, refit_every=None, param_cache=None, cache_key=None, engine=None):
+    ''' Generator of one-step-ahead forecasts over endog[split:].  The model is fit on endog[:split]
+        and each month is appended to the model after its forecast has been yielded.  endog and
+        exog are used by index as a single array, no slices of the series are copied.
+        args: endog = 1-D array-like of the full series (training + test)
+              split = index of the first month to forecast
+              exog = 2-D array-like of exogenous data aligned with endog, or None
+              index = labels (e.g. DatetimeIndex) of the forecast months endog[split:], yielded with each forecast
+              order, seasonal_order, refit_every, param_cache, cache_key = see WalkForward
+              engine = WalkForward to walk with (e.g. to read its params afterwards), built from the
+                       arguments above when None
+        yields: (date, prediction) tuples, date is the position in endog when index is None
+    '''
+    endog, exog = _as_arrays(endog, exog, split)
+    if engine is None:
+        engine = WalkForward(order=order, seasonal_order=seasonal_order, refit_every=refit_every,
+                             param_cache=param_cache, cache_key=cache_key)
+    engine.fit(endog[:split], None if exog is None else exog[:split], capacity=endog.shape[0])
+    return(_walk(engine, endog, exog, split, index))
+
+
+def resume_walk_forward(endog, start, params, exog=None, index=None, order=DEFAULT_ORDER,
+                        seasonal_order=DEFAULT_SEASONAL_ORDER, refit_every=None, param_cache=None, cache_key=None,
+                        engine=None, since_fit=0):
+    ''' walk_forward() continued from an earlier walk over endog[:start] (e.g. once new months are
+        observed): the model is restored from the earlier walk's parameters (WalkForward.resume(),
+        no MLE fit unless a refit is due), then forecasts endog[start:] one month at a time.
+        args: endog = 1-D array-like of the full series
+              start = index of the first month not forecast by the earlier walk
+              params = WalkForward.params at the end of the earlier walk
+              exog, index, order, seasonal_order, refit_every, param_cache, cache_key, engine = see walk_forward()
+              since_fit = see WalkForward.resume()
+        yields: (date, prediction) tuples for endog[start:]
+    '''
+    endog, exog = _as_arrays(endog, exog, start)
+    if engine is None:
+        engine = WalkForward(order=order, seasonal_order=seasonal_order, refit_every=refit_every,
+                             param_cache=param_cache, cache_key=cache_key)
+    engine.resume(endog[:start], params, None if exog is None else exog[:start], capacity=endog.shape[0], since_fit=since_fit)
+    return(_walk(engine, endog, exog, start, index))
+
+
+def _as_arrays(endog, exog, split):
+    endog = np.asarray(endog, dtype=float).reshape(-1)
+    nobs = endog.shape[0]
+    if exog is not None:
+        exog = np.asarray(exog, dtype=float).reshape(nobs, -1)
+    if not 0 < split < nobs:
+        raise ValueError("split must be within (0, {0}). Provided {1}".format(nobs, split))
+    return(endog, exog)
+
+
+def _walk(engine, endog, exog, start, index):
+    nobs = endog.shape[0]
+    for t in range(start, nobs):
+        yield (t if index is None else index[t-start], engine.forecast())
+        if t+1 < nobs:
+            engine.append(endog[t:t+1], None if exog is None else exog[t:t+1])
+
+
+def window_mae(actuals, predictions, window):
+    ''' Mean absolute error of the latest `window` one-step forecasts, so the evaluation window
+        slides forward as months are appended without walking the earlier months again
+        args: actuals = array-like of the observed months matching predictions
+              predictions = array-like of every one-step forecast of a walk-forward
+              window = number of latest forecasts evaluated
+        returns: FLOAT mean absolute error
+    '''
+    actuals = np.asarray(actuals, dtype=float).reshape(-1)
+    predictions = np.asarray(predictions, dtype=float).reshape(-1)
+    available = min(actuals.shape[0], predictions.shape[0])
+    if not 0 < window <= available:
+        raise ValueError("window must be within [1, {0}]. Provided {1}".format(available, window))
+    return(float(np.mean(np.abs(actuals[-window:] - predictions[-window:]))))
+
+
+def walk_forward_split(train, test, exotrain=None, exotest=None, **kwargs):
+    ''' Convenience wrapper of walk_forward() for already split pandas data.  Stacks train and test
+        into one preallocated array (and exotrain/exotest into another) then walks over test.
+        args: train, test = Series/arrays of the target location
+              exotrain, exotest = DataFrames/arrays of the exogenous location(s), or None
+              kwargs = passed on to walk_forward()
+        yields: (date, prediction) tuples, dates taken from test's index when available
+    '''
+    split = len(train)
+    endog = np.empty(split + len(test))
+    endog[:split] = np.asarray(train, dtype=float).reshape(-1)
+    endog[split:] = np.asarray(test, dtype=float).reshape(-1)
+
+    exog = None
+    if exotrain is not None:
+        exotrain = np.asarray(exotrain, dtype=float).reshape(split, -1)
+        exog = np.empty((endog.shape[0], exotrain.shape[1]))
+        exog[:split] = exotrain
+        exog[split:] = np.asarray(exotest, dtype=float).reshape(len(test), -1)
+
+    index = test.index if hasattr(test, 'index') else None
+    for date, prediction in walk_forward(endog, split, exog, index=index, **kwargs):
+        yield (date, prediction)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the modules are run from src/ (see scripts/build.py), tests import them the same way
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import subprocess
+import importlib.util
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ['Data_Wrangling_CAP1', 'Exogenous_Variables']
+
+
+@pytest.fixture(scope='module')
+def build():
+    spec = importlib.util.spec_from_file_location('build', os.path.join(ROOT, 'scripts', 'build.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return(module)
+
+
+def _notebook(tmp_path, *sources):
+    filename = str(tmp_path / 'stage.ipynb')
+    cells = [ { 'cell_type': 'code', 'execution_count': None, 'metadata': {}, 'outputs': [], 'source': source } for source in sources ]
+    with open(filename, 'w') as f:
+        f.write(json.dumps({ 'cells': cells, 'metadata': {}, 'nbformat': 4, 'nbformat_minor': 2 }))
+    return(filename)
+
+
+def test_magics_and_strings(tmp_path, build):
+    notebook = _notebook(tmp_path,
+        "try:\n    raise NameError()\n    %store -r exogen\nexcept NameError:\n    exogen = {}\n",
+        "TEXT = '''first\n%not a magic\n    indented'''\nCOUNT = len(TEXT)\n",
+        "%%time\nx = 1\n")
+    pyfile = str(tmp_path / 'stage.py')
+    build.notebook_to_script(notebook, pyfile)
+    with open(pyfile, 'r') as f:
+        script = f.read()
+    assert "    get_ipython().run_line_magic('store', '-r exogen')\n" in script
+    assert "get_ipython().run_cell_magic('time', '', 'x = 1\\n')" in script
+
+    build.guard_main(pyfile)
+    namespace = { '__name__': 'stage' }
+    exec(compile(open(pyfile).read(), pyfile, 'exec'), namespace)
+    assert 'TEXT' not in namespace                              # imported: nothing runs
+    magics = []
+    class IPython:
+        def run_cell_magic(self, *args):
+            magics.append(args)
+    namespace = { '__name__': '__main__', 'get_ipython': IPython }
+    exec(compile(open(pyfile).read(), pyfile, 'exec'), namespace)
+    assert namespace['exogen'] == {} and namespace['TEXT'] == 'first\n%not a magic\n    indented'
+    assert magics == [('time', '', 'x = 1\n')]
+
+
+@pytest.mark.parametrize('stage', STAGES)
+def test_stage_imports_without_side_effects(tmp_path, build, stage):
+    pyfile = str(tmp_path / (stage+'.py'))
+    build.notebook_to_script(os.path.join(ROOT, 'src', stage+'.ipynb'), pyfile)
+    build.guard_main(pyfile)
+    compile(open(pyfile).read(), pyfile, 'exec')
+
+    data_files = sorted(os.listdir(os.path.join(ROOT, 'data', 'manipulated_data')))
+    code = ("import sys; sys.path.insert(1, {0!r}); import {1} as stage; "
+            "print(sorted(name for name in vars(stage) if not name.startswith('__')), "
+            "sorted(m for m in ('pandas', 'statsmodels', 'sklearn', 'tqdm') if m in sys.modules))").format(os.path.join(ROOT, 'src'), stage)
+    out = subprocess.check_output([sys.executable, '-c', code], cwd=str(tmp_path), universal_newlines=True)
+    assert out.splitlines() == ['[] []']
+    assert sorted(os.listdir(os.path.join(ROOT, 'data', 'manipulated_data'))) == data_files
+    assert [ name for name in os.listdir(str(tmp_path)) if name != '__pycache__' ] == [stage+'.py']
@@ -0,0 +1,88 @@
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from walkforward import sarima_model
+from ensemble import simulate_paths, season_matrix, path_quantiles, QuantileWriter, read_station_quantiles
+
+REPETITIONS = 4000
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+@pytest.fixture
+def rainfall():
+    rs = np.random.RandomState(1)
+    dates = pd.date_range('2000-01-01', periods=120, freq='MS')
+    exog = 3.0 + np.sin(np.arange(len(dates)) * 2*np.pi/12) + rs.normal(scale=0.3, size=len(dates))
+    values = np.empty(len(dates))
+    values[0] = 4.0
+    for t in range(1, len(values)):
+        values[t] = 1.0 + 0.5*values[t-1] + 0.4*exog[t] + rs.normal(scale=0.5)
+    return(pd.Series(values, index=dates), pd.Series(exog, index=dates))
+
+
+def _assert_close_to_forecast(paths, forecast):
+    mean, sd = np.asarray(forecast.predicted_mean), np.sqrt(np.asarray(forecast.var_pred_mean))
+    assert paths.shape == (REPETITIONS, len(mean))
+    assert np.all(np.abs(paths.mean(axis=0) - mean) < 5*sd/np.sqrt(REPETITIONS))     # simulation noise only
+    np.testing.assert_allclose(paths.std(axis=0), sd, rtol=0.1)
+
+
+def test_paths_follow_the_forecast(rainfall):
+    endog, exog = rainfall
+    results = sarima_model(endog.values, (1, 0, 1), (1, 0, 0, 12)).fit(disp=0)
+    paths = simulate_paths(results, 12, REPETITIONS, random_state=0)
+    _assert_close_to_forecast(paths, results.get_forecast(12))
+
+    skipped = simulate_paths(results, 6, REPETITIONS, skip=6, random_state=0)     # forecasts starting later
+    _assert_close_to_forecast(skipped, results.get_prediction(start=len(endog)+6, end=len(endog)+11))
+
+
+def test_exog_paths_follow_the_forecast(rainfall):
+    endog, exog = rainfall
+    results = sarima_model(endog.values[:-12], (1, 0, 0), (0, 0, 0, 0), exog=exog.values[:-12]).fit(disp=0)
+    future_exog = exog.values[-12:].reshape(-1, 1)
+    paths = simulate_paths(results, 12, REPETITIONS, exog_forecast=future_exog, random_state=0)
+    _assert_close_to_forecast(paths, results.get_forecast(12, exog=future_exog))
+    with pytest.raises(ValueError):
+        simulate_paths(results, 12, REPETITIONS)
+
+
+def test_season_matrix_keeps_complete_seasons():
+    matrix, labels = season_matrix(pd.date_range('2019-11-01', periods=8, freq='MS'))     # Nov 2019 - Jun 2020
+    assert labels == ['DJF 2020', 'MAM 2020']
+    assert matrix.shape == (8, 2)
+    assert matrix[:, 0].tolist() == [0, 1, 1, 1, 0, 0, 0, 0]
+    assert matrix[:, 1].tolist() == [0, 0, 0, 0, 1, 1, 1, 0]
+
+
+def test_path_quantiles():
+    months = pd.date_range('2019-12-01', periods=6, freq='MS')
+    seasons, labels = season_matrix(months)
+    paths = np.tile(np.arange(101, dtype=float)[:, None], (1, len(months))) + np.arange(len(months))
+    monthly, seasonal = path_quantiles(paths, (0.05, 0.5, 0.95), seasons)
+    assert monthly.dtype == seasonal.dtype == np.float32
+    assert monthly.shape == (3, 6) and seasonal.shape == (3, 2)
+    np.testing.assert_allclose(monthly[:, 0], [5, 50, 95])
+    np.testing.assert_allclose(monthly[1], 50 + np.arange(6))
+    np.testing.assert_allclose(seasonal[:, 0], 3*np.array([5, 50, 95]) + 0+1+2)        # DJF = Dec + Jan + Feb
+
+
+def test_quantile_writer(tmp_path):
+    months = pd.date_range('2019-12-01', periods=3, freq='MS')
+    seasons, labels = season_matrix(months)
+    writer = QuantileWriter(str(tmp_path), ['A', 'B'], (0.1, 0.9), months, labels, flush_every=1)
+    monthly, seasonal = path_quantiles(np.random.RandomState(0).gamma(2.0, size=(50, 3)), (0.1, 0.9), seasons)
+    writer.write('B', monthly, seasonal)
+    writer.close()
+
+    result_monthly, result_seasonal = read_station_quantiles(str(tmp_path), 'B')
+    np.testing.assert_array_equal(result_monthly.values, monthly.T)
+    assert list(result_monthly.columns) == [0.1, 0.9] and list(result_seasonal.index) == ['DJF 2020']
+    assert np.isnan(read_station_quantiles(str(tmp_path), 'A')[0].values).all()         # never written
@@ -0,0 +1,64 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from sharedframe import SharedFrame
+
+NOTEBOOK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'Exogenous_Variables.ipynb')
+pytestmark = pytest.mark.filterwarnings('ignore::Warning')     # statsmodels convergence warnings of the small series
+SMALL_ORDER = '1,0,0,0,0,0,0'            # the walk-forward logic does not depend on the order
+
+
+def _cells(notebook, *names):
+    ''' returns: source of the code cells defining names, in notebook order '''
+    sources = [ ''.join(cell['source']) for cell in notebook['cells'] if cell['cell_type'] == 'code' ]
+    return([ source for source in sources if any('def {0}('.format(name) in source for name in names) ])
+
+
+@pytest.fixture
+def library(tmp_path):
+    ''' the notebook's function library, with its data files in tmp_path '''
+    with open(NOTEBOOK, 'r') as f:
+        notebook = json.loads(f.read())
+    imports = ''.join(notebook['cells'][0]['source']).split('warnings.filterwarnings')[0]
+    namespace = { '__name__': 'exogenous_variables_test', 'destdir': str(tmp_path) }
+    exec(imports.replace('from tqdm import tqdm_notebook as tqdm', 'from tqdm import tqdm'), namespace)
+    for source in _cells(notebook, 'location_order', 'appendFinder', 'walk_forward_mae'):
+        exec(source, namespace)
+    namespace['location_orders']['A, NC'] = SMALL_ORDER
+    yield namespace
+    namespace['results_store'].close()
+
+
+def _rainfall(months):
+    rs = np.random.RandomState(5)
+    values = np.empty(60)
+    values[0] = 4.0
+    for t in range(1, len(values)):
+        values[t] = 1.5 + 0.5*values[t-1] + rs.normal()
+    return(pd.DataFrame({ 'A, NC': values[:months] }, index=pd.date_range('2000-01-01', periods=months, freq='MS')))
+
+
+def _walk(library, months, split):
+    shared = SharedFrame.create(_rainfall(months))
+    try:
+        library['initEvaluationWorker'](shared)
+        return(library['walk_forward_mae']('A, NC', (), split, "(keymae)"))
+    finally:
+        shared.close()
+
+
+@pytest.mark.parametrize('refit_every', [None, 1, 4])
+def test_append_mode_matches_a_full_walk(library, refit_every):
+    library['WALKFORWARD_REFIT_EVERY'] = refit_every
+    _walk(library, 49, 40)                                  # stored walk of months 40-48
+    appended_mae = _walk(library, 56, 44)                   # 7 new months: append mode
+    appended = library['results_store'].get_walkforward('A, NC')
+    assert appended['split'] == 40 and appended['nobs'] == 56
+
+    tr, test = _rainfall(56)['A, NC'][:40], _rainfall(56)['A, NC'][40:]       # full walk over the same months
+    walk_state = {}
+    library['maeFinder'](tr, test, walk_state=walk_state)
+    np.testing.assert_allclose(appended['predictions'], walk_state['predictions'], rtol=1e-6)
+    assert appended_mae == pytest.approx(library['window_mae'](test.values, walk_state['predictions'], 12), rel=1e-6)
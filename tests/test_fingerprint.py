@@ -0,0 +1,53 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from fingerprint import Fingerprinter, column_fingerprint, index_fingerprint, combine, legacy_sha1, read_legacy_csv
+
+
+def _frame():
+    index = pd.date_range('2000-01-01', periods=24, freq='MS')
+    return(pd.DataFrame({ 'A': np.arange(24, dtype=float), 'B': np.linspace(0, 1, 24), 'C': np.ones(24) }, index=index))
+
+
+def test_column_fingerprint_tracks_content():
+    frame = _frame()
+    fingerprint = column_fingerprint(frame['A'])
+    assert column_fingerprint(frame['A'].copy()) == fingerprint
+    assert column_fingerprint(frame['A'].rename('Z')) != fingerprint        # location name
+
+    changed = frame['A'].copy()
+    changed.iloc[5] += 0.001
+    assert column_fingerprint(changed) != fingerprint                       # values
+    assert column_fingerprint(frame['A'].iloc[:-1]) != fingerprint          # appended month
+    shifted = frame['A'].copy()
+    shifted.index = shifted.index + pd.DateOffset(months=1)
+    assert column_fingerprint(shifted) != fingerprint                       # months
+    assert index_fingerprint(frame.index) != index_fingerprint(shifted.index)
+
+
+def test_combination_is_order_sensitive():
+    frame = _frame()
+    fingerprints = Fingerprinter(frame)
+    assert fingerprints.combination(['A', 'B']) == combine([column_fingerprint(frame['A']), column_fingerprint(frame['B'])])
+    assert fingerprints.combination(['A', 'B']) != fingerprints.combination(['B', 'A'])
+
+
+def test_legacy_sha1_is_csv_hash():
+    frame = _frame()
+    assert legacy_sha1(frame[['A', 'B']]) == hashlib.sha1(bytes(frame[['A', 'B']].to_csv(), 'utf-8')).hexdigest()
+    assert legacy_sha1(frame['A']) == hashlib.sha1(bytes(frame['A'].to_csv(header=False), 'utf-8')).hexdigest()
+
+
+def test_legacy_sha1_matches_stored_results():
+    # hashes stored in the bundled allMAE.json (pandas 0.25) are reproduced from rainfalldata.csv
+    dirname = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'manipulated_data')
+    with open(os.path.join(dirname, 'allMAE.json'), 'r') as f:
+        all_results = json.loads(f.read())
+    data = read_legacy_csv(os.path.join(dirname, 'rainfalldata.csv'))
+    keymaes = [ legacy_sha1(data[target]) == result['data_source_sha1'] for target, result in all_results.items() ]
+    exmaes = [ legacy_sha1(data[exog.split('|')]) == exmae['data_source_sha1']
+               for result in all_results.values() for exog, exmae in result.get('exogen', {}).items() ]
+    assert (sum(keymaes), len(keymaes)) == (51, 51)
+    assert (sum(exmaes), len(exmaes)) == (364, 364)
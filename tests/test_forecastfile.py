@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from forecastfile import write_forecasts, read_forecasts, read_station, forecast_stations
+
+
+@pytest.fixture
+def forecasts():
+    stations = ['RALEIGH, NC', 'NORFOLK, VA', 'ASHEVILLE, NC']
+    columns = [ prefix+station for station in stations for prefix in ('', 'lower ', 'upper ') ]
+    rs = np.random.RandomState(2)
+    return(pd.DataFrame(rs.gamma(2.0, 2.0, size=(18, len(columns))), columns=columns,
+                        index=pd.date_range('2019-05-01', periods=18, freq='MS')))
+
+
+def test_round_trip(tmp_path, forecasts):
+    filename = str(tmp_path / 'predictions.npz')
+    assert write_forecasts(filename, forecasts) == ['RALEIGH, NC', 'NORFOLK, VA', 'ASHEVILLE, NC']
+    assert forecast_stations(filename) == ['RALEIGH, NC', 'NORFOLK, VA', 'ASHEVILLE, NC']
+
+    result = read_forecasts(filename)
+    assert list(result.columns) == list(forecasts.columns)
+    assert list(result.index) == list(forecasts.index)
+    np.testing.assert_allclose(result.values, forecasts.values, rtol=1e-6)      # stored as float32
+
+
+def test_read_station_and_subset(tmp_path, forecasts):
+    filename = str(tmp_path / 'predictions.npz')
+    write_forecasts(filename, forecasts)
+
+    station = read_station(filename, 'NORFOLK, VA')
+    assert list(station.columns) == ['NORFOLK, VA', 'lower NORFOLK, VA', 'upper NORFOLK, VA']
+    np.testing.assert_allclose(station.values, forecasts[station.columns].values, rtol=1e-6)
+
+    subset = read_forecasts(filename, ['ASHEVILLE, NC', 'RALEIGH, NC'])
+    assert list(subset.columns) == ['ASHEVILLE, NC', 'lower ASHEVILLE, NC', 'upper ASHEVILLE, NC',
+                                    'RALEIGH, NC', 'lower RALEIGH, NC', 'upper RALEIGH, NC']
+    np.testing.assert_allclose(subset.values, forecasts[subset.columns].values, rtol=1e-6)
+    assert read_forecasts(filename, []).shape == (18, 0)
+    with pytest.raises(KeyError):
+        read_station(filename, 'DURHAM, NC')
+
+
+def test_rejects_other_layouts(tmp_path, forecasts):
+    filename = str(tmp_path / 'predictions.npz')
+    with pytest.raises(ValueError):
+        write_forecasts(filename, forecasts.iloc[:, :4])
+    with pytest.raises(ValueError):
+        write_forecasts(filename, forecasts[forecasts.columns[[1, 0, 2, 3, 4, 5]]])
+    assert not (tmp_path / 'predictions.npz').exists()
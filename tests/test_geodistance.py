@@ -0,0 +1,104 @@
+import os
+import json
+from math import radians, sin, cos, asin, sqrt
+import numpy as np
+import pandas as pd
+import pytest
+from geodistance import coordinates, haversine_matrix, distance_frame, SpatialIndex
+
+RAW_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'raw_data')
+DATA_DIR = os.path.join(os.path.dirname(RAW_DIR), 'manipulated_data')
+DUPLICATES = ['RALEIGH AP, NC', 'GREENSBORO, NC', 'WILMINGTON 7 N, NC','LUMBERTON, NC',
+              'MYRTLE BEACH, SC','CHARLOTTE DOUGLAS AIRPORT, NC','GRNVL SPART INTL AP, SC',
+              'PICKENS, SC','MT. MITCHELL, NC','CAESARS HEAD AREA, SC']
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    ''' Data_Wrangling_CAP1's scalar haversine, before geodistance.py '''
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+    return 2 * 6371 * asin(sqrt(a))
+
+
+@pytest.fixture(scope='module')
+def latlongdf():
+    ''' latitude, longitude dataframe built as in Data_Wrangling_CAP1 (steps 14 & 15) '''
+    latlong = pd.read_csv(os.path.join(RAW_DIR, 'latlong.csv'))
+    latlongdf = pd.DataFrame(latlong.iloc[0].apply(str.split, sep=','))
+    latlongdf = latlongdf.drop(['Unnamed: 0'])
+    latlongdf.index = [ name.upper().strip() for name in latlongdf.index ]
+    return(latlongdf.drop(DUPLICATES))
+
+
+def test_haversine_matrix_matches_scalar_haversine(latlongdf):
+    lat, lon = coordinates(latlongdf)
+    expected = np.array([ [ haversine(lon[i], lat[i], lon[j], lat[j]) for j in range(len(lat)) ] for i in range(len(lat)) ])
+    np.testing.assert_allclose(haversine_matrix(lat, lon, chunk_size=7), expected, rtol=1e-12, atol=1e-9)
+    np.testing.assert_allclose(haversine_matrix(lat[:5], lon[:5], lat, lon), expected[:5], rtol=1e-12, atol=1e-9)
+
+
+def test_distance_frame_matches_bundled_distances(latlongdf):
+    distances = pd.read_csv(os.path.join(DATA_DIR, 'distances.csv'), index_col=0)
+    frame = distance_frame(latlongdf)
+    assert list(frame.index) == list(distances.index) == list(frame.columns)
+    np.testing.assert_allclose(frame.values, distances.values, rtol=1e-12, atol=1e-9)
+
+
+@pytest.mark.parametrize('radius', [0.0, 50, 85, 200])
+def test_within_matches_distance_threshold(latlongdf, radius):
+    distances = distance_frame(latlongdf)
+    sindex = SpatialIndex(latlongdf)
+    for name in latlongdf.index:
+        expected = list(distances.columns[distances.loc[name].values <= radius])
+        assert sindex.within(name, radius) == expected
+        assert [ d for n, d in sindex.within_distances(name, radius) ] == pytest.approx(list(distances.loc[name, expected]))
+
+
+def test_within_candidates_and_nearest(latlongdf):
+    distances = distance_frame(latlongdf)
+    sindex = SpatialIndex(latlongdf)
+    candidates = set(latlongdf.index[::3])
+    name = latlongdf.index[0]
+    expected = [ n for n in distances.columns[distances.loc[name].values <= 85] if n in candidates ]
+    assert sindex.within(name, 85, candidates=candidates) == expected
+
+    closest = distances.loc[name].drop(name).sort_values(kind='mergesort')
+    assert [ n for n, d in sindex.nearest(name, 5) ] == list(closest.index[:5])
+    assert sindex.nearest(name, 1, include_self=True) == [(name, 0.0)]
+
+
+def exofind(lldf, tarloc, exoloc):
+    ''' Data_Wrangling_CAP1's exofind() before the spatial index (distance_loc() is distance_frame()) '''
+    tarexoloc = tarloc.append(exoloc)
+    tartoexodist = distance_frame(lldf.loc[tarexoloc]).reset_index(drop=True)
+    exodistances = tartoexodist[exoloc]
+    exodistances.index = tartoexodist.columns
+    exodist2 = exodistances.drop(exoloc,axis=0)
+    closeexo = exodist2[exodist2 <= 50]
+    closeexo1 = closeexo.dropna(how='all')
+    closeexo2 = closeexo1.dropna(axis=1,how='all')
+    exo = {}
+    for i in closeexo2.index:
+        ex = closeexo2.loc[i][closeexo2.loc[i].notnull()].index.tolist()
+        exo[i]=ex
+    return(exo)
+
+
+def test_exogenous_locations_match_exofind(latlongdf):
+    ''' the notebook's exofind() (SpatialIndex.within() of the exogenous candidates) against the former exofind() '''
+    locations = pd.read_csv(os.path.join(DATA_DIR, 'rainfalldata.csv'), index_col=0, nrows=1).columns
+    ncloc = locations[locations.str.endswith('NC')]
+    exoloc = locations[locations.str.endswith('VA')]
+    for state in ('SC', 'GA', 'TN'):
+        exoloc = exoloc.append(locations[locations.str.endswith(state)])
+    sindex = SpatialIndex(latlongdf)
+    found = {}
+    for loc in ncloc:
+        close = set(sindex.within(loc, 50, candidates=set(exoloc)))
+        ex = [ exo for exo in exoloc if exo in close ]
+        if len(ex) > 0:
+            found[loc] = ex
+    assert found == exofind(latlongdf, ncloc, exoloc)
+    assert len(found) > 0
@@ -0,0 +1,103 @@
+import os
+import shutil
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from resultstore import ResultStore
+from hypersearch import (order_grid, evaluate_order, evaluate_orders, search_orders, halving_search, write_leaderboard,
+                         order_key, main, LEADERBOARD_COLUMNS, LEADERBOARD_FILE, HALVING_LEADERBOARD_FILE)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'manipulated_data')
+
+SPLIT, END = 40, 52
+GRID = [ ((p, 0, q), (0, 0, 0, 0)) for p in range(2) for q in range(2) ]
+
+
+@pytest.fixture
+def series():
+    rs = np.random.RandomState(5)
+    values = np.empty(60)
+    values[0] = 5.0
+    for t in range(1, len(values)):
+        values[t] = 2.0 + 0.6*values[t-1] + rs.normal()
+    return(pd.Series(values, index=pd.date_range('2000-01-01', periods=60, freq='MS'), name='A, NC'))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return(ResultStore(str(tmp_path / 'allMAE.sqlite3')))
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+def _exhaustive(series, months=END-SPLIT):
+    return({ order_key(*o): evaluate_order(series.values[:SPLIT+months], SPLIT, *o)['mae'] for o in GRID })
+
+
+def test_order_grid():
+    grid = order_grid(5)
+    assert len(grid) == 625 and len(set(grid)) == 625
+    assert grid[0] == ((0, 0, 0), (0, 0, 0, 12)) and grid[-1] == ((4, 0, 4), (4, 0, 4, 12))
+
+
+def test_search_orders_checkpoints_to_the_store(series, store, capsys):
+    expected = _exhaustive(series)
+    results = search_orders(series, SPLIT, END, grid=GRID, store=store, processes=1)
+    assert list(zip(results.p, results.q)) == [ (o[0][0], o[0][2]) for o in GRID ]
+    assert (results.months == END-SPLIT).all()
+    assert results.mae.tolist() == pytest.approx([ expected[order_key(*o)] for o in GRID ], rel=1e-9)
+    assert len(store.order_results(series.name, 'months {0}-{1}, refit every 1'.format(SPLIT, END))) == len(GRID)
+
+    capsys.readouterr()
+    again = search_orders(series, SPLIT, END, grid=GRID, store=store, processes=1)
+    assert "0 of {0} orders to evaluate".format(len(GRID)) in capsys.readouterr().out
+    assert again.mae.tolist() == pytest.approx(results.mae.tolist(), rel=1e-12)
+
+
+def test_interrupted_search_resumes(series, store):
+    ''' orders walked over fewer months continue their walk-forward instead of starting over '''
+    partial = evaluate_orders(series, SPLIT, 5, GRID, store, end=END, processes=1)
+    assert partial == pytest.approx(_exhaustive(series, 5), rel=1e-9)
+    results = search_orders(series, SPLIT, END, grid=GRID, store=store, processes=1)
+    expected = _exhaustive(series)
+    assert results.mae.tolist() == pytest.approx([ expected[order_key(*o)] for o in GRID ], rel=1e-6)
+
+
+def test_write_leaderboard(series, store, tmp_path):
+    results = search_orders(series, SPLIT, END, grid=GRID, store=store, processes=1)
+    filename = str(tmp_path / 'hyperparameter_combinations.csv')
+    write_leaderboard(results, filename)
+    with open(filename, 'rb') as f:
+        assert f.read(3) == b'\xef\xbb\xbf'
+    leaderboard = pd.read_csv(filename, encoding='utf-8-sig')
+    assert list(leaderboard.columns) == LEADERBOARD_COLUMNS
+    assert len(leaderboard) == len(GRID)
+
+
+def test_halving_search(series, store):
+    expected = _exhaustive(series)
+    results = halving_search(series, SPLIT, END, grid=GRID, store=store, processes=1, min_months=3, eta=2)
+    # rungs of 3, 6 & 12 months: 4 orders, then the best 2, then the best one over every month
+    assert sorted(results.months.tolist()) == [3, 3, 6, 12]
+    for row in results.itertuples():
+        partial = evaluate_order(series.values[:SPLIT+row.months], SPLIT, (row.p, row.d, row.q), (row.P, row.D, row.Q, row.m))
+        assert row.mae == pytest.approx(partial['mae'], rel=1e-6)
+    best = results[results.months == END-SPLIT].iloc[0]
+    assert best.mae == pytest.approx(expected[order_key((best.p, best.d, best.q), (best.P, best.D, best.Q, best.m))], rel=1e-6)
+
+
+def test_halving_leaderboard_keeps_the_exhaustive_leaderboard(tmp_path):
+    for name in ('rainfalldata.csv', 'ncrainfalldata.csv', LEADERBOARD_FILE):
+        shutil.copyfile(os.path.join(DATA_DIR, name), str(tmp_path / name))
+    assert main(['--destdir', str(tmp_path), '--halving', '--max-order', '2', '--train-end', '376', '--validation-end', '382',
+                 '--refit-every', '100', '--min-months', '2', '--processes', '1']) == 0
+    assert len(pd.read_csv(str(tmp_path / LEADERBOARD_FILE), encoding='utf-8-sig')) == 625
+    halving = pd.read_csv(str(tmp_path / HALVING_LEADERBOARD_FILE), encoding='utf-8-sig')
+    assert list(halving.columns) == LEADERBOARD_COLUMNS
+    assert 0 < len(halving) < 16
@@ -0,0 +1,152 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from geodistance import distance_frame, SpatialIndex
+from imputation import fill_missing_months, neighbor_weights, fill_from_neighbors
+
+FIRST_ROW = 1476           # row_number of 1-1980, the first month kept by Data_Wrangling_CAP1
+NROWS = 472
+
+
+def missingfill(df, column):
+    ''' Data_Wrangling_CAP1's row-wise missingfill() before imputation.py (series[0] spelled
+        series.iloc[0] for pandas >= 2, positional fallback of [] was removed) '''
+    missing = df.index[df[column].isnull()]
+    if len(missing) > 0:
+        for n in missing:
+            moth = df.loc[n].row_number # finds the row index for the missing data point
+            if ((moth >= 1488) & (moth <= 1945)): #must be a year after 1-1956 (rownumber=1188) otherwise it is impossible to have the previous year's data to gather from
+                ly = moth - 12 #the previous year's row number
+                lyrd = df[[column]][df['row_number'] == ly] # the previous year's rainfall amount as a dataframe
+                lyrd1 = lyrd[column].iloc[0] #separates the value of the previous year's dataframe to just the rainfall amount
+                lm = moth - 1 # the next 6 lines perform the same as the previous 3 except for previous month and following month
+                lmrd = df[[column]][df['row_number'] == lm]
+                lmrd1 = lmrd[column].iloc[0]
+                nm = moth + 1
+                nmrd = df[[column]][df['row_number'] == nm]
+                nmrd1 = nmrd[column].iloc[0]
+                if ((math.isnan(lyrd1)) & (moth >= 1500)): # if the previous year was not available, go back 2 years
+                    twy = moth - 24
+                    twyrd = df[[column]][df['row_number'] == twy]
+                    lyrd1 = twyrd[column].iloc[0]
+                if (math.isnan(lmrd1)): #if the previous month was not available, go back 2 months
+                    lm = moth - 2
+                    lmrd = df[[column]][df['row_number'] == lm]
+                    lmrd1 = lmrd[column].iloc[0]
+                if (math.isnan(nmrd1)): #if the next month was not available, go forward 2 months
+                    nm = moth + 2
+                    nmrd = df[[column]][df['row_number'] == nm]
+                    nmrd1 = nmrd[column].iloc[0]
+                newpoint = np.nanmean([lyrd1,lmrd1,nmrd1]) #finds the average of the 3 values
+                df.loc[n,column] = newpoint #places the value into the missing data slot
+    return(df)
+
+
+def _rainfall_with_gaps():
+    ''' months x 4 locations of rainfall with leading, interior & trailing gaps, laid out like
+        ncdata_80 (index 'month-year', row_number column) '''
+    rs = np.random.RandomState(1)
+    values = rs.gamma(2.0, 2.0, size=(NROWS, 4)).round(2)
+    values[:20, 0] = np.nan                     # leading: station starts late, some months have no history
+    values[[30, 31, 32, 100], 0] = np.nan       # interior: consecutive months & a lone month
+    values[[60, 72, 84], 1] = np.nan            # previous year missing, falls back to two years before
+    values[[200, 201, 203, 213], 1] = np.nan    # previous / next month missing, two months before / after
+    values[100:130, 2] = np.nan                 # long interior gap, later months use earlier fills
+    values[NROWS-6:, 2] = np.nan                # trailing: last months cannot be filled
+    values[[NROWS-3, NROWS-4], 3] = np.nan      # the last fillable month & the one before
+    values[[12, 11], 3] = np.nan                # first fillable month & the month before it
+    dates = pd.date_range('1980-01-01', periods=NROWS, freq='MS')
+    df = pd.DataFrame(values, columns=['A, NC', 'B, NC', 'C, VA', 'D, SC'],
+                      index=[ "{0}-{1}".format(date.month, date.year) for date in dates ])
+    df['row_number'] = np.arange(FIRST_ROW, FIRST_ROW+NROWS)
+    return(df)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')     # np.nanmean of no values, the month stays NaN
+def test_fill_missing_months_matches_missingfill():
+    df = _rainfall_with_gaps()
+    columns = df.columns.drop('row_number')
+    expected = df.copy()
+    for column in expected.columns:
+        expected = missingfill(expected, column)
+
+    filled = fill_missing_months(df[columns].values, fill_from=1488-FIRST_ROW, fill_to=1945-FIRST_ROW,
+                                 two_year_from=1500-FIRST_ROW)
+    np.testing.assert_array_equal(filled, expected[columns].values)
+    assert np.isnan(filled[:12, 0]).all() and np.isnan(filled[NROWS-2:, 2]).all()
+    assert not np.isnan(filled[[NROWS-3, 12], 3]).any()
+
+
+def missingfillsurrounding(rdf, ddf):
+    ''' Data_Wrangling_CAP1's missingfillsurrounding() before imputation.py '''
+    locwmd = rdf.columns[rdf.isna().any()].tolist()
+    for loc in locwmd:
+        nbloc = rdf[ddf[[loc]][ddf[loc] <=85].index]
+        missing = nbloc.index[nbloc[loc].isnull()]
+        if len(missing) >0:
+            for m in missing:
+                newpt = np.nanmean(nbloc.loc[m])
+                rdf.loc[m,loc] = newpt
+    return(rdf)
+
+
+def _stations():
+    ''' latitude, longitude dataframe (latlong.csv layout): A, B & C within 85 km of each other,
+        G within 85 km of C only, D & E a separate pair, F without any neighbor in range '''
+    coords = { 'A, NC': (35.0, -79.0), 'B, NC': (35.3, -79.0), 'C, NC': (35.0, -79.6), 'G, NC': (35.0, -80.3),
+               'D, VA': (36.0, -78.0), 'E, VA': (36.0, -78.5), 'F, SC': (34.0, -82.0) }
+    return(pd.DataFrame({ 0: [ [str(lat), str(lon)] for lat, lon in coords.values() ] }, index=list(coords)))
+
+
+def _rainfall_with_station_gaps(columns):
+    ''' returns: the same rainfall of every station (with gaps), columns in the provided order '''
+    rs = np.random.RandomState(2)
+    df = pd.DataFrame(rs.gamma(2.0, 2.0, size=(48, len(columns))).round(2), columns=sorted(columns),
+                      index=pd.date_range('1980-01-01', periods=48, freq='MS'))[columns]
+    df.loc[df.index[[3, 4, 10, 30]], 'A, NC'] = np.nan  # month 30: A & C missing, the order they are filled in matters
+    df.loc[df.index[[4, 20]], 'B, NC'] = np.nan         # month 4: A & B missing, C is the only observed neighbor
+    df.loc[df.index[[20, 30]], 'C, NC'] = np.nan        # month 20: the first of B & C filled is averaged into the other
+    df.loc[df.index[[7]], 'D, VA'] = np.nan
+    df.loc[df.index[[7, 8]], 'E, VA'] = np.nan          # month 7: neither D nor E observed
+    df.loc[df.index[[0, 5, 6]], 'F, SC'] = np.nan       # no neighbor: stays NaN
+    return(df)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')     # np.nanmean of no values, the month stays NaN
+def test_fill_from_neighbors_matches_missingfillsurrounding():
+    lldf = _stations()
+    ddf = distance_frame(lldf)
+    sindex = SpatialIndex(lldf)
+    # rainfall columns in another order than the stations: fills chain in rainfall column order
+    month_30 = []
+    for columns in (list(lldf.index), ['C, NC', 'F, SC', 'E, VA', 'A, NC', 'G, NC', 'D, VA', 'B, NC']):
+        df = _rainfall_with_station_gaps(columns)
+        expected = missingfillsurrounding(df.copy(), ddf)
+        filled = fill_from_neighbors(df.values, neighbor_weights(sindex, df.columns, 85), method='nanmean')
+        np.testing.assert_array_equal(filled, expected.values)
+        assert np.isnan(filled[[0, 5, 6], columns.index('F, SC')]).all()
+        assert np.isnan(filled[7, [columns.index('D, VA'), columns.index('E, VA')]]).all()
+        month_30.append(filled[30, columns.index('A, NC')])
+    assert month_30[0] != month_30[1]
+
+
+def test_weighted_fill():
+    lldf = _stations()
+    ddf = distance_frame(lldf)
+    columns = ['C, NC', 'F, SC', 'E, VA', 'A, NC', 'G, NC', 'D, VA', 'B, NC']
+    df = _rainfall_with_station_gaps(columns)
+    weights = neighbor_weights(SpatialIndex(lldf), columns, 85, power=2)
+    filled = fill_from_neighbors(df.values, weights, method='weighted')
+
+    observed = ~np.isnan(df.values)
+    np.testing.assert_array_equal(filled[observed], df.values[observed])
+    # A's month 3: inverse squared distance average of B & C
+    w = 1 / ddf.loc['A, NC', ['B, NC', 'C, NC']].values**2
+    expected = np.sum(w * df.loc[df.index[3], ['B, NC', 'C, NC']].values) / np.sum(w)
+    assert filled[3, columns.index('A, NC')] == pytest.approx(expected, rel=1e-12)
+    # month 4: C is the only observed neighbor of A & B
+    assert filled[4, columns.index('A, NC')] == filled[4, columns.index('B, NC')] == df.loc[df.index[4], 'C, NC']
+    # no observed neighbor: stays NaN
+    assert np.isnan(filled[[0, 5, 6], columns.index('F, SC')]).all()
+    assert np.isnan(filled[7, [columns.index('D, VA'), columns.index('E, VA')]]).all()
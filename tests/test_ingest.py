@@ -0,0 +1,95 @@
+import os
+import shutil
+import zipfile
+import numpy as np
+import pandas as pd
+import pytest
+from ingest import load_workbook, sheet_fingerprints, MONTHS
+
+WORKBOOK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'raw_data',
+                        'NC Monthly Precipitation Data.xlsx')
+
+
+def datachunks(NCdata, s, e, df):
+    ''' Data_Wrangling_CAP1's datachunks() before ingest.py, the workbook passed in.  Each sheet's
+        melted value column is named after the sheet (pandas >= 2 refuses the duplicate value_x /
+        value_y columns of merging unnamed value columns) '''
+    for i in range(s,e):
+        to_merge = NCdata.parse(i, skiprows=[0,1], usecols=[0,1,2,3,4,5,6,7,8,9,10,11,12]) #first two rows in the data were titles
+        to_merge = to_merge.dropna() #removes two rows from the data that were labeled as NaN and not needed
+        to_merge = to_merge.set_index('Year') #set the index to year to remove the following 3 rows
+        to_merge = to_merge.drop(['Mean','Max', 'Min'])
+        to_merge = to_merge.reset_index() #resets the index so that the dataframe can be melted on Year
+        to_merge1 = pd.melt(to_merge, id_vars=['Year'], value_vars=['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug',
+        'Sep','Oct','Nov','Dec'], var_name='Month', value_name=i)
+        to_merge1.iloc[:,2] = pd.to_numeric(to_merge1.iloc[:,2], errors = 'coerce')
+        if i == 0:
+            df = to_merge1
+        else:
+            df = pd.merge(df, to_merge1, on = ['Year','Month'], how = 'outer')
+    return df
+
+
+def _by_month(df):
+    ''' rows sorted by year & month as the notebook does next (the row order of an outer merge
+        differs between pandas versions) '''
+    order = np.lexsort((df['Month'].map(MONTHS.index).values, df['Year'].values.astype(int)))
+    return(df.iloc[order].reset_index(drop=True))
+
+
+@pytest.fixture(scope='module')
+def workbook(tmp_path_factory):
+    cache_filename = str(tmp_path_factory.mktemp('ingest') / 'parse.npz')
+    return(load_workbook(WORKBOOK, cache_filename=cache_filename) + (cache_filename,))
+
+
+def test_load_workbook_matches_datachunks(workbook):
+    ncdata, sheet_names, cache_filename = workbook
+    NCdata = pd.ExcelFile(WORKBOOK)
+    expected = _by_month(datachunks(NCdata, 0, len(NCdata.sheet_names), pd.DataFrame()))
+    assert sheet_names == NCdata.sheet_names
+    assert list(ncdata.columns) == ['Year', 'Month'] + list(range(len(sheet_names)))
+    found = _by_month(ncdata)
+    assert list(found['Year'].astype(int)) == list(expected['Year'].astype(int))
+    assert list(found['Month']) == list(expected['Month'])
+    np.testing.assert_array_equal(found.iloc[:, 2:].values.astype(float), expected.iloc[:, 2:].values.astype(float))
+
+
+def test_cached_workbook_is_not_parsed(workbook, capsys):
+    ncdata, sheet_names, cache_filename = workbook
+    cached, cached_names = load_workbook(WORKBOOK, cache_filename=cache_filename)
+    assert "[INGEST] Parsing" not in capsys.readouterr().out
+    assert cached_names == sheet_names
+    pd.testing.assert_frame_equal(cached, ncdata)
+
+
+def test_sheet_fingerprints():
+    fingerprints = sheet_fingerprints(WORKBOOK)
+    assert len(fingerprints) == len(pd.ExcelFile(WORKBOOK).sheet_names)
+    assert len(set(fingerprints)) == len(fingerprints)
+
+
+def _edit_shared_string(src, dst, old, new):
+    ''' copy of the src workbook with the shared string old replaced by new '''
+    with zipfile.ZipFile(src) as archive, zipfile.ZipFile(dst, 'w', zipfile.ZIP_DEFLATED) as edited:
+        for info in archive.infolist():
+            content = archive.read(info.filename)
+            if info.filename == 'xl/sharedStrings.xml':
+                assert content.count(old.encode('utf-8')) == 1
+                content = content.replace(old.encode('utf-8'), new.encode('utf-8'))
+            edited.writestr(info, content)
+
+
+def test_sheet_fingerprints_only_cover_referenced_strings(workbook, tmp_path, capsys):
+    ncdata, sheet_names, cache_filename = workbook
+    edited = str(tmp_path / 'edited.xlsx')
+    _edit_shared_string(WORKBOOK, edited, 'Monthly Total Precipitation for Raleigh Area, NC (ThreadEx)',
+                        'Monthly Total Precipitation for Raleigh, NC')
+    before, after = sheet_fingerprints(WORKBOOK), sheet_fingerprints(edited)
+    assert [ s for s in range(len(before)) if before[s] != after[s] ] == [0]
+
+    shutil.copyfile(cache_filename, str(tmp_path / 'parse.npz'))
+    reparsed, reparsed_names = load_workbook(edited, cache_filename=str(tmp_path / 'parse.npz'))
+    assert "[INGEST] Parsing 1 of {0} sheets".format(len(sheet_names)) in capsys.readouterr().out
+    assert reparsed_names == sheet_names
+    pd.testing.assert_frame_equal(reparsed, ncdata)
@@ -0,0 +1,73 @@
+import os
+import sys
+import json
+import sqlite3
+import subprocess
+import pytest
+import main
+from resultstore import ResultStore
+
+SRC_DIR = os.path.dirname(os.path.abspath(main.__file__))
+
+
+@pytest.fixture
+def datadir(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'destdir', lambda: str(tmp_path))
+    return(tmp_path)
+
+
+def _store(datadir):
+    store = ResultStore(str(datadir / 'allMAE.sqlite3'))
+    store.put('A', None, 2.0, 'h1')
+    store.put('A', 'B', 1.5, 'h2', 'h1')
+    store.put('C', None, 1.0, 'h3')
+    store.close()
+
+
+def test_status(datadir, capsys):
+    (datadir / 'predictions.csv').write_text('month\n')
+    assert main.main(['status']) == 0
+    assert "No results store found" in capsys.readouterr().out
+
+    _store(datadir)
+    assert main.main(['status']) == 0
+    out = capsys.readouterr().out
+    assert "predictions.csv" in out and "exogen.json" in out
+    lines = { line.split()[0]: line.split()[-1] for line in out.splitlines() if line.startswith('  ') }
+    assert lines['keymaes'] == '2' and lines['exmaes'] == '1' and lines['exogen.json'] == 'missing'
+    assert sorted(os.listdir(str(datadir))) == ['allMAE.sqlite3', 'predictions.csv']      # no -wal / -shm files
+
+
+def test_export(datadir):
+    assert main.main(['export']) == 1
+    _store(datadir)
+    assert main.main(['export']) == 0
+    assert json.loads((datadir / 'allMAE.json').read_text())['A']['exogen'] == { 'B': { 'exmae': 1.5, 'data_source_sha1': 'h2' } }
+    assert list(json.loads((datadir / 'allBetterMAE.json').read_text())) == ['A']
+    assert not os.path.exists(str(datadir / 'allMAE.sqlite3-wal')) and not os.path.exists(str(datadir / 'allMAE.sqlite3-shm'))
+
+
+def test_readonly_store_leaves_the_database_alone(tmp_path):
+    filename = str(tmp_path / 'allMAE.sqlite3')
+    conn = sqlite3.connect(filename)                 # store of an older version, results only
+    conn.execute("CREATE TABLE results (target TEXT NOT NULL, exog TEXT NOT NULL, mae REAL NOT NULL, data_sha1 TEXT, PRIMARY KEY (target, exog)) WITHOUT ROWID")
+    conn.execute("INSERT INTO results VALUES ('A', '', 2.0, 'h1')")
+    conn.commit()
+    conn.close()
+
+    store = ResultStore(filename, readonly=True)
+    assert store.summary() == { 'keymaes': 1, 'exmaes': 0 }
+    with pytest.raises(sqlite3.OperationalError):
+        store.put('A', 'B', 1.0, 'h2')
+    store.close()
+    conn = sqlite3.connect(filename)
+    assert conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall() == [('results',)]
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'delete'
+
+
+def test_status_does_not_import_the_pipeline(tmp_path):
+    _store(tmp_path)
+    code = ("import sys, main; main.destdir = lambda: {0!r}; main.main(['status']); "
+            "print(sorted(m for m in ('pandas', 'statsmodels', 'sklearn', 'scipy', 'tqdm') if m in sys.modules))").format(str(tmp_path))
+    out = subprocess.check_output([sys.executable, '-c', code], cwd=SRC_DIR, universal_newlines=True)
+    assert out.splitlines()[-1] == '[]'
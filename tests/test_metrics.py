@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fingerprint import Fingerprinter
+from resultstore import ResultStore
+from walkforward import model_signature, parse_order_key
+from metrics import walkforward_metrics, forecast_matrix, mape, seasonal_mae
+
+SPLIT = 24
+
+
+@pytest.fixture
+def data():
+    rs = np.random.RandomState(4)
+    return(pd.DataFrame(rs.gamma(2.0, 2.0, size=(36, 3)), columns=['A, NC', 'B, NC', 'C, VA'],
+                        index=pd.date_range('2000-01-01', periods=36, freq='MS')))
+
+
+def _predictions(data, target, offset):
+    return(data[target].values[SPLIT:] + offset)
+
+
+def _put(store, data, target, exog, offset, data_hash=None, seconds=1.0):
+    columns = [target] + ([] if exog is None else exog.split('|'))
+    data_hash = Fingerprinter(data).combination(columns) if data_hash is None else data_hash
+    store.put_walkforward(target, exog, SPLIT, data_hash, [0.5], _predictions(data, target, offset), seconds)
+
+
+def test_metrics_of_current_walks(tmp_path, data):
+    store = ResultStore(str(tmp_path / 'allMAE.sqlite3'))
+    _put(store, data, 'A, NC', None, 1.0)
+    _put(store, data, 'A, NC', 'C, VA', -0.5, seconds=2.5)
+    _put(store, data, 'B, NC', None, 2.0, data_hash='stale')             # evaluated on other data
+    _put(store, data.iloc[:-1], 'C, VA', None, 2.0)                      # evaluated before the last month
+
+    metrics = walkforward_metrics(store, data, window=12)
+    assert list(metrics.index) == [('A, NC', ''), ('A, NC', 'C, VA')]
+    assert metrics['mae'].tolist() == pytest.approx([1.0, 0.5])
+    assert metrics['rmse'].tolist() == pytest.approx([1.0, 0.5])
+    assert metrics['seconds'].tolist() == [1.0, 2.5]
+    assert metrics['mae_Jan'].tolist() == pytest.approx([1.0, 0.5])
+
+    keys, predictions, actuals, dates = forecast_matrix(store, data, window=6, targets=['A, NC'])
+    assert keys == [('A, NC', None), ('A, NC', 'C, VA')]
+    assert predictions.shape == actuals.shape == (2, 6)
+    np.testing.assert_array_equal(actuals[0], data['A, NC'].values[-6:])
+    assert list(dates) == list(data.index[-6:])
+
+
+def test_metrics_match_selected_orders_and_refit_cadence(tmp_path, data):
+    store = ResultStore(str(tmp_path / 'allMAE.sqlite3'))
+    selected = '2,0,1,1,0,0,12'
+    store.put_order('B, NC', selected, 1.0, 2.0, 'search', 'sha')
+    fingerprints = Fingerprinter(data)
+    _put(store, data, 'A, NC', None, 1.0)                                           # default order
+    _put(store, data, 'B, NC', None, 2.0,
+         data_hash=model_signature(fingerprints.combination(['B, NC']), *parse_order_key(selected)))
+    _put(store, data, 'C, VA', None, 3.0)                   # evaluated before its order was selected
+    store.put_order('C, VA', selected, 1.0, 2.0, 'search', 'sha')
+
+    metrics = walkforward_metrics(store, data, window=12)
+    assert list(metrics.index) == [('A, NC', ''), ('B, NC', '')]
+    assert metrics['mae'].tolist() == pytest.approx([1.0, 2.0])
+
+    _put(store, data, 'A, NC', 'C, VA', 0.5,
+         data_hash=model_signature(fingerprints.combination(['A, NC', 'C, VA']), refit_every=4))
+    metrics = walkforward_metrics(store, data, window=12, refit_every=4)
+    assert list(metrics.index) == [('A, NC', 'C, VA')]
+
+
+def test_mape_leaves_out_dry_months():
+    actuals = np.array([[2.0, 0.0, 4.0], [0.0, 0.0, 0.0]])
+    predictions = np.array([[1.0, 1.0, 5.0], [1.0, 1.0, 1.0]])
+    result = mape(predictions, actuals)
+    assert result[0] == pytest.approx(37.5)
+    assert np.isnan(result[1])
+
+
+def test_seasonal_mae():
+    dates = pd.date_range('2000-11-01', periods=4, freq='MS')         # Nov, Dec, Jan, Feb
+    errors = np.array([[1.0, 2.0, 3.0, 4.0]])
+    result = seasonal_mae(np.zeros((1, 4)), errors, dates)
+    assert result[0, [10, 11, 0, 1]].tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert np.isnan(result[0, 5])
@@ -0,0 +1,52 @@
+import multiprocessing
+from paramcache import ParamCache
+
+ORDER = (1, 0, 0)
+SEASONAL_ORDER = (0, 0, 0, 0)
+
+
+def test_closest_length_fallback():
+    cache = ParamCache()
+    cache.put('A', None, ORDER, SEASONAL_ORDER, 100, [0.1, 0.2])
+    cache.put('A', None, ORDER, SEASONAL_ORDER, 110, [0.3, 0.4])
+    assert cache.get('A', None, ORDER, SEASONAL_ORDER, 100) == [0.1, 0.2]
+    assert cache.get('A', None, ORDER, SEASONAL_ORDER, 108) == [0.3, 0.4]
+    assert cache.get('A', 'B', ORDER, SEASONAL_ORDER, 100) is None
+    stats = cache.stats()
+    assert stats['lookups'] == 3
+    assert stats['exact_hit_rate'] == 1/3
+    assert stats['hit_rate'] == 2/3
+
+
+def test_lru_eviction():
+    cache = ParamCache(maxsize=2)
+    cache.put('A', None, ORDER, SEASONAL_ORDER, 100, [1.0])
+    cache.put('B', None, ORDER, SEASONAL_ORDER, 100, [2.0])
+    cache.get('A', None, ORDER, SEASONAL_ORDER, 100)
+    cache.put('C', None, ORDER, SEASONAL_ORDER, 100, [3.0])
+    assert cache.get('B', None, ORDER, SEASONAL_ORDER, 100) is None
+    assert cache.get('A', None, ORDER, SEASONAL_ORDER, 100) == [1.0]
+
+
+def _save_entries(filename, worker, count):
+    cache = ParamCache(filename).load()
+    for i in range(count):
+        cache.put('loc{0}'.format(worker), None, ORDER, SEASONAL_ORDER, i, [float(i)], iterations=1)
+        cache.save()
+
+
+def test_concurrent_saves_keep_every_entry(tmp_path):
+    filename = str(tmp_path / 'paramcache.json')
+    workers, count = 4, 25
+    processes = [ multiprocessing.Process(target=_save_entries, args=(filename, worker, count)) for worker in range(workers) ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    cache = ParamCache(filename).load()
+    assert cache.stats()['entries'] == workers*count
+    assert cache._counters['cold_fits'] == workers*count
+    for worker in range(workers):
+        assert cache.get('loc{0}'.format(worker), None, ORDER, SEASONAL_ORDER, count-1) == [float(count-1)]
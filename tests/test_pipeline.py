@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from geodistance import SpatialIndex
+from imputation import fill_missing_months, neighbor_weights, fill_from_neighbors
+from pipeline import ColumnCache, temporal_fill_stage, spatial_fill_stage
+
+pytestmark = pytest.mark.filterwarnings('ignore::RuntimeWarning')     # np.nanmean of no values
+FILL = { 'fill_from': 12, 'fill_to': 45, 'two_year_from': 24 }
+
+
+def _rainfall():
+    rs = np.random.RandomState(3)
+    columns = ['A, NC', 'B, NC', 'C, NC', 'D, VA']
+    df = pd.DataFrame(rs.gamma(2.0, 2.0, size=(48, len(columns))).round(2), columns=columns,
+                      index=pd.date_range('1980-01-01', periods=48, freq='MS'))
+    df.iloc[[14, 15, 30], 0] = np.nan
+    df.iloc[[14, 40], 1] = np.nan
+    df.iloc[[2, 20], 2] = np.nan
+    df.iloc[[5, 33], 3] = np.nan
+    return(df)
+
+
+def _stations():
+    coords = { 'A, NC': (35.0, -79.0), 'B, NC': (35.3, -79.0), 'C, NC': (35.0, -79.6), 'D, VA': (36.5, -77.0) }
+    return(SpatialIndex(pd.DataFrame({ 0: [ [str(lat), str(lon)] for lat, lon in coords.values() ] }, index=list(coords))))
+
+
+def test_temporal_stage_reuses_unchanged_locations(tmp_path):
+    df = _rainfall()
+    filename = str(tmp_path / 'temporal_fill.npz')
+    cache = ColumnCache(filename)
+    filled = temporal_fill_stage(df, cache, **FILL)
+    np.testing.assert_array_equal(filled.values, fill_missing_months(df.values, **FILL))
+    assert (cache.hits, cache.misses) == (0, 4)
+    cache.save()
+
+    changed = df.copy()
+    changed.iloc[0, 1] += 1.0
+    cache = ColumnCache(filename)
+    filled = temporal_fill_stage(changed, cache, **FILL)
+    np.testing.assert_array_equal(filled.values, fill_missing_months(changed.values, **FILL))
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_spatial_stage_follows_neighbors(tmp_path):
+    df = _rainfall()
+    sindex = _stations()
+    weights = neighbor_weights(sindex, df.columns, 85)
+    filename = str(tmp_path / 'spatial_fill.npz')
+    cache = ColumnCache(filename)
+    filled = spatial_fill_stage(df, sindex, 85, cache)
+    np.testing.assert_array_equal(filled.values, fill_from_neighbors(df.values, weights))
+    cache.save()
+
+    cache = ColumnCache(filename)
+    np.testing.assert_array_equal(spatial_fill_stage(df, sindex, 85, cache).values, filled.values)
+    assert (cache.hits, cache.misses) == (4, 0)
+
+    changed = df.copy()
+    changed.iloc[0, 3] += 1.0           # D has no neighbor in range, only D is filled again
+    cache = ColumnCache(filename)
+    spatial_fill_stage(changed, sindex, 85, cache)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    changed = df.copy()
+    changed.iloc[0, 2] += 1.0           # C is a neighbor of A & B
+    cache = ColumnCache(filename)
+    np.testing.assert_array_equal(spatial_fill_stage(changed, sindex, 85, cache).values,
+                                  fill_from_neighbors(changed.values, weights))
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_weighted_spatial_stage():
+    df = _rainfall()
+    sindex = _stations()
+    cache = ColumnCache()
+    filled = spatial_fill_stage(df, sindex, 85, cache, power=2)
+    expected = fill_from_neighbors(df.values, neighbor_weights(sindex, df.columns, 85, power=2), method='weighted')
+    np.testing.assert_array_equal(filled.values, expected)
+    np.testing.assert_array_equal(spatial_fill_stage(df, sindex, 85, cache, power=2).values, expected)
+    assert cache.hits == 4
@@ -0,0 +1,77 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import rainfallcache
+from shasum import shasum
+from rainfallcache import (write_rainfall_cache, read_rainfall_cache, read_rainfall_csv, load_rainfall,
+                           RAINFALL_CSV, NC_RAINFALL_CSV)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'manipulated_data')
+
+
+def _copy_csvs(destdir):
+    for name in (RAINFALL_CSV, NC_RAINFALL_CSV):
+        shutil.copyfile(os.path.join(DATA_DIR, name), os.path.join(str(destdir), name))
+
+
+def test_cache_matches_csv(tmp_path):
+    _copy_csvs(tmp_path)
+    rd, ncrd = read_rainfall_csv(str(tmp_path))
+    assert read_rainfall_cache(str(tmp_path)) is None
+    write_rainfall_cache(rd, ncrd.columns, str(tmp_path))
+
+    cached_rd, cached_ncrd = read_rainfall_cache(str(tmp_path))
+    pd.testing.assert_frame_equal(cached_rd, rd, check_freq=False)
+    pd.testing.assert_frame_equal(cached_ncrd, ncrd, check_freq=False)
+
+
+def test_rewritten_csv_invalidates_cache(tmp_path):
+    _copy_csvs(tmp_path)
+    rd, ncrd = read_rainfall_csv(str(tmp_path))
+    write_rainfall_cache(rd, ncrd.columns, str(tmp_path))
+
+    changed = rd.copy()
+    changed.iloc[0, 0] += 1.0
+    changed.to_csv(os.path.join(str(tmp_path), RAINFALL_CSV))
+    assert read_rainfall_cache(str(tmp_path)) is None
+    assert load_rainfall(str(tmp_path))[0].iloc[0, 0] == changed.iloc[0, 0]     # falls back to the csv
+
+
+class _CountingShasum:
+    calls = []
+
+    def file_sha(self, filename):
+        _CountingShasum.calls.append(os.path.basename(filename))
+        return(shasum().file_sha(filename))
+
+
+def test_unchanged_csv_is_not_hashed(tmp_path, monkeypatch):
+    _copy_csvs(tmp_path)
+    rd, ncrd = read_rainfall_csv(str(tmp_path))
+    write_rainfall_cache(rd, ncrd.columns, str(tmp_path))
+    monkeypatch.setattr(rainfallcache, 'shasum', _CountingShasum)
+    _CountingShasum.calls = []
+
+    assert read_rainfall_cache(str(tmp_path)) is not None
+    assert _CountingShasum.calls == []                                  # size & mtime unchanged, nothing hashed
+
+    csv_filename = os.path.join(str(tmp_path), RAINFALL_CSV)
+    stat = os.stat(csv_filename)
+    os.utime(csv_filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))        # touched, same content
+    assert read_rainfall_cache(str(tmp_path)) is not None
+    assert read_rainfall_cache(str(tmp_path)) is not None
+    assert _CountingShasum.calls == [RAINFALL_CSV]                      # hashed once, new state recorded
+
+
+def test_matrix_checksum_on_request(tmp_path):
+    _copy_csvs(tmp_path)
+    rd, ncrd = read_rainfall_csv(str(tmp_path))
+    matrix_filename = write_rainfall_cache(rd, ncrd.columns, str(tmp_path))
+    with open(matrix_filename, 'r+b') as f:
+        f.seek(-8, os.SEEK_END)
+        f.write(np.float64(-1.0).tobytes())
+
+    assert read_rainfall_cache(str(tmp_path)) is not None
+    assert read_rainfall_cache(str(tmp_path), verify=True) is None
+    assert load_rainfall(str(tmp_path), verify=True)[0].iloc[-1, -1] == rd.iloc[-1, -1]      # falls back to the csv
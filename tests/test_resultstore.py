@@ -0,0 +1,137 @@
+import json
+import sqlite3
+import multiprocessing
+from resultstore import ResultStore, open_store
+
+
+def _put_results(filename, worker, count):
+    store = ResultStore(filename)
+    for i in range(count):
+        store.put('loc{0}'.format(worker), 'exog{0}'.format(i), float(i), 'sha')
+    store.close()
+
+
+def test_get_requires_matching_hash(tmp_path):
+    store = ResultStore(str(tmp_path / 'allMAE.sqlite3'))
+    store.put('A', None, 1.5, 'h1')
+    store.put('A', 'B|C', 1.2, 'h2')
+    assert store.get('A') == 1.5
+    assert store.get('A', None, 'h1') == 1.5
+    assert store.get('A', None, 'other') is None
+    assert store.get('A', 'B|C', 'h2') == 1.2
+    assert store.get('B') is None
+    assert len(store) == 2
+
+
+def test_migrate_hash(tmp_path):
+    store = ResultStore(str(tmp_path / 'allMAE.sqlite3'))
+    store.put('A', None, 1.5, 'legacy')
+    assert not store.migrate_hash('A', None, 'new', 'changed')
+    assert store.migrate_hash('A', None, 'new', lambda: 'legacy')
+    assert store.get('A', None, 'new') == 1.5
+    assert not store.migrate_hash('A', None, 'new', lambda: 'legacy')
+
+
+def test_migrate_keymae_rekeys_its_exmaes(tmp_path):
+    store = ResultStore(str(tmp_path / 'allMAE.sqlite3'))
+    store.put('A', None, 2.0, 'legacy')
+    store.put('A', 'B', 1.0, 'hb', 'legacy')
+    assert store.migrate_hash('A', None, 'new', 'legacy')
+    assert store.get('A', 'B', 'hb', 'new') == 1.0
+    assert store.get('A', 'B', 'hb', 'legacy') is None
+
+
+def test_bettermae_requires_matching_keymae(tmp_path):
+    store = ResultStore(str(tmp_path / 'allMAE.sqlite3'))
+    store.put('A', None, 2.0, 'h1')
+    store.put('A', 'B', 1.0, 'hb', 'h1')
+    store.put('A', 'C', 1.5, 'hc', 'h1')
+    store.put('A', 'D', 0.5, 'hd')                 # keymae unknown
+    assert store.bettermae_dict() == { 'A': { 'keymae': 2.0, 'data_source_sha1': 'h1', 'exogen': { 'B': 1.0, 'C': 1.5 } } }
+
+    store.put('A', None, 3.0, 'h2')                 # target's data revised, exmaes not evaluated again yet
+    store.put('A', 'C', 2.5, 'hc', 'h2')
+    assert store.get('A', 'B', 'hb', 'h2') is None
+    assert store.bettermae_dict() == { 'A': { 'keymae': 3.0, 'data_source_sha1': 'h2', 'exogen': { 'C': 2.5 } } }
+
+
+def test_keymae_hash_added_to_older_store(tmp_path):
+    filename = str(tmp_path / 'allMAE.sqlite3')
+    conn = sqlite3.connect(filename)
+    conn.execute("CREATE TABLE results (target TEXT NOT NULL, exog TEXT NOT NULL, mae REAL NOT NULL, data_sha1 TEXT, "
+                 "PRIMARY KEY (target, exog)) WITHOUT ROWID")
+    conn.executemany("INSERT INTO results VALUES (?,?,?,?)", [('A', '', 2.0, 'h1'), ('A', 'B', 1.0, 'hb')])
+    conn.commit()
+    conn.close()
+
+    readonly = ResultStore(filename, readonly=True)
+    assert readonly.bettermae_dict() == { 'A': { 'keymae': 2.0, 'data_source_sha1': 'h1', 'exogen': { 'B': 1.0 } } }
+    readonly.close()
+    store = ResultStore(filename)
+    assert store.get('A', 'B', 'hb', 'h1') == 1.0
+    assert store.bettermae_dict() == readonly.bettermae_dict()
+
+
+def test_json_round_trip(tmp_path):
+    all_results = {
+        'A': { 'keymae': 2.0, 'data_source_sha1': 'h1', 'exogen': { 'B': { 'exmae': 1.0, 'data_source_sha1': 'h2' },
+                                                                   'C': { 'exmae': 3.0, 'data_source_sha1': 'h3' } } },
+        'D': { 'keymae': 1.0, 'data_source_sha1': 'h4', 'exogen': { 'B': { 'exmae': 1.5, 'data_source_sha1': 'h5' } } }
+    }
+    legacy = tmp_path / 'allMAE.json'
+    legacy.write_text(json.dumps(all_results))
+    store = open_store(str(tmp_path / 'allMAE.sqlite3'), legacy_json=str(legacy))
+    assert store.to_dict() == all_results
+
+    store.export(str(tmp_path / 'out.json'), str(tmp_path / 'better.json'))
+    assert json.loads((tmp_path / 'out.json').read_text()) == all_results
+    assert json.loads((tmp_path / 'better.json').read_text()) == {
+        'A': { 'keymae': 2.0, 'data_source_sha1': 'h1', 'exogen': { 'B': 1.0 } }
+    }
+
+
+def test_concurrent_writers(tmp_path):
+    filename = str(tmp_path / 'allMAE.sqlite3')
+    ResultStore(filename).conn          # create the schema before the writers start
+    workers, count = 4, 50
+    processes = [ multiprocessing.Process(target=_put_results, args=(filename, worker, count)) for worker in range(workers) ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    assert len(ResultStore(filename)) == workers*count
+
+
+def test_projections(tmp_path):
+    filename = str(tmp_path / 'allMAE.sqlite3')
+    store = ResultStore(filename)
+    store.put_projection('A', '1,0,0,0,0,0,12', 'h1', '2019-05-01', [1.0, 2.0, 3.0])
+    store.close()
+
+    store = ResultStore(filename)                   # kept across runs
+    assert store.get_projection('A', '1,0,0,0,0,0,12', 'h1', '2019-05-01', 3).tolist() == [1.0, 2.0, 3.0]
+    assert store.get_projection('A', '1,0,0,0,0,0,12', 'h1', '2019-05-01', 2).tolist() == [1.0, 2.0]
+    assert store.get_projection('A', '1,0,0,0,0,0,12', 'h1', '2019-05-01', 4) is None
+    assert store.get_projection('A', '1,0,0,0,0,0,12', 'h2', '2019-05-01', 3) is None       # data changed
+    assert store.get_projection('A', '1,0,0,0,0,0,12', 'h1', '2019-06-01', 3) is None
+    assert store.get_projection('A', '2,0,0,0,0,0,12', 'h1', '2019-05-01', 3) is None
+    store.put_projection('A', '1,0,0,0,0,0,12', 'h2', '2019-05-01', [4.0])
+    assert store.get_projection('A', '1,0,0,0,0,0,12', 'h1', '2019-05-01', 1) is None
+    assert store.summary()['projections'] == 1
+
+
+def test_models(tmp_path):
+    store = ResultStore(str(tmp_path / 'allMAE.sqlite3'))
+    store.put_model('A', None, '4,0,3,3,0,4,12', 'h1', 120, [0.5, -0.25, 1.0])
+    store.put_model('A', 'B|C', '4,0,3,3,0,4,12', 'h2', 120, [0.1, 0.2])
+    assert store.get_model('A', None, '4,0,3,3,0,4,12', 'h1').tolist() == [0.5, -0.25, 1.0]
+    assert store.get_model('A', 'B|C', '4,0,3,3,0,4,12', 'h2').tolist() == [0.1, 0.2]
+    assert store.get_model('A', None, '4,0,3,3,0,4,12', 'h2') is None          # fit on other data
+    assert store.get_model('A', None, '1,0,0,0,0,0,12', 'h1') is None          # other order
+    assert store.get_model('B', None, '4,0,3,3,0,4,12', 'h1') is None
+
+    store.put_model('A', None, '4,0,3,3,0,4,12', 'h3', 121, [0.75])            # data changed, model refit
+    assert store.get_model('A', None, '4,0,3,3,0,4,12', 'h1') is None
+    assert store.get_model('A', None, '4,0,3,3,0,4,12', 'h3').tolist() == [0.75]
+    assert store.summary()['models'] == 2
@@ -0,0 +1,57 @@
+import pytest
+from scheduler import TaskScheduler, DependencyError
+
+
+def _square(x):
+    return(x*x)
+
+
+def _add(x, y):
+    return(x + y)
+
+
+def _fail(x):
+    raise ValueError(x)
+
+
+def test_dependent_tasks_receive_results():
+    scheduler = TaskScheduler(processes=2)
+    scheduler.add('a', _square, args=(3,))
+    scheduler.add('b', _add, args=(1,), depends_on='a')
+    scheduler.add('c', _square, args=(4,))
+    assert len(scheduler) == 3
+    assert scheduler.run() == { 'a': 9, 'b': 10, 'c': 16 }
+
+
+def test_failure_cancels_dependents():
+    errors = {}
+    scheduler = TaskScheduler(processes=1)
+    scheduler.add('a', _fail, args=('a',), error_callback=lambda err: errors.setdefault('a', err))
+    scheduler.add('b', _add, args=(1,), depends_on='a', error_callback=lambda err: errors.setdefault('b', err))
+    scheduler.add('c', _add, args=(1,), depends_on='b', error_callback=lambda err: errors.setdefault('c', err))
+    scheduler.add('d', _square, args=(2,))
+    assert scheduler.run() == { 'd': 4 }
+    assert isinstance(errors['a'], ValueError)
+    assert isinstance(errors['b'], DependencyError)
+    assert isinstance(errors['c'], DependencyError)
+
+
+def test_longest_first_dispatch():
+    finished = []
+    scheduler = TaskScheduler(processes=1, prefetch=0)
+    scheduler.add('cheap', _square, args=(1,), cost=1, callback=lambda result: finished.append('cheap'))
+    scheduler.add('costly', _square, args=(2,), cost=5, callback=lambda result: finished.append('costly'))
+    scheduler.add('parent', _square, args=(3,), cost=1, callback=lambda result: finished.append('parent'))
+    scheduler.add('child', _add, args=(1,), cost=10, depends_on='parent', callback=lambda result: finished.append('child'))
+    scheduler.run()
+    # parent ranks first by the cost waiting on it, its released child then runs ahead of the queued tasks
+    assert finished == ['parent', 'child', 'costly', 'cheap']
+
+
+def test_invalid_tasks():
+    scheduler = TaskScheduler(processes=1)
+    scheduler.add('a', _square, args=(1,))
+    with pytest.raises(ValueError):
+        scheduler.add('a', _square, args=(1,))
+    with pytest.raises(ValueError):
+        scheduler.add('b', _square, depends_on='missing')
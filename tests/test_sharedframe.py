@@ -0,0 +1,47 @@
+import os
+import pickle
+import multiprocessing
+import numpy as np
+import pandas as pd
+from sharedframe import SharedFrame
+
+
+def _frame():
+    index = pd.date_range('2000-01-01', periods=12, freq='MS')
+    return(pd.DataFrame(np.arange(36, dtype=float).reshape(12, 3), index=index, columns=['A', 'B', 'C']))
+
+
+def _column_sum(shared, name):
+    return(float(shared.series(name).sum()))
+
+
+def test_views_match_frame():
+    frame = _frame()
+    with SharedFrame.create(frame) as shared:
+        assert shared.shape == frame.shape
+        pd.testing.assert_series_equal(shared.series('B', start=2, stop=8), frame['B'].iloc[2:8], check_freq=False)
+        pd.testing.assert_frame_equal(shared.frame(['C', 'A'], stop=5), frame[['C', 'A']].iloc[:5], check_freq=False)
+        assert np.shares_memory(shared.series('A').values, shared.values)       # zero-copy column view
+
+
+def test_workers_read_the_file():
+    frame = _frame()
+    with SharedFrame.create(frame) as shared:
+        copy = pickle.loads(pickle.dumps(shared))
+        assert copy._values is None and not copy.owner
+        with multiprocessing.Pool(2) as pool:
+            sums = pool.starmap(_column_sum, [ (shared, name) for name in frame.columns ])
+        assert sums == [ float(frame[name].sum()) for name in frame.columns ]
+
+
+def test_close_removes_temporary_file():
+    shared = SharedFrame.create(_frame())
+    assert os.path.isfile(shared.filename)
+    shared.close()
+    assert not os.path.isfile(shared.filename)
+
+
+def test_named_file_is_kept(tmp_path):
+    filename = str(tmp_path / 'rainfall.npy')
+    SharedFrame.create(_frame(), filename=filename).close()
+    assert os.path.isfile(filename)
@@ -0,0 +1,132 @@
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from fingerprint import combine
+from walkforward import (WalkForward, walk_forward, walk_forward_split, resume_walk_forward, window_mae, sarima_model, model_signature, order_key,
+                         parse_order_key, DEFAULT_ORDER, DEFAULT_SEASONAL_ORDER)
+
+ORDER = (1, 0, 0)             # small model, the walk-forward logic does not depend on the order
+SEASONAL_ORDER = (0, 0, 0, 0)
+
+
+@pytest.fixture
+def series():
+    rs = np.random.RandomState(0)
+    values = np.empty(60)
+    values[0] = 5.0
+    for t in range(1, len(values)):
+        values[t] = 2.0 + 0.6*values[t-1] + rs.normal()
+    return(values)
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+def test_model_signature_keeps_legacy_signature():
+    assert model_signature('abc') == 'abc'
+    assert model_signature('abc', DEFAULT_ORDER, DEFAULT_SEASONAL_ORDER, refit_every=1) == 'abc'
+
+
+def test_model_signature_order_and_refit_cadence():
+    order = ((1, 0, 1), (1, 0, 1, 12))
+    assert model_signature('abc', *order) == combine(['abc', order_key(*order)])
+    signatures = { model_signature('abc', refit_every=refit_every) for refit_every in (1, 3, None) }
+    assert len(signatures) == 3
+    assert model_signature('abc', *order, refit_every=None) != model_signature('abc', *order, refit_every=1)
+
+
+def test_order_key_round_trip():
+    assert order_key(DEFAULT_ORDER, DEFAULT_SEASONAL_ORDER) == '4,0,3,3,0,4,12'
+    assert parse_order_key(order_key(DEFAULT_ORDER, DEFAULT_SEASONAL_ORDER)) == (DEFAULT_ORDER, DEFAULT_SEASONAL_ORDER)
+
+
+def test_append_matches_filter_with_fixed_params(series):
+    engine = WalkForward(ORDER, SEASONAL_ORDER, refit_every=None).fit(series[:40])
+    params = np.asarray(engine.params)
+    for t in range(40, 50):
+        expected = sarima_model(series[:t], ORDER, SEASONAL_ORDER).filter(params).forecast()[0]
+        assert engine.forecast() == pytest.approx(expected, rel=1e-8)
+        engine.append(series[t:t+1])
+    assert engine.n_fits == 1
+    assert np.array_equal(engine.endog, series[:50])
+
+
+def test_refit_cadence(series):
+    engine = WalkForward(ORDER, SEASONAL_ORDER, refit_every=3).fit(series[:40])
+    for t in range(40, 47):
+        engine.append(series[t:t+1])
+    assert engine.n_fits == 1 + 7 // 3
+
+
+def test_invalid_refit_cadence():
+    with pytest.raises(ValueError):
+        WalkForward(ORDER, SEASONAL_ORDER, refit_every=0)
+
+
+def test_walk_forward_generator(series):
+    index = np.arange(100, 120)
+    walk = walk_forward(series, 40, index=index, order=ORDER, seasonal_order=SEASONAL_ORDER)
+    forecasts = list(walk)
+    assert [ date for date, prediction in forecasts ] == list(index)
+
+    engine = WalkForward(ORDER, SEASONAL_ORDER).fit(series[:40])
+    for t, (date, prediction) in zip(range(40, 60), forecasts):
+        assert prediction == engine.forecast()
+        engine.append(series[t:t+1])
+
+
+def test_walk_forward_split_matches_walk_forward(series):
+    exog = np.column_stack([np.roll(series, 1)])
+    expected = [ prediction for date, prediction in walk_forward(series, 45, exog, order=ORDER, seasonal_order=SEASONAL_ORDER) ]
+    forecasts = walk_forward_split(pd.Series(series[:45]), pd.Series(series[45:]), pd.DataFrame(exog[:45]), pd.DataFrame(exog[45:]),
+                                   order=ORDER, seasonal_order=SEASONAL_ORDER)
+    assert [ prediction for date, prediction in forecasts ] == expected
+
+
+def test_buffer_grows_past_capacity(series):
+    engine = WalkForward(ORDER, SEASONAL_ORDER).fit(series[:40], capacity=41)
+    engine.append(series[40:55])
+    assert engine.nobs == 55
+    assert np.array_equal(engine.endog, series[:55])
+
+
+def test_split_out_of_range(series):
+    for split in (0, len(series)):
+        with pytest.raises(ValueError):
+            walk_forward(series, split, order=ORDER, seasonal_order=SEASONAL_ORDER)
+
+
+@pytest.mark.parametrize('refit_every', [None, 1, 4])
+def test_resume_continues_the_walk(series, refit_every):
+    full = WalkForward(ORDER, SEASONAL_ORDER, refit_every=refit_every)
+    expected = [ prediction for date, prediction in walk_forward(series, 40, engine=full) ]
+
+    # walk over the months observed so far, store the state, resume once 9 new months are observed
+    first = WalkForward(ORDER, SEASONAL_ORDER, refit_every=refit_every)
+    earlier = [ prediction for date, prediction in walk_forward(series[:51], 40, engine=first) ]
+    since_fit = 0 if refit_every is None else (len(earlier)-1) % refit_every + 1
+    resumed = [ prediction for date, prediction in
+                resume_walk_forward(series, 51, np.asarray(first.params), order=ORDER, seasonal_order=SEASONAL_ORDER,
+                                    refit_every=refit_every, since_fit=since_fit) ]
+    np.testing.assert_allclose(earlier + resumed, expected, rtol=1e-6)
+
+
+def test_resume_without_refit_does_not_fit(series):
+    engine = WalkForward(ORDER, SEASONAL_ORDER)
+    params = WalkForward(ORDER, SEASONAL_ORDER).fit(series[:40]).params
+    list(resume_walk_forward(series, 40, params, engine=engine))
+    assert engine.n_fits == 0
+
+
+def test_window_mae():
+    actuals = np.array([1.0, 2.0, 3.0, 4.0])
+    predictions = np.array([0.0, 2.0, 5.0, 3.0])
+    assert window_mae(actuals, predictions, 2) == 1.5
+    assert window_mae(actuals, predictions, 4) == 1.0
+    with pytest.raises(ValueError):
+        window_mae(actuals, predictions, 5)